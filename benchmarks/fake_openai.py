@@ -0,0 +1,173 @@
+"""
+로컬 OpenAI 대체 서버 (벤치마크 전용).
+
+chat.completions(스트리밍 포함)와 images.generate 를 흉내 내며, 응답 지연과 429 응답 비율을 설정할 수 있습니다.
+스토리보드 응답은 fixtures/storyboards 의 실제 형식 텍스트를 사용합니다.
+
+    python -m benchmarks.fake_openai --port 8100 --latency 2 --image-latency 5 --error-rate 0.1
+
+앱은 OPENAI_BASE_URL=http://127.0.0.1:8100/v1 로 이 서버를 바라봅니다.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import struct
+import time
+import uuid
+import zlib
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "storyboards")
+
+TITLES = "1. 별을 따라 걷는 길\n2. 소백산의 밤\n3. 천문대에서 만난 가을\n4. 우리들의 은하수\n5. 하늘과 가까운 곳"
+INTRO_OUTRO = (
+    "인트로:\n"
+    "1. 새로운 시작: 첫 장면은 자연의 아름다움을 강조하며 화면이 서서히 밝아집니다.\n"
+    "2. 설렘: 배낭을 메고 출발하는 뒷모습으로 시작합니다.\n"
+    "3. 첫 발걸음: 등산로 입구의 표지판을 클로즈업합니다.\n"
+    "4. 아침 공기: 안개 낀 능선을 드론으로 담습니다.\n"
+    "5. 만남: 친구들이 하이파이브하며 여정을 시작합니다.\n\n"
+    "아웃트로:\n"
+    "1. 여운: 천문대 위로 별이 쏟아집니다.\n"
+    "2. 귀갓길: 차창 밖으로 멀어지는 산을 담습니다.\n"
+    "3. 약속: 다음 여행을 약속하며 손을 맞잡습니다.\n"
+    "4. 기록: 함께 찍은 사진들이 차례로 지나갑니다.\n"
+    "5. 밤하늘: 은하수가 화면을 가득 채우며 끝납니다."
+)
+
+# 실행 옵션 (main 에서 설정)
+settings = {
+    "latency": 0.0,  # chat.completions 응답 지연(초)
+    "image_latency": 0.0,  # images.generate 응답 지연(초)
+    "chunk_delay": 0.0,  # 스트리밍 조각 사이 지연(초)
+    "error_rate": 0.0,  # 429 응답 비율 (0~1)
+    "retry_after": 1.0,  # 429 응답의 Retry-After(초)
+    "base_url": "http://127.0.0.1:8100",
+}
+
+app = FastAPI()
+
+
+def _read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def _png(size=256):
+    # 단색 PNG 를 의존성 없이 생성합니다.
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xffffffff)
+
+    row = b"\x00" + b"\x1e\x64\xc8" * size
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(row * size))
+            + chunk(b"IEND", b""))
+
+
+IMAGE_BYTES = _png()
+
+
+def _rate_limited():
+    if random.random() >= settings["error_rate"]:
+        return None
+    return JSONResponse(
+        status_code=429,
+        content={"error": {"message": "Rate limit reached (fake)", "type": "requests", "code": "rate_limit_exceeded"}},
+        headers={"retry-after": str(settings["retry_after"])},
+    )
+
+
+def _completion_text(body):
+    if body.get("response_format"):
+        return _read_fixture("structured.json")
+    text = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+    if "스토리보드" in text and "scene" in text:
+        return _read_fixture("standard.txt")
+    if "인트로" in text:
+        return INTRO_OUTRO
+    return TITLES
+
+
+def _usage(body, content):
+    prompt_tokens = sum(len(str(message.get("content", ""))) for message in body.get("messages", [])) // 2
+    completion_tokens = len(content) // 2
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    limited = _rate_limited()
+    if limited is not None:
+        return limited
+    body = await request.json()
+    content = _completion_text(body)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+
+    if body.get("stream"):
+        async def events():
+            await asyncio.sleep(settings["latency"] / 4)  # 첫 토큰까지의 지연
+            for i in range(0, len(content), 16):
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                         "model": body.get("model"),
+                         "choices": [{"index": 0, "delta": {"content": content[i:i + 16]}, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                await asyncio.sleep(settings["chunk_delay"])
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    await asyncio.sleep(settings["latency"])
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": body.get("model"),
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": _usage(body, content),
+    }
+
+
+@app.post("/v1/images/generations")
+async def images_generations(request: Request):
+    limited = _rate_limited()
+    if limited is not None:
+        return limited
+    await request.json()
+    await asyncio.sleep(settings["image_latency"])
+    return {"created": int(time.time()), "data": [{"url": f"{settings['base_url']}/files/{uuid.uuid4().hex}.png"}]}
+
+
+@app.get("/files/{name}")
+async def files(name: str):
+    return Response(content=IMAGE_BYTES, media_type="image/png")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=2.0)
+    parser.add_argument("--image-latency", type=float, default=5.0)
+    parser.add_argument("--chunk-delay", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    args = parser.parse_args()
+
+    settings.update(latency=args.latency, image_latency=args.image_latency, chunk_delay=args.chunk_delay,
+                    error_rate=args.error_rate, retry_after=args.retry_after,
+                    base_url=f"http://{args.host}:{args.port}")
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
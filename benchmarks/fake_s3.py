@@ -0,0 +1,38 @@
+"""
+로컬 S3 대체 서버 (벤치마크 전용, moto 사용. pip install -r requirements-dev.txt).
+
+    python -m benchmarks.fake_s3 --port 8200 --bucket my-bucket
+
+앱은 S3_ENDPOINT_URL=http://127.0.0.1:8200 로 이 서버를 바라봅니다.
+"""
+import argparse
+import os
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local S3 stand-in for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--bucket", required=True)
+    args = parser.parse_args()
+
+    import boto3
+    from moto.server import ThreadedMotoServer
+
+    server = ThreadedMotoServer(ip_address=args.host, port=args.port, verbose=False)
+    server.start()
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+    boto3.client("s3", endpoint_url=f"http://{args.host}:{args.port}", region_name="us-east-1") \
+        .create_bucket(Bucket=args.bucket)
+    print(f"fake s3 listening on http://{args.host}:{args.port} (bucket: {args.bucket})", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+API 부하 드라이버. 지정한 동시성으로 엔드포인트를 호출하고 지연 시간 분포, 처리량, 서버 RSS/스레드 수를 JSON 으로 출력합니다.
+
+    python -m benchmarks.load --base-url http://127.0.0.1:8000 --pid <uvicorn pid> --concurrency 20 --requests 200
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from collections import Counter
+
+import httpx
+
+SCENARIOS = ("titles", "iotros", "storyboards", "images")
+
+TITLE_REQUEST = {
+    "destination": "소백산",
+    "description": "국립 천문대가 있는 산",
+    "purpose": "별 관측",
+    "companions": "친구",
+    "companion_count": 2,
+    "season": "가을",
+}
+
+STORYBOARD_REQUEST = dict(
+    TITLE_REQUEST,
+    title="별을 따라 걷는 소백산",
+    intro="새로운 시작: 첫 장면은 자연의 아름다움을 강조하며 화면이 서서히 밝아집니다.",
+    outro="여운: 천문대 위로 별이 쏟아집니다.",
+    image_urls=["https://example.com/sobaeksan/1.jpg", "https://example.com/sobaeksan/2.jpg"],
+)
+
+
+def build_request(scenario, index, unique, scenes):
+    """
+    시나리오별 (method, path, json) 을 만듭니다. unique=True 이면 입력을 매번 바꿔 캐시/합치기를 우회합니다.
+    """
+    suffix = f" #{uuid.uuid4().hex[:8]}" if unique else ""
+    if scenario == "titles":
+        return "POST", "/recommend/titles", dict(TITLE_REQUEST, destination=TITLE_REQUEST["destination"] + suffix)
+    if scenario == "iotros":
+        return "POST", "/recommend/iotros", "별을 따라 걷는 소백산" + suffix
+    if scenario == "storyboards":
+        return "POST", "/fastapi/storyboards", dict(STORYBOARD_REQUEST, title=STORYBOARD_REQUEST["title"] + suffix)
+    if scenario == "images":
+        storyboard_id = index + 1 if unique else 1
+        return "POST", "/fastapi/images", [
+            {
+                "storyboard_id": storyboard_id,
+                "order_num": order_num,
+                "scene_description": f"소백산 천문대 씬 {order_num}{suffix}",
+                "destination": "소백산",
+                "purpose": "별 관측",
+                "companion": "친구",
+                "companion_count": 2,
+                "season": "가을",
+                "image_urls": [],
+            }
+            for order_num in range(1, scenes + 1)
+        ]
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+class ProcessSampler:
+    """
+    /proc/<pid>/status 를 주기적으로 읽어 최대 RSS 와 최대 스레드 수를 기록합니다. (Linux 전용)
+    """
+
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss_kb = 0
+        self.peak_threads = 0
+        self._task = None
+
+    def sample(self):
+        if not self.pid:
+            return
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        self.peak_rss_kb = max(self.peak_rss_kb, int(line.split()[1]))
+                    elif line.startswith("Threads:"):
+                        self.peak_threads = max(self.peak_threads, int(line.split()[1]))
+        except OSError:
+            pass
+
+    async def _run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        self.sample()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return round(ordered[index], 2)
+
+
+def summarize(latencies_ms):
+    return {
+        "p50": percentile(latencies_ms, 50),
+        "p95": percentile(latencies_ms, 95),
+        "p99": percentile(latencies_ms, 99),
+        "mean": round(sum(latencies_ms) / len(latencies_ms), 2) if latencies_ms else None,
+        "max": round(max(latencies_ms), 2) if latencies_ms else None,
+    }
+
+
+async def _wait_for_job(client, job_id, timeout):
+    # 이미지 작업이 끝날 때까지 폴링하고, 완료까지 걸린 시간과 최종 상태를 반환합니다.
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        response = await client.get(f"/fastapi/images/jobs/{job_id}")
+        if response.status_code == 200 and response.json()["status"] in ("done", "failed"):
+            return (time.perf_counter() - started) * 1000, response.json()["status"]
+        await asyncio.sleep(0.2)
+    return (time.perf_counter() - started) * 1000, "timeout"
+
+
+async def run_scenario(client, scenario, total, concurrency, unique, scenes, job_timeout):
+    latencies = []
+    job_latencies = []
+    statuses = Counter()
+    job_statuses = Counter()
+    indexes = iter(range(total))
+
+    async def worker():
+        for index in indexes:
+            method, path, body = build_request(scenario, index, unique, scenes)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                statuses[str(response.status_code)] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+                continue
+            finally:
+                latencies.append((time.perf_counter() - started) * 1000)
+            if scenario == "images" and response.status_code == 200:
+                job_latency, job_status = await _wait_for_job(client, response.json()["job_id"], job_timeout)
+                job_latencies.append(job_latency)
+                job_statuses[job_status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 3) if elapsed else None,
+        "errors": sum(count for status, count in statuses.items() if not status.startswith("2")),
+        "status_counts": dict(statuses),
+        "latency_ms": summarize(latencies),
+    }
+    if scenario == "images":
+        result["job_latency_ms"] = summarize(job_latencies)
+        result["job_status_counts"] = dict(job_statuses)
+    return result
+
+
+async def run_load(base_url, scenarios, total, concurrency, unique=True, scenes=5, pid=None, timeout=300.0,
+                   job_timeout=600.0):
+    """
+    시나리오를 차례로 실행하고 결과를 딕셔너리로 반환합니다.
+
+    Args:
+        base_url (str): 앱 주소.
+        scenarios (list): 실행할 시나리오 (titles, iotros, storyboards, images).
+        total (int): 시나리오당 요청 수.
+        concurrency (int): 동시 요청 수.
+        unique (bool): 요청마다 입력을 바꿔 캐시/합치기를 우회할지 여부.
+        scenes (int): images 시나리오의 요청당 씬 수.
+        pid (int): RSS/스레드 수를 측정할 앱 프로세스 ID.
+        timeout (float): HTTP 요청 타임아웃(초).
+        job_timeout (float): 이미지 작업 완료 대기 시간(초).
+
+    Returns:
+        dict: 시나리오별 지연 시간 분포, 처리량과 서버 자원 사용량.
+    """
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency * 2)
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        for scenario in scenarios:
+            sampler = ProcessSampler(pid)
+            sampler.start()
+            results[scenario] = await run_scenario(client, scenario, total, concurrency, unique, scenes, job_timeout)
+            await sampler.stop()
+            results[scenario]["server"] = {"peak_rss_kb": sampler.peak_rss_kb, "peak_threads": sampler.peak_threads}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load driver for the storyboard API")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--scenes", type=int, default=5, help="scenes per /fastapi/images request")
+    parser.add_argument("--repeat-inputs", action="store_true", help="send identical inputs (exercise cache/coalescing)")
+    parser.add_argument("--pid", type=int, help="app process id for RSS/thread sampling")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_load(args.base_url, args.scenarios.split(","), args.requests, args.concurrency,
+                                   unique=not args.repeat_inputs, scenes=args.scenes, pid=args.pid))
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+오프라인 벤치마크 실행기.
+
+로컬 OpenAI 대체 서버, 로컬 S3(moto), 앱(uvicorn main:app)을 각각 별도 프로세스로 띄운 뒤
+benchmarks.load 로 부하를 주고 결과를 JSON 으로 기록합니다. 커밋 간 결과 비교에 사용합니다.
+config/settings.py 가 있어야 하며(버킷명만 사용), 실제 OpenAI/AWS 로는 요청이 나가지 않습니다.
+
+    python -m benchmarks.run --concurrency 20 --requests 200 --output bench_output.txt
+    python -m benchmarks.run --scenarios images --latency 0.5 --image-latency 3 --error-rate 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.load import SCENARIOS, run_load
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 벤치마크 중에는 앱의 모델별 속도 제한을 풀어 대체 서버의 지연/429 설정만 반영되도록 합니다.
+BENCH_ENV = {
+    "OPENAI_GPT4O_RPM": "1000000",
+    "OPENAI_GPT4O_TPM": "0",
+    "OPENAI_DALLE3_RPM": "1000000",
+    "AWS_ACCESS_KEY_ID": "bench",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "IMAGE_JOB_STORE_URL": "memory://",  # 이전 실행의 작업을 이어서 처리하지 않도록
+    "IMAGE_DEDUP_ENABLED": "false",  # 같은 씬 설명이 반복되는 부하에서도 생성 경로를 측정하도록
+    # 부하 생성기는 클라이언트 하나이므로 클라이언트별 할당량과 이미지 대기열 거절은 끄고 동시 처리 수 제한만 둡니다.
+    "ADMISSION_STORYBOARDS_PER_CLIENT": "0",
+    "ADMISSION_RECOMMEND_PER_CLIENT": "0",
+    "ADMISSION_IMAGES_PER_CLIENT": "0",
+    "IMAGE_MAX_QUEUED_SCENES": "1000000",
+}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_ready(url, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready")
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark for the storyboard API")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--scenes", type=int, default=5, help="scenes per /fastapi/images request")
+    parser.add_argument("--repeat-inputs", action="store_true", help="send identical inputs (exercise cache/coalescing)")
+    parser.add_argument("--latency", type=float, default=2.0, help="fake chat completion latency (s)")
+    parser.add_argument("--image-latency", type=float, default=5.0, help="fake image generation latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake OpenAI calls answered with 429")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    from config.settings import AWS_BUCKET_NAME
+
+    openai_port, s3_port, app_port = _free_port(), _free_port(), _free_port()
+    env = dict(os.environ)
+    for key, value in BENCH_ENV.items():
+        env.setdefault(key, value)
+    env.update(
+        OPENAI_BASE_URL=f"http://127.0.0.1:{openai_port}/v1",
+        S3_ENDPOINT_URL=f"http://127.0.0.1:{s3_port}",
+    )
+
+    processes = []
+    try:
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.fake_openai", "--port", str(openai_port),
+             "--latency", str(args.latency), "--image-latency", str(args.image_latency),
+             "--error-rate", str(args.error_rate)],
+            cwd=ROOT_DIR, env=env))
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.fake_s3", "--port", str(s3_port), "--bucket", AWS_BUCKET_NAME],
+            cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL))
+        _wait_until_ready(f"http://127.0.0.1:{openai_port}/docs")
+        _wait_until_ready(f"http://127.0.0.1:{s3_port}/")
+
+        app = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port), "--log-level", "warning"],
+            cwd=ROOT_DIR, env=env)
+        processes.append(app)
+        _wait_until_ready(f"http://127.0.0.1:{app_port}/")
+
+        results = asyncio.run(run_load(
+            f"http://127.0.0.1:{app_port}", args.scenarios.split(","), args.requests, args.concurrency,
+            unique=not args.repeat_inputs, scenes=args.scenes, pid=app.pid))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": vars(args),
+        "scenarios": results,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+API 프로세스 시작 비용 벤치마크.
+
+새 인터프리터에서 main:app 을 import 하는 시간, lifespan 시작에 걸리는 시간, 그 시점의 최대 RSS 를 여러 번 재고
+-X importtime 으로 main 이 로드하는 모듈 중 누적 import 시간이 큰 것을 함께 기록합니다.
+gunicorn 워커는 각자 main 을 import 하므로 이 값이 워커 하나가 요청을 받기까지의 시간입니다.
+import 시점에 로드되면 안 되는 무거운 모듈(LAZY_MODULES)이 로드되었거나 한도를 넘으면 종료 코드 1 로 끝나므로
+CI 에서 회귀 검사로 쓸 수 있습니다. config/settings.py 가 있어야 하며, 외부로 요청은 나가지 않습니다.
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --max-import-seconds 1.5 --max-rss-mb 200 --output startup.json
+    ENABLED_ROUTERS=recommend python -m benchmarks.startup
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.run import ROOT_DIR, _git_commit
+from config.runtime import ENABLED_ROUTERS
+
+# main 을 import 하는 것만으로는 로드되면 안 되는 모듈. 공유 클라이언트를 처음 만들 때(lifespan, 첫 사용) 로드됩니다.
+LAZY_MODULES = ("openai", "httpx", "boto3", "botocore", "requests", "PIL", "tiktoken")
+# 이미지 라우터(images)가 ENABLED_ROUTERS 에 없으면 로드되면 안 되는 모듈.
+IMAGE_ONLY_MODULES = ("utils.webhooks", "utils.image_processing")
+
+# 자식 프로세스에서 실행하는 측정 코드. 마지막 줄에 결과 JSON 을 출력합니다.
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import main
+import_seconds = time.perf_counter() - started
+loaded = sorted(name for name in {lazy!r} if name in sys.modules)
+import asyncio
+async def lifespan():
+    started = time.perf_counter()
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter() - started
+startup_seconds = asyncio.run(lifespan())
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    rss //= 1024  # macOS 는 바이트 단위
+print(json.dumps({{"import_seconds": import_seconds, "startup_seconds": startup_seconds, "max_rss_kb": rss,
+                  "lazy_modules_loaded": loaded}}))
+"""
+
+
+def _child_env(state_dir):
+    env = os.environ.copy()
+    # 상태 파일은 임시 디렉터리에 만들고, 측정 중 로그 출력은 줄입니다.
+    env.setdefault("STATE_DIR", state_dir)
+    env.setdefault("LOG_LEVEL", "WARNING")
+    return env
+
+
+def measure_once(env):
+    """
+    새 인터프리터 하나에서 import / lifespan 시작 시간과 최대 RSS 를 잽니다.
+
+    Returns:
+        dict: import_seconds, startup_seconds, max_rss_kb, lazy_modules_loaded.
+    """
+    lazy = LAZY_MODULES if "images" in ENABLED_ROUTERS else LAZY_MODULES + IMAGE_ONLY_MODULES
+    output = subprocess.check_output([sys.executable, "-c", PROBE.format(lazy=lazy)], cwd=ROOT_DIR,
+                                     env=env, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def top_imports(env, limit=10):
+    """
+    -X importtime 결과에서 main 이 처음 import 한 모듈 중 누적 import 시간이 큰 것을 찾습니다.
+
+    Returns:
+        list: [{"module": 이름, "ms": 누적 시간(ms)}, ...] 큰 순서.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # 들여쓰기는 import 깊이입니다. 깊이 0 은 main 자신, 깊이 1 은 main 에서 처음 로드된 모듈입니다.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if cumulative.strip().isdigit() and depth == 1:
+            modules.append({"module": name.strip(), "ms": round(int(cumulative) / 1000, 1)})
+    return sorted(modules, key=lambda item: item["ms"], reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="number of fresh interpreters to measure")
+    parser.add_argument("--max-import-seconds", type=float, default=None, help="fail if median import time is higher")
+    parser.add_argument("--max-rss-mb", type=float, default=None, help="fail if median max RSS is higher")
+    parser.add_argument("--output", default=None, help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="startup-bench-") as state_dir:
+        env = _child_env(state_dir)
+        runs = [measure_once(env) for _ in range(args.runs)]
+        imports = top_imports(env)
+
+    import_seconds = statistics.median(run["import_seconds"] for run in runs)
+    startup_seconds = statistics.median(run["startup_seconds"] for run in runs)
+    rss_mb = statistics.median(run["max_rss_kb"] for run in runs) / 1024
+    loaded = sorted({name for run in runs for name in run["lazy_modules_loaded"]})
+
+    failures = []
+    if loaded:
+        failures.append(f"modules loaded at import time: {', '.join(loaded)}")
+    if args.max_import_seconds is not None and import_seconds > args.max_import_seconds:
+        failures.append(f"import time {import_seconds:.3f}s > {args.max_import_seconds}s")
+    if args.max_rss_mb is not None and rss_mb > args.max_rss_mb:
+        failures.append(f"max RSS {rss_mb:.1f}MB > {args.max_rss_mb}MB")
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {**vars(args), "enabled_routers": os.getenv("ENABLED_ROUTERS")},
+        "import_seconds": round(import_seconds, 3),
+        "startup_seconds": round(startup_seconds, 3),
+        "max_rss_mb": round(rss_mb, 1),
+        "lazy_modules_loaded": loaded,
+        "top_imports": imports,
+        "runs": runs,
+        "failures": failures,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+    if failures:
+        for failure in failures:
+            sys.stderr.write(f"startup regression: {failure}\n")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+로컬 webhook 수신 서버 (개발/벤치마크 전용).
+
+이미지 완료 알림을 받아 서명을 검증하고, 받은 이벤트를 한 줄씩 출력합니다.
+--fail-rate 로 5xx 응답 비율을 주면 재시도 동작을 확인할 수 있습니다.
+
+    python -m benchmarks.webhook_receiver --port 8300 --secret my-secret
+
+앱은 WEBHOOK_SECRET=my-secret 로 실행하고, 이미지 요청의 callback_url 에 http://127.0.0.1:8300/hooks 를 넣습니다.
+받은 이벤트는 GET /hooks 로 조회할 수 있습니다.
+"""
+import argparse
+import json
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from utils.webhooks import verify_signature
+
+settings = {"secret": "", "fail_rate": 0.0}
+received = []
+seen_ids = set()
+
+app = FastAPI()
+
+
+@app.post("/hooks")
+async def receive(request: Request):
+    body = await request.body()
+    if settings["secret"] and not verify_signature(settings["secret"], request.headers.get("X-Webhook-Timestamp"),
+                                                   body, request.headers.get("X-Webhook-Signature")):
+        return JSONResponse({"error": "invalid signature"}, status_code=401)
+    if random.random() < settings["fail_rate"]:
+        return JSONResponse({"error": "injected failure"}, status_code=503, headers={"Retry-After": "1"})
+
+    delivery_id = request.headers.get("X-Webhook-Id")
+    if delivery_id in seen_ids:
+        # 재시도로 같은 알림이 다시 온 경우
+        return {"duplicate": True}
+    seen_ids.add(delivery_id)
+    event = json.loads(body)
+    received.append(event)
+    print(json.dumps(event, ensure_ascii=False), flush=True)
+    return {"ok": True}
+
+
+@app.get("/hooks")
+async def list_received():
+    return received
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local webhook receiver")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8300)
+    parser.add_argument("--secret", default="")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    settings.update(secret=args.secret, fail_rate=args.fail_rate)
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import os
+
+# 런타임 튜닝 값 (환경변수로 덮어쓸 수 있음)
+# 비밀 값(API 키, 버킷명 등)은 config/settings.py 에 둔다.
+
+# 프로세스 모델 (gunicorn.conf.py, docs/process_model.md 참고)
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", str(min(4, os.cpu_count() or 1))))  # API 워커 프로세스 수
+WEB_BIND = os.getenv("WEB_BIND", "0.0.0.0:8000")
+WEB_TIMEOUT = int(os.getenv("WEB_TIMEOUT", "120"))  # 이벤트 루프가 멈춘 워커를 재시작하기까지의 시간(초)
+WEB_MAX_REQUESTS = int(os.getenv("WEB_MAX_REQUESTS", "0"))  # 이 수만큼 처리한 워커를 재시작 (0 이면 재시작하지 않음)
+STATE_DIR = os.getenv("STATE_DIR", ".")  # 프로세스끼리 공유하는 SQLite 파일(캐시, 작업 저장소)을 두는 디렉터리
+# API 프로세스에 올릴 라우터 (recommend, storyboards, images). 빠진 라우터의 모듈은 import 하지 않음
+ENABLED_ROUTERS = [name.strip() for name in os.getenv("ENABLED_ROUTERS", "recommend,storyboards,images").split(",")
+                   if name.strip()]
+IMAGE_DRAIN_TIMEOUT = float(os.getenv("IMAGE_DRAIN_TIMEOUT", "60"))  # 종료 시 실행 중인 씬을 기다리는 시간(초). 넘으면 대기열로 되돌림
+# OpenAI 계정 한도를 나눠 쓰는 프로세스 수. 프로세스마다 OPENAI_RATE_LIMITS 를 이 수로 나눈 만큼만 사용
+# "workers" 면 WEB_WORKERS 와 같게 (gunicorn.conf.py 기본값)
+_rate_limit_share = os.getenv("OPENAI_RATE_LIMIT_SHARE", "1")
+OPENAI_RATE_LIMIT_SHARE = max(1, WEB_WORKERS if _rate_limit_share == "workers" else int(_rate_limit_share))
+
+# 이미지 생성 작업 엔진
+IMAGE_MAX_WORKERS = int(os.getenv("IMAGE_MAX_WORKERS", "7"))  # 프로세스 전체 동시 이미지 생성 수
+IMAGE_PER_STORYBOARD_LIMIT = int(os.getenv("IMAGE_PER_STORYBOARD_LIMIT", "3"))  # 스토리보드 하나당 동시 이미지 생성 수
+IMAGE_JOB_RETENTION_SECONDS = int(os.getenv("IMAGE_JOB_RETENTION_SECONDS", "3600"))  # 완료된 작업 상태 보관 시간
+# 작업 저장소: sqlite:///경로 (재시작 후 이어서 처리, 워커 프로세스와 공유) 또는 memory:// (개발용)
+IMAGE_JOB_STORE_URL = os.getenv("IMAGE_JOB_STORE_URL", f"sqlite:///{os.path.join(STATE_DIR, 'image_jobs.db')}")
+# inline: API 프로세스가 이미지도 생성 / external: API 는 작업만 등록하고 worker.py 가 생성
+IMAGE_WORKER_MODE = os.getenv("IMAGE_WORKER_MODE", "inline")
+IMAGE_JOB_LEASE_SECONDS = float(os.getenv("IMAGE_JOB_LEASE_SECONDS", "600"))  # 워커가 죽은 씬을 다시 가져가기까지의 시간(초)
+IMAGE_SCENE_MAX_ATTEMPTS = int(os.getenv("IMAGE_SCENE_MAX_ATTEMPTS", "3"))  # 중단된 씬을 다시 실행하는 최대 횟수
+IMAGE_JOB_POLL_INTERVAL = float(os.getenv("IMAGE_JOB_POLL_INTERVAL", "1"))  # 저장소에서 새 씬을 확인하는 주기(초)
+# 스토리보드 기한(초): 등록 후 이 시간 안에 끝나지 않은 씬은 실행 중이어도 failed 로 처리. 0 이면 기한 없음
+IMAGE_STORYBOARD_DEADLINE = float(os.getenv("IMAGE_STORYBOARD_DEADLINE", "300"))
+IMAGE_EVENTS_POLL_INTERVAL = float(os.getenv("IMAGE_EVENTS_POLL_INTERVAL", "0.5"))  # 진행 이벤트(SSE) 확인 주기(초)
+
+# OpenAI 공유 클라이언트 (httpx 커넥션 풀)
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))  # 동시 커넥션 상한
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))  # 유지할 keep-alive 커넥션 수
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))  # keep-alive 커넥션 유휴 시간(초)
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "120"))  # 요청 하나의 타임아웃(초)
+
+# GPT 응답 캐시
+# memory:// (프로세스 내부) 또는 sqlite:///경로 (같은 호스트의 uvicorn 워커끼리 공유)
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "memory://")
+RESPONSE_CACHE_MAXSIZE = int(os.getenv("RESPONSE_CACHE_MAXSIZE", "1024"))  # 최대 항목 수 (LRU 제거)
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))  # 항목 유효 시간(초)
+
+# S3 공유 클라이언트
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None  # 로컬 S3 대체 서버(moto 등) 주소. 비우면 AWS
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", str(IMAGE_MAX_WORKERS * 2)))  # 워커당 multipart 2개
+S3_UPLOAD_MAX_WORKERS = int(os.getenv("S3_UPLOAD_MAX_WORKERS", str(IMAGE_MAX_WORKERS)))  # upload_many 동시 업로드 수
+
+# OpenAI 호출 스케줄러 (모델별 분당 요청 수 / 분당 토큰 수, 0 이면 제한 없음)
+def _rate_share(value):
+    return max(1, value // OPENAI_RATE_LIMIT_SHARE) if value else 0
+
+
+OPENAI_RATE_LIMITS = {
+    "gpt-4o": {
+        "rpm": _rate_share(int(os.getenv("OPENAI_GPT4O_RPM", "500"))),
+        "tpm": _rate_share(int(os.getenv("OPENAI_GPT4O_TPM", "30000"))),
+    },
+    "dall-e-3": {
+        "rpm": _rate_share(int(os.getenv("OPENAI_DALLE3_RPM", "7"))),
+        "tpm": 0,
+    },
+}
+OPENAI_MAX_ATTEMPTS = int(os.getenv("OPENAI_MAX_ATTEMPTS", "5"))  # 429/5xx/연결 오류 시 최대 시도 횟수
+OPENAI_BACKOFF_BASE = float(os.getenv("OPENAI_BACKOFF_BASE", "1"))  # 지수 백오프 시작 값(초)
+OPENAI_BACKOFF_MAX = float(os.getenv("OPENAI_BACKOFF_MAX", "30"))  # 백오프 최대 값(초)
+OPENAI_CHAT_DEADLINE = float(os.getenv("OPENAI_CHAT_DEADLINE", "120"))  # chat.completions 호출 하나의 전체 기한(초)
+OPENAI_IMAGE_DEADLINE = float(os.getenv("OPENAI_IMAGE_DEADLINE", "180"))  # images.generate 호출 하나의 전체 기한(초)
+
+# 프롬프트 구성 (utils/prompts.py)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))  # 호출 하나의 입력 토큰 상한. 넘으면 긴 입력값부터 자름
+PROMPT_MAX_IMAGE_URLS = int(os.getenv("PROMPT_MAX_IMAGE_URLS", "5"))  # 프롬프트에 넣는 참조 이미지 URL 수
+IMAGE_PROMPT_MAX_CHARS = int(os.getenv("IMAGE_PROMPT_MAX_CHARS", "4000"))  # DALL·E 3 프롬프트 길이 제한(글자 수)
+# 호출 종류별 응답 토큰 상한 (max_tokens)
+OPENAI_MAX_TOKENS = {
+    "storyboard": int(os.getenv("STORYBOARD_MAX_TOKENS", "3000")),
+    "storyboard_edit": int(os.getenv("STORYBOARD_EDIT_MAX_TOKENS", "600")),  # 다시 작성하는 씬 하나당
+    "titles": int(os.getenv("TITLES_MAX_TOKENS", "300")),
+    "intro_outro": int(os.getenv("INTRO_OUTRO_MAX_TOKENS", "800")),
+}
+
+# 로깅
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")  # 기본 로그 레벨
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")  # 모듈별 레벨. 예: "routers.storyboards=DEBUG,utils.s3_image=WARNING"
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json 또는 text
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # 로그 큐 크기. 가득 차면 새 로그를 버립니다.
+LOG_MAX_PAYLOAD_CHARS = int(os.getenv("LOG_MAX_PAYLOAD_CHARS", "500"))  # 요청/응답 본문 로그 최대 길이
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.01"))  # 본문 전체를 DEBUG 로 남길 비율
+
+# 추천 일괄 요청 (/recommend/batch)
+RECOMMEND_BATCH_CONCURRENCY = int(os.getenv("RECOMMEND_BATCH_CONCURRENCY", "4"))  # 요청 하나 안에서 동시에 보내는 GPT 호출 수
+RECOMMEND_BATCH_MAX_ITEMS = int(os.getenv("RECOMMEND_BATCH_MAX_ITEMS", "10"))  # 요청 하나에 담을 수 있는 항목 수
+
+# 추측 실행(prefetch): 다음 단계 GPT 호출을 미리 시작해 두는 기능
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"  # false 면 prefetch 요청을 모두 무시
+PREFETCH_TOP_K = int(os.getenv("PREFETCH_TOP_K", "2"))  # 제목 추천 후 인트로/아웃트로를 미리 만들 제목 수
+PREFETCH_TTL = float(os.getenv("PREFETCH_TTL", "600"))  # 미리 만든 결과를 보관하는 시간(초)
+PREFETCH_SESSION_BUDGET = int(os.getenv("PREFETCH_SESSION_BUDGET", "5"))  # 세션당 추측 GPT 호출 수 상한
+PREFETCH_CLIENT_BUDGET = int(os.getenv("PREFETCH_CLIENT_BUDGET", "200"))  # 클라이언트(API 키/테넌트/주소)당 추측 GPT 호출 수 상한
+PREFETCH_SESSION_WINDOW = float(os.getenv("PREFETCH_SESSION_WINDOW", "3600"))  # 세션/클라이언트 예산이 초기화되는 주기(초)
+PREFETCH_MAX_ENTRIES = int(os.getenv("PREFETCH_MAX_ENTRIES", "256"))  # 프로세스 전체에서 보관하는 prefetch 결과 수
+
+# 이미지 완료 콜백(webhook)
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")  # 페이로드 HMAC-SHA256 서명 키. 비우면 서명하지 않음
+WEBHOOK_ALLOWED_HOSTS = [host for host in os.getenv("WEBHOOK_ALLOWED_HOSTS", "").split(",") if host]  # 비우면 공인 IP 호스트만 허용 (내부 주소 차단)
+WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", "10"))  # 전송 하나의 타임아웃(초)
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "5"))  # 연결 오류/5xx/429 시 최대 시도 횟수
+WEBHOOK_BACKOFF_BASE = float(os.getenv("WEBHOOK_BACKOFF_BASE", "1"))  # 지수 백오프 시작 값(초)
+WEBHOOK_BACKOFF_MAX = float(os.getenv("WEBHOOK_BACKOFF_MAX", "60"))  # 백오프 최대 값(초)
+WEBHOOK_MAX_WORKERS = int(os.getenv("WEBHOOK_MAX_WORKERS", "4"))  # 동시 전송 수
+
+# 이미지 후처리 (원본 JPEG 재인코딩 + 중간 크기 / 썸네일)
+IMAGE_RENDITIONS = {  # 이름 -> 긴 변 픽셀
+    "mid": int(os.getenv("IMAGE_MID_SIZE", "512")),
+    "thumb": int(os.getenv("IMAGE_THUMB_SIZE", "256")),
+}
+IMAGE_RENDITION_FORMAT = os.getenv("IMAGE_RENDITION_FORMAT", "webp")  # webp 또는 avif (지원하지 않으면 webp)
+IMAGE_RENDITION_QUALITY = int(os.getenv("IMAGE_RENDITION_QUALITY", "75"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))  # 원본({order_num}.jpg) 재인코딩 품질
+IMAGE_ENCODE_WORKERS = int(os.getenv("IMAGE_ENCODE_WORKERS", str(min(4, os.cpu_count() or 1))))  # 인코딩 프로세스 수
+IMAGE_MAX_DOWNLOAD_BYTES = int(os.getenv("IMAGE_MAX_DOWNLOAD_BYTES", str(20 * 1024 * 1024)))  # 생성 이미지 다운로드 상한
+IMAGE_CACHE_CONTROL = os.getenv("IMAGE_CACHE_CONTROL", "public, max-age=86400")  # 업로드하는 이미지의 Cache-Control
+
+# 같은 프롬프트로 이미 만든 씬 이미지 재사용 (프롬프트 지문 -> S3 key 인덱스, 적중하면 S3 서버 측 복사)
+IMAGE_DEDUP_ENABLED = os.getenv("IMAGE_DEDUP_ENABLED", "true").lower() == "true"  # false 면 항상 새로 생성
+IMAGE_DEDUP_URL = os.getenv("IMAGE_DEDUP_URL", f"sqlite:///{os.path.join(STATE_DIR, 'image_index.db')}")
+IMAGE_DEDUP_MAXSIZE = int(os.getenv("IMAGE_DEDUP_MAXSIZE", "10000"))  # 최대 항목 수 (LRU 제거)
+IMAGE_DEDUP_TTL = float(os.getenv("IMAGE_DEDUP_TTL", str(7 * 24 * 3600)))  # 항목 유효 시간(초)
+
+# 요청 수락 제어 (utils/admission.py). 제한은 프로세스(워커)마다 따로 적용됩니다.
+# 경로 그룹별 동시 처리 수 / 자리를 기다리는 요청 수 / 클라이언트별 처리 중+대기 중 요청 수
+# 클라이언트 할당량(per_client)은 X-API-Key 또는 X-Tenant-ID 헤더가 있는 요청에만 적용됩니다. 모든 요청이 Spring 백엔드
+# 한 주소에서 오므로, 사용자별로 제한하려면 백엔드가 사용자/테넌트 식별 값을 이 헤더로 전달해야 합니다. 0 이면 적용하지 않음
+ADMISSION_LIMITS = {
+    "storyboards": {
+        "max_in_flight": int(os.getenv("ADMISSION_STORYBOARDS_IN_FLIGHT", "8")),
+        "max_queue": int(os.getenv("ADMISSION_STORYBOARDS_QUEUE", "16")),
+        "per_client": int(os.getenv("ADMISSION_STORYBOARDS_PER_CLIENT", "2")),
+    },
+    "recommend": {
+        "max_in_flight": int(os.getenv("ADMISSION_RECOMMEND_IN_FLIGHT", "16")),
+        "max_queue": int(os.getenv("ADMISSION_RECOMMEND_QUEUE", "32")),
+        "per_client": int(os.getenv("ADMISSION_RECOMMEND_PER_CLIENT", "4")),
+    },
+    "images": {
+        "max_in_flight": int(os.getenv("ADMISSION_IMAGES_IN_FLIGHT", "8")),
+        "max_queue": int(os.getenv("ADMISSION_IMAGES_QUEUE", "16")),
+        "per_client": int(os.getenv("ADMISSION_IMAGES_PER_CLIENT", "2")),
+    },
+}
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))  # 자리를 기다리는 최대 시간(초). 넘으면 503
+ADMISSION_RETRY_AFTER = float(os.getenv("ADMISSION_RETRY_AFTER", "2"))  # 거절 응답 Retry-After 의 최소값(초)
+# GPT 작업을 시작하기 전에 거르는 입력 크기 제한
+REQUEST_MAX_FIELD_CHARS = int(os.getenv("REQUEST_MAX_FIELD_CHARS", "2000"))  # 입력 문자열 하나의 최대 길이
+REQUEST_MAX_IMAGE_URLS = int(os.getenv("REQUEST_MAX_IMAGE_URLS", "20"))  # 요청 하나의 참조 이미지 URL 수
+IMAGE_MAX_SCENES_PER_REQUEST = int(os.getenv("IMAGE_MAX_SCENES_PER_REQUEST", "30"))  # /images 요청 하나의 씬 수
+IMAGE_MAX_QUEUED_SCENES = int(os.getenv("IMAGE_MAX_QUEUED_SCENES", "200"))  # 대기 씬이 이보다 많으면 새 작업을 503 으로 거절
+IMAGE_SCENE_SECONDS = float(os.getenv("IMAGE_SCENE_SECONDS", "20"))  # 씬 하나의 평균 처리 시간 추정값. 위 거절의 Retry-After 계산에 사용
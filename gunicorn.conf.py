@@ -0,0 +1,23 @@
+import os
+
+# 여러 API 워커 프로세스로 실행하는 프로필 (docs/process_model.md 참고)
+#   gunicorn -c gunicorn.conf.py main:app
+#
+# 워커끼리 공유해야 하는 상태의 기본값을 config/runtime.py 를 읽기 전에 지정합니다.
+# (워커는 마스터에서 fork 되어 이미 읽은 설정을 그대로 물려받으므로 순서가 중요합니다. 환경변수가 있으면 그 값을 사용)
+_state_dir = os.getenv("STATE_DIR", ".")
+os.environ.setdefault("RESPONSE_CACHE_URL", f"sqlite:///{os.path.join(_state_dir, 'response_cache.db')}")
+os.environ.setdefault("OPENAI_RATE_LIMIT_SHARE", "workers")
+
+from config.runtime import IMAGE_DRAIN_TIMEOUT, WEB_BIND, WEB_MAX_REQUESTS, WEB_TIMEOUT, WEB_WORKERS  # noqa: E402
+
+bind = WEB_BIND
+workers = WEB_WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = WEB_TIMEOUT
+# 종료/재시작 신호를 받은 워커는 lifespan 종료 단계에서 실행 중인 이미지 생성을 IMAGE_DRAIN_TIMEOUT 까지 기다리므로
+# 강제 종료까지의 시간은 그보다 길게 둡니다.
+graceful_timeout = int(IMAGE_DRAIN_TIMEOUT) + 15
+max_requests = WEB_MAX_REQUESTS
+max_requests_jitter = WEB_MAX_REQUESTS // 10
+keepalive = 5
@@ -1,38 +1,128 @@
+import asyncio
+import importlib
 import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request, status
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-from routers import recommends, storyboards, gpt_images
+from config.runtime import ENABLED_ROUTERS, IMAGE_DRAIN_TIMEOUT, IMAGE_WORKER_MODE
+from utils.admission import Overloaded
+from utils.logging_config import request_id_var, setup_logging, shutdown_logging
+from utils.metrics import REQUEST_LATENCY, render_metrics
+from utils.openai_client import close_openai_client, start_openai_client
+from utils.prefetch import prefetch_store
+from utils.prompts import load_tokenizer
 
-# 로그 설정
-logging.basicConfig(
-    level=logging.INFO,  # 로그 레벨 설정 (DEBUG, INFO, WARNING, ERROR, CRITICAL)
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",  # 로그 출력 형식
-    handlers=[
-        logging.StreamHandler()  # 로그를 콘솔에 출력
-    ],
-)
+# 로그 설정 (JSON 한 줄 로그, 출력은 별도 스레드에서 처리. 레벨/형식은 config/runtime.py 참고)
+setup_logging()
 
 logger = logging.getLogger(__name__)  # 현재 모듈에 맞는 로거 생성
 
-app = FastAPI()
-app.include_router(recommends.router, prefix="/recommend", tags=["recommend"])
-app.include_router(storyboards.router, prefix="/fastapi", tags=["storyboards"])
-# app.include_router(images.router, prefix="/fastapi", tags=["images"])
-app.include_router(gpt_images.router, prefix="/fastapi", tags=["images"])
+# 라우터 이름 -> (모듈, prefix, tags). ENABLED_ROUTERS 에 없는 라우터는 모듈을 import 하지 않으므로
+# 그 라우터만 쓰는 의존성(이미지 라우터의 S3 클라이언트, 작업 저장소, 이미지 색인 등)도 만들어지지 않습니다.
+ROUTERS = {
+    "recommend": ("routers.recommends", "/recommend", ["recommend"]),
+    "storyboards": ("routers.storyboards", "/fastapi", ["storyboards"]),
+    "images": ("routers.gpt_images", "/fastapi", ["images"]),
+}
+
+unknown_routers = set(ENABLED_ROUTERS) - set(ROUTERS)
+if unknown_routers:
+    raise ValueError(f"Unknown ENABLED_ROUTERS: {', '.join(sorted(unknown_routers))} (available: {', '.join(ROUTERS)})")
+routers = {name: importlib.import_module(ROUTERS[name][0]) for name in ENABLED_ROUTERS}
+gpt_images = routers.get("images")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 앱 전체가 공유하는 AsyncOpenAI 클라이언트 생성
+    await start_openai_client()
+    # 토큰 수 계산용 인코딩을 첫 요청 전에 불러 둠 (처음이면 BPE 파일을 내려받음)
+    await asyncio.to_thread(load_tokenizer)
+    if gpt_images is not None:
+        # 작업 저장소와 이미지 색인은 import 시점이 아니라 여기서 엽니다.
+        engine = await asyncio.to_thread(gpt_images.get_engine)
+        await asyncio.to_thread(gpt_images.get_image_index)
+        if IMAGE_WORKER_MODE == "inline":
+            # 작업 저장소에 남아 있던 씬부터 이어서 처리
+            engine.start()
+    yield
+    # 아직 끝나지 않은 추측 호출 취소
+    prefetch_store.close()
+    if gpt_images is not None:
+        # 이미지 라우터가 켜져 있을 때만 필요한 모듈 (httpx 등을 불러오므로 main import 시점에는 불러오지 않음)
+        from utils.image_processing import shutdown_image_processing
+        from utils.webhooks import webhooks
+
+        # 실행 중인 이미지 생성을 IMAGE_DRAIN_TIMEOUT 까지 기다리고, 끝나지 않은 씬은 작업 저장소 대기열로 되돌린 뒤 클라이언트 정리
+        await asyncio.to_thread(engine.shutdown, True, IMAGE_DRAIN_TIMEOUT)
+        await asyncio.to_thread(shutdown_image_processing)
+        # 진행 중인 완료 알림 전송 마무리 (재시도 대기 중인 알림은 포기)
+        await asyncio.to_thread(webhooks.close, True)
+    await close_openai_client()
+    # 큐에 남은 로그 출력
+    shutdown_logging()
+
+
+app = FastAPI(lifespan=lifespan)
+for name, module in routers.items():
+    _, prefix, tags = ROUTERS[name]
+    app.include_router(module.router, prefix=prefix, tags=tags)
+
+
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    # 요청마다 상관관계 ID 를 붙여 같은 요청에서 나온 로그(이미지 워커 스레드 포함)를 묶습니다.
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        request_id_var.reset(token)
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    # 라우트별 요청 지연 기록 (스트리밍 응답은 헤더를 보낼 때까지의 시간)
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        REQUEST_LATENCY.observe(time.perf_counter() - started, method=request.method,
+                                route=route.path if route is not None else "unmatched", status=status_code)
 
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     exc_str = f'{exc}'.replace('\n', ' ').replace('   ', ' ')
-    logging.error(f"{request}: {exc_str}")
+    logger.error("validation error: %s", exc_str, extra={"path": request.url.path})
     content = {'status_code': 10422, 'message': exc_str, 'data': None}
     return JSONResponse(content=content, status_code=status.HTTP_422_UNPROCESSABLE_ENTITY)
 
 
+@app.exception_handler(Overloaded)
+async def overloaded_exception_handler(request: Request, exc: Overloaded):
+    # 수락 제어 거절: 429(클라이언트 할당량 초과) / 503(과부하). GPT 작업은 시작되지 않았습니다.
+    return JSONResponse(content={"detail": f"Server is busy ({exc.reason}), retry later"},
+                        status_code=exc.status_code, headers={"Retry-After": str(exc.retry_after)})
+
+
 @app.get("/")
 async def root():
-    print("Hello World")
     return {"message": "Hello 11World"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    # 일부 지표 콜백이 SQLite 를 조회하므로(캐시 항목 수 등) 이벤트 루프를 막지 않도록 스레드에서 수집
+    return PlainTextResponse(await asyncio.to_thread(render_metrics), media_type="text/plain; version=0.0.4")
@@ -1,18 +1,59 @@
-import uuid
-from threading import Thread
-from typing import List
+import asyncio
+import json
+import logging
+import math
+import threading
+import time
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, HTTPException
-from openai import OpenAI
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from config.settings import OPENAI_API_KEY
-from utils.s3_image import download_image_from_url, upload_to_s3
+from config.runtime import (IMAGE_CACHE_CONTROL, IMAGE_DEDUP_ENABLED, IMAGE_DEDUP_MAXSIZE, IMAGE_DEDUP_TTL,
+                            IMAGE_DEDUP_URL, IMAGE_EVENTS_POLL_INTERVAL, IMAGE_JOB_LEASE_SECONDS, IMAGE_JOB_POLL_INTERVAL,
+                            IMAGE_JOB_RETENTION_SECONDS, IMAGE_JOB_STORE_URL, IMAGE_MAX_DOWNLOAD_BYTES,
+                            IMAGE_MAX_QUEUED_SCENES, IMAGE_MAX_SCENES_PER_REQUEST, IMAGE_MAX_WORKERS,
+                            IMAGE_PER_STORYBOARD_LIMIT, IMAGE_SCENE_MAX_ATTEMPTS, IMAGE_SCENE_SECONDS,
+                            IMAGE_STORYBOARD_DEADLINE, OPENAI_IMAGE_DEADLINE)
+from utils.admission import Overloaded, admission, check_request, client_id_of
+from utils.image_jobs import ImageJobEngine, SceneTask
+from utils.image_processing import guess_content_type, process_image, rendition_key
+from utils.job_store import DEADLINE_ERROR, DONE, FAILED, create_job_store
+from utils.metrics import ERRORS, Counter, Gauge, stage_timer
+from utils.openai_client import get_openai_client, run_from_thread
+from utils.openai_scheduler import DeadlineExceeded, scheduler
+from utils.prompts import build_image_prompt
+from utils.response_cache import create_cache, make_cache_key
+from utils.s3_image import copy_object, download_image_bytes, get_object_metadata, upload_bytes_to_s3, upload_many
+from utils.webhooks import webhooks
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# 이미지 색인과 작업 엔진은 저장소 파일(SQLite)을 열므로 import 시점이 아니라 처음 사용할 때(lifespan / worker.py 시작) 만듭니다.
+_image_index = None
+_engine = None
+_init_lock = threading.Lock()
+
+IMAGE_DEDUP = Counter("image_dedup_lookups_total", "Scene image fingerprint lookups by result", ("result",))
+Gauge("image_dedup_entries", "Entries in the scene image fingerprint index",
+      callback=lambda: _image_index.stats()["size"] if _image_index is not None else 0)
+
+
+def get_image_index():
+    """
+    프롬프트 지문 -> 그 프롬프트로 만든 이미지의 S3 key 색인. 같은 프롬프트의 씬은 DALL·E 를 다시 호출하지 않고 복사합니다.
+    """
+    global _image_index
+    if _image_index is None:
+        with _init_lock:
+            if _image_index is None:
+                _image_index = create_cache(IMAGE_DEDUP_URL, maxsize=IMAGE_DEDUP_MAXSIZE, ttl=IMAGE_DEDUP_TTL,
+                                            name="image_index")
+    return _image_index
+
 
 class ImageGenerationRequest(BaseModel):
     storyboard_id: int  # 스토리보드 ID
@@ -24,12 +65,60 @@ class ImageGenerationRequest(BaseModel):
     companion_count: int  # 동행자 수
     season: str  # 계절
     image_urls: List[str]  # 참조 이미지 URL 목록
+    callback_url: Optional[str] = None  # 완료 알림을 받을 URL (없으면 알림 없음)
+    callback_mode: Literal["scene", "storyboard"] = "storyboard"  # 씬마다 / 스토리보드의 씬이 모두 끝났을 때 한 번
+    fresh: bool = False  # True 면 같은 프롬프트로 만든 이미지가 있어도 새로 생성
+
+
+def reuse_scene_image(fingerprint, s3_key, metadata):
+    """
+    같은 프롬프트 지문으로 이미 만든 이미지가 있으면 원본과 축소본을 s3_key 경로로 서버 측 복사합니다.
+
+    인덱스가 가리키는 원본이 지워졌거나 다른 프롬프트의 이미지로 덮어써졌으면(메타데이터의 지문이 다르면)
+    항목을 지우고 False 를 반환해 새로 생성하게 합니다.
+
+    Args:
+        fingerprint (str): 프롬프트 지문.
+        s3_key (str): 복사할 원본 key.
+        metadata (dict): 복사본에 기록할 메타데이터.
+
+    Returns:
+        bool: 복사로 처리했으면 True.
+    """
+    entry = get_image_index().get(fingerprint)
+    if entry is None:
+        IMAGE_DEDUP.inc(result="miss")
+        return False
+
+    source_key = entry["s3_key"]
+    source_metadata = get_object_metadata(source_key)
+    if source_metadata is None or source_metadata.get("fingerprint") != fingerprint:
+        get_image_index().delete(fingerprint)
+        IMAGE_DEDUP.inc(result="stale")
+        return False
+    if source_key == s3_key:
+        IMAGE_DEDUP.inc(result="hit")
+        return True
+
+    # 업로드와 같은 순서로 축소본을 먼저 복사하고 원본(목록의 마지막)을 마지막에 복사합니다.
+    # job-id 는 업로드할 때처럼 원본에만 기록합니다.
+    source_base, dest_base = source_key.rsplit(".", 1)[0], s3_key.rsplit(".", 1)[0]
+    rendition_metadata = {key: value for key, value in metadata.items() if key != "job-id"}
+    for key, content_type in entry["objects"]:
+        if not copy_object(key, dest_base + key[len(source_base):], content_type=content_type,
+                           metadata=metadata if key == source_key else rendition_metadata,
+                           cache_control=IMAGE_CACHE_CONTROL):
+            IMAGE_DEDUP.inc(result="copy_failed")
+            return False
+    IMAGE_DEDUP.inc(result="hit")
+    logger.info("reused scene image", extra={"s3_key": s3_key, "source": source_key})
+    return True
 
 
 # DALL·E 3를 사용하여 이미지를 생성하고 저장하는 함수
 def generate_and_save_image_dalle(storyboard_id, order_num, scene_description, destination, purpose, companion,
                                   companion_count, season,
-                                  image_urls):
+                                  image_urls, job_id=None, fresh=False, deadline_at=None):
     """
     DALL·E 3 모델을 사용하여 스토리보드 씬 이미지를 생성하고 저장하는 함수입니다.
 
@@ -46,49 +135,121 @@ def generate_and_save_image_dalle(storyboard_id, order_num, scene_description, d
         companion_count (int): 동행자의 수.
         season (str): 여행지 계절
         image_urls (list): 장면의 시각적 요소를 참고할 수 있는 이미지 URL 리스트.
-        save_path (str): 생성된 이미지를 저장할 파일 경로.
+        job_id (str): 작업 ID. S3 메타데이터에 기록해 중단 후 재시도할 때 업로드 여부를 확인합니다.
+        fresh (bool): True 면 같은 프롬프트로 만든 이미지가 있어도 복사하지 않고 새로 생성합니다.
+        deadline_at (float): 스토리보드 기한 (epoch 초). DALL·E 호출은 남은 시간 안에서만 기다리고, 기한이 지나면
+                             업로드하지 않고 DeadlineExceeded 를 발생시킵니다.
 
     Returns:
-        None: 생성된 이미지를 지정된 경로에 저장합니다.
+        str: 원본 크기 JPEG 가 업로드된 S3 key. 축소본은 같은 경로에 {order_num}_mid.webp,
+             {order_num}_thumb.webp (IMAGE_RENDITION_FORMAT=avif 면 .avif) 로 함께 업로드됩니다.
     """
 
-    prompt = f""" 
-        {image_urls}와 {scene_description}에 기반하여, {destination}에서 {purpose}를 목적으로 {companion_count}명의 {companion}과 함께한 {season} 계절의 분위기와 색감을 담은 시네마틱한 이미지
-        """
+    with stage_timer("prompt_build"):
+        prompt = build_image_prompt(scene_description, destination, purpose, companion, companion_count, season,
+                                    image_urls)
+        # 모델 파라미터까지 포함한 프롬프트 지문. 공백 차이는 정규화되어 같은 지문이 됩니다.
+        fingerprint = make_cache_key("dall-e-3", {"prompt": prompt, "size": "1024x1024", "n": 1})
+
+    s3_key = f'images/storyboard/{storyboard_id}/{order_num}.jpg'
+
+    metadata = {"storyboard-id": storyboard_id, "order-num": order_num, "fingerprint": fingerprint}
+    if job_id is not None:
+        metadata["job-id"] = job_id
+    if IMAGE_DEDUP_ENABLED and not fresh and reuse_scene_image(fingerprint, s3_key, metadata):
+        return s3_key
+
+    deadline = OPENAI_IMAGE_DEADLINE
+    if deadline_at is not None:
+        deadline = min(deadline, deadline_at - time.time())
+        if deadline <= 0:
+            raise DeadlineExceeded(DEADLINE_ERROR)
 
-    response = client.images.generate(
-        model="dall-e-3",
-        prompt=prompt,
-        n=1,
-        size="1024x1024",
-    )
+    # 워커 스레드에서 실행되므로 앱 이벤트 루프의 공유 클라이언트로 호출을 넘깁니다.
+    # 429/5xx 는 스케줄러가 기한 안에서 재시도하므로 배치가 느려질 뿐 씬이 빠지지 않습니다.
+    # 스토리보드 기한에 걸리면 호출이 취소되어 워커 스레드가 바로 풀려납니다.
+    try:
+        response = run_from_thread(scheduler.call(
+            "dall-e-3",
+            lambda: get_openai_client().images.generate(
+                model="dall-e-3",
+                prompt=prompt,
+                n=1,
+                size="1024x1024",
+            ),
+            deadline=deadline,
+        ), timeout=deadline + 5)
+    except DeadlineExceeded:
+        if deadline < OPENAI_IMAGE_DEADLINE:
+            raise DeadlineExceeded(DEADLINE_ERROR)
+        raise
 
     image_url = response.data[0].url
 
-    # 이미지 다운로드 및 저장
-    # UUID를 사용해 고유한 파일 이름 생성
-    unique_id = str(uuid.uuid4())
-    local_image_path = f'temp_image_{order_num}_{unique_id}.jpg'
-    download_image_from_url(image_url, local_image_path)
-    upload_to_s3(local_image_path, f'images/storyboard/{storyboard_id}/{order_num}.jpg')
+    with stage_timer("image_download"):
+        data = download_image_bytes(image_url, IMAGE_MAX_DOWNLOAD_BYTES)
+
+    # 한 번만 디코딩해 원본 크기 JPEG 와 축소본(중간 크기, 썸네일)을 만듭니다. 인코딩은 프로세스 풀에서 실행됩니다.
+    try:
+        with stage_timer("image_encode"):
+            fmt, renditions = process_image(data)
+    except Exception as e:
+        # 후처리에 실패하면 받은 이미지를 그대로 원본 key 에 올립니다.
+        ERRORS.inc(cause="image_encode")
+        logger.warning("image post-processing failed: %s", e, extra={"s3_key": s3_key})
+        fmt, renditions = None, [(None, guess_content_type(data), data)]
 
-    return image_url
+    if deadline_at is not None and time.time() > deadline_at:
+        # 이미 failed 로 처리된 씬이므로 올려도 결과가 기록되지 않습니다.
+        raise DeadlineExceeded(DEADLINE_ERROR)
 
+    # 축소본을 먼저 올리고 원본은 마지막에 올립니다. 원본의 job-id 메타데이터가 모든 렌디션이 올라갔다는 표시가 되어
+    # 중단 후 재시도할 때 원본만 확인하면 됩니다. 축소본에는 job-id 를 기록하지 않습니다.
+    rendition_metadata = {key: value for key, value in metadata.items() if key != "job-id"}
+    items = [{
+        "s3_file": rendition_key(s3_key, name, fmt),
+        "body": body,
+        "content_type": content_type,
+        "metadata": rendition_metadata,
+        "cache_control": IMAGE_CACHE_CONTROL,
+    } for name, content_type, body in renditions if name is not None]
+    failed = [key for key, ok in upload_many(items).items() if not ok]
+    if failed:
+        raise RuntimeError(f"S3 upload failed: {', '.join(failed)}")
 
-def generate_images_multithreaded(requests: List[ImageGenerationRequest], max_threads: int = 7) -> List[str]:
+    _, content_type, body = renditions[0]
+    if not upload_bytes_to_s3(body, s3_key, content_type=content_type, metadata=metadata,
+                              cache_control=IMAGE_CACHE_CONTROL):
+        raise RuntimeError(f"S3 upload failed: {s3_key}")
+
+    # 다음에 같은 프롬프트가 오면 복사할 수 있도록 업로드한 객체 목록(원본이 마지막)을 기록합니다.
+    objects = [(item["s3_file"], item["content_type"]) for item in items] + [(s3_key, content_type)]
+    get_image_index().set(fingerprint, {"s3_key": s3_key, "objects": objects})
+
+    return s3_key
+
+
+def generate_scene_image(scene: SceneTask) -> str:
     """
-    generate_and_save_image_dalle 함수를 멀티스레드로 처리하는 함수.
+    작업 엔진의 워커 스레드에서 씬 하나를 처리하는 함수.
+
+    중단되었다가 다시 실행되는 씬은 같은 작업으로 이미 업로드된 이미지가 있는지 먼저 확인해
+    이미지를 다시 생성(과금)하지 않습니다.
 
     Args:
-        requests (List[ImageGenerationRequest]): 이미지 생성 요청 리스트
-        max_threads (int): 동시에 실행할 최대 스레드 수.
+        scene (SceneTask): 씬 작업. scene.request 에 ImageGenerationRequest 가 들어 있습니다.
 
     Returns:
-        List[str]: 생성된 이미지 URL 리스트.
+        str: 이미지가 업로드된 S3 key.
     """
-    results = []
+    request = scene.request
+    if scene.attempts > 1:
+        s3_key = f'images/storyboard/{request.storyboard_id}/{request.order_num}.jpg'
+        metadata = get_object_metadata(s3_key)
+        if metadata is not None and metadata.get("job-id") == scene.job_id:
+            return s3_key
 
-    def task(request):
+    try:
         return generate_and_save_image_dalle(
             storyboard_id=request.storyboard_id,
             order_num=request.order_num,
@@ -98,25 +259,206 @@ def generate_images_multithreaded(requests: List[ImageGenerationRequest], max_th
             companion=request.companion,
             companion_count=request.companion_count,
             season=request.season,
-            image_urls=request.image_urls
+            image_urls=request.image_urls,
+            job_id=scene.job_id,
+            fresh=request.fresh,
+            deadline_at=scene.deadline_at
         )
+    except Exception:
+        ERRORS.inc(cause="image_scene")
+        raise
+
 
-    threads = [
-        Thread(target=task, args=(req,)) for req in requests
-    ]
-    [thread.start() for thread in threads]
+def notify_scene_finished(scene: SceneTask):
+    """
+    씬 결과가 저장소에 기록된 뒤 호출되어 요청의 callback_url 로 완료 알림을 보냅니다.
+
+    callback_mode 가 "scene" 이면 씬마다 scene.completed 를, "storyboard" 이면 작업 안에서 같은 스토리보드의 씬이
+    모두 끝났을 때 storyboard.completed 를 한 번 보냅니다. 여러 워커가 동시에 마지막 씬을 끝내도
+    저장소에 알림 여부를 기록하므로 중복 전송되지 않습니다.
+    """
+    request = scene.request
+    if request is None or not request.callback_url:
+        return
+
+    if request.callback_mode == "scene":
+        webhooks.send(request.callback_url, "scene.completed", {
+            "job_id": scene.job_id,
+            "storyboard_id": scene.storyboard_id,
+            **scene.to_dict(),
+        })
+        return
+
+    job = get_engine().get_job(scene.job_id)
+    scenes = [item for item in job.scenes if item.storyboard_id == scene.storyboard_id]
+    if not all(item.status in (DONE, FAILED) for item in scenes):
+        return
+    if not get_engine().mark_notified(scene.job_id, scene.storyboard_id):
+        return
+    webhooks.send(request.callback_url, "storyboard.completed", {
+        "job_id": scene.job_id,
+        "storyboard_id": scene.storyboard_id,
+        "status": DONE if all(item.status == DONE for item in scenes) else FAILED,
+        "scenes": [item.to_dict() for item in scenes],
+    })
+
+
+def get_engine():
+    """
+    전체 / 스토리보드별 동시 실행 수가 제한된 이미지 생성 작업 엔진. 처음 호출할 때 작업 저장소를 열어 한 번만 만듭니다.
+    작업 상태는 저장소에 기록되며, 씬 실행은 IMAGE_WORKER_MODE 에 따라 API 프로세스 또는 worker.py 가 맡습니다.
+    """
+    global _engine
+    if _engine is None:
+        with _init_lock:
+            if _engine is None:
+                _engine = ImageJobEngine(
+                    worker=generate_scene_image,
+                    store=create_job_store(IMAGE_JOB_STORE_URL),
+                    request_parser=ImageGenerationRequest.parse_obj,
+                    max_workers=IMAGE_MAX_WORKERS,
+                    per_storyboard_limit=IMAGE_PER_STORYBOARD_LIMIT,
+                    lease_seconds=IMAGE_JOB_LEASE_SECONDS,
+                    max_attempts=IMAGE_SCENE_MAX_ATTEMPTS,
+                    retention_seconds=IMAGE_JOB_RETENTION_SECONDS,
+                    poll_interval=IMAGE_JOB_POLL_INTERVAL,
+                    deadline=IMAGE_STORYBOARD_DEADLINE,
+                    on_finish=notify_scene_finished,
+                )
+    return _engine
+
+
+def _engine_stats():
+    return _engine.stats() if _engine is not None else {"queued": 0, "running": 0, "jobs": 0}
+
+
+# 작업 엔진 상태 지표 (엔진을 만들기 전에는 0)
+Gauge("image_scenes", "Image scenes in the job engine by state", ("state",),
+      callback=lambda: {(state,): count for state, count in _engine_stats().items() if state != "jobs"})
+Gauge("image_jobs_retained", "Image jobs whose status is kept in the job store", callback=lambda: _engine_stats()["jobs"])
+
+
+class SceneStatusResponse(BaseModel):
+    order_num: int  # 씬 순서
+    status: str  # queued / running / done / failed
+    latency: Optional[float]  # 생성에 걸린 시간(초)
+    s3_key: Optional[str]  # 업로드된 S3 key
+    error: Optional[str]  # 실패 사유
+
+
+class ImageJobResponse(BaseModel):
+    job_id: str  # 작업 ID
+    status: str  # queued / running / done / failed
+    storyboard_ids: List[int]  # 작업에 포함된 스토리보드 ID
+    scenes: List[SceneStatusResponse]  # 씬별 상태
+
+
+def backlog_retry_after(queued):
+    # 대기 씬이 IMAGE_MAX_QUEUED_SCENES 의 절반으로 줄어들 때까지 걸리는 시간(초)
+    excess = max(1, queued - IMAGE_MAX_QUEUED_SCENES // 2)
+    return max(1, math.ceil(excess / IMAGE_MAX_WORKERS * IMAGE_SCENE_SECONDS))
 
 
 @router.post("/images")
-def generate_images_endpoint(request: List[ImageGenerationRequest]):
-    print("Request:", request)
+async def generate_images_endpoint(request: List[ImageGenerationRequest], http_request: Request,
+                                   idempotency_key: Optional[str] = Header(None), deadline: Optional[float] = None):
     """
-        클라이언트 요청을 빠르게 응답하고, 스레드를 생성하여 백그라운드 작업 실행.
+        요청을 작업으로 등록하고 작업 ID를 바로 반환합니다. 이미지는 작업 엔진의 워커 풀에서 order_num 순서로 생성됩니다.
+        Idempotency-Key 헤더가 같은 요청을 다시 보내면 새 작업을 만들지 않고 기존 작업 ID를 반환합니다.
+        deadline(초)이 지나도 끝나지 않은 씬은 failed 로 처리됩니다. 생략하면 IMAGE_STORYBOARD_DEADLINE, 0 이면 기한 없음.
+        진행 상황은 /images/jobs/{job_id}/events 에서 씬이 끝날 때마다 받을 수 있습니다.
+        대기 중인 씬이 IMAGE_MAX_QUEUED_SCENES 를 넘으면 작업을 등록하지 않고 503 과 Retry-After 를 반환합니다.
     """
-    # 스레드 생성
+    if not request:
+        raise HTTPException(status_code=400, detail="No scenes to generate")
+    if len(request) > IMAGE_MAX_SCENES_PER_REQUEST:
+        raise HTTPException(status_code=400, detail=f"Too many scenes (max {IMAGE_MAX_SCENES_PER_REQUEST})")
+    if deadline is not None and deadline < 0:
+        raise HTTPException(status_code=400, detail="deadline must not be negative")
+    for scene in request:
+        check_request(required={"scene_description": scene.scene_description, "destination": scene.destination},
+                      optional={"purpose": scene.purpose, "companion": scene.companion, "season": scene.season},
+                      image_urls=scene.image_urls, counts={"companion_count": scene.companion_count})
+        if scene.callback_url:
+            try:
+                # 허용 목록이 없으면 호스트를 DNS 로 해석하므로 이벤트 루프를 막지 않도록 스레드에서 실행
+                await asyncio.to_thread(webhooks.validate_url, scene.callback_url)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+    controller = admission["images"]
     try:
-        generate_images_multithreaded(requests=request)
+        async with controller.admit(client_id_of(http_request)):
+            # 대기열이 길면 새 작업의 씬은 기한 안에 끝나기 어려우므로 받지 않습니다.
+            # 저장소 조회/기록(SQLite)이 이벤트 루프를 막지 않도록 스레드에서 실행
+            queued = (await asyncio.to_thread(get_engine().stats))["queued"]
+            if queued + len(request) > IMAGE_MAX_QUEUED_SCENES:
+                controller.reject("backlog", retry_after=backlog_retry_after(queued))
+            job_id = await asyncio.to_thread(get_engine().submit, request, idempotency_key, deadline)
 
-        return {"message": "Image generation request received. Processing in the background."}
+        return {"message": "Image generation request received. Processing in the background.", "job_id": job_id}
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Batch image generation failed: {str(e)}")
+
+
+@router.get("/images/jobs/{job_id}", response_model=ImageJobResponse)
+async def get_image_job(job_id: str):
+    job = await asyncio.to_thread(get_engine().get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job.to_dict()
+
+
+@router.get("/images/jobs/{job_id}/scenes/{order_num}", response_model=SceneStatusResponse)
+async def get_image_job_scene(job_id: str, order_num: int):
+    job = await asyncio.to_thread(get_engine().get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    scene = job.get_scene(order_num)
+    if scene is None:
+        raise HTTPException(status_code=404, detail=f"Scene not found: {order_num}")
+    return scene.to_dict()
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+# 진행 이벤트 스트림 (Server-Sent Events)
+# 씬이 끝날 때마다 scene 이벤트를, 작업의 모든 씬이 끝나면 job 이벤트를 보내고 스트림을 닫습니다.
+# 저장소를 주기적으로 확인하므로 씬을 실행하는 프로세스(API 또는 worker.py)와 상관없이 동작합니다.
+@router.get("/images/jobs/{job_id}/events")
+async def stream_image_job_events(job_id: str, http_request: Request):
+    job = await asyncio.to_thread(get_engine().get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+
+    async def events():
+        sent = set()  # 이미 보낸 끝난 씬 (storyboard_id, order_num)
+        last_sent = time.monotonic()
+        current = job
+        while True:
+            for scene in sorted(current.scenes, key=lambda item: (item.storyboard_id, item.order_num)):
+                key = (scene.storyboard_id, scene.order_num)
+                if scene.status in (DONE, FAILED) and key not in sent:
+                    sent.add(key)
+                    last_sent = time.monotonic()
+                    yield _sse("scene", {"job_id": job_id, "storyboard_id": scene.storyboard_id, **scene.to_dict()})
+            if current.finished:
+                yield _sse("job", current.to_dict())
+                return
+            if time.monotonic() - last_sent > 15:
+                # 프록시가 유휴 연결을 끊지 않도록 주석 줄을 보냅니다.
+                last_sent = time.monotonic()
+                yield ": keepalive\n\n"
+            await asyncio.sleep(IMAGE_EVENTS_POLL_INTERVAL)
+            if await http_request.is_disconnected():
+                return
+            current = await asyncio.to_thread(get_engine().get_job, job_id)
+            if current is None:
+                return
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
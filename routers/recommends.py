@@ -1,44 +1,54 @@
+import asyncio
+import logging
 import re
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException, Body
-from openai import OpenAI
+from fastapi import APIRouter, HTTPException, Body, Request
 from pydantic import BaseModel
 
-from config.settings import OPENAI_API_KEY
+from config.runtime import (ADMISSION_LIMITS, OPENAI_CHAT_DEADLINE, OPENAI_MAX_TOKENS, RECOMMEND_BATCH_CONCURRENCY,
+                            RECOMMEND_BATCH_MAX_ITEMS, PREFETCH_TOP_K, RESPONSE_CACHE_MAXSIZE, RESPONSE_CACHE_TTL,
+                            RESPONSE_CACHE_URL)
+from utils.admission import Overloaded, admission, check_request, client_id_of
+from utils.logging_config import truncate
+from utils.metrics import Gauge, stage_timer
+from utils.openai_client import get_openai_client
+from utils.openai_scheduler import estimate_tokens, scheduler
+from utils.prefetch import prefetch_store, requester_id_of, session_id_of
+from utils.prompts import INTRO_OUTRO_INSTRUCTIONS, TITLE_INSTRUCTIONS, build_messages
+from utils.response_cache import create_cache, make_cache_key
+from utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+GPT_MODEL = "gpt-4o"
 
+# 제목 / 인트로·아웃트로 추천 결과 캐시
+response_cache = create_cache(RESPONSE_CACHE_URL, maxsize=RESPONSE_CACHE_MAXSIZE, ttl=RESPONSE_CACHE_TTL,
+                              name="recommend")
+
+# 같은 입력으로 동시에 들어온 GPT 호출 합치기 (캐시를 끈 경우에도 동작)
+inflight = SingleFlight()
+
+# 캐시 크기 조정을 위한 지표 (hit/miss 는 response_cache_lookups_total{cache="recommend"})
+Gauge("response_cache_entries", "Entries in the recommendation cache", callback=lambda: response_cache.stats()["size"])
+
+
+# 제목 추천 프롬프트 구성
+def build_title_messages(destination, purpose, companions, companion_count, season, description):
+    return build_messages([TITLE_INSTRUCTIONS], [
+        ("여행지", destination),
+        ("여행지 특성", description),
+        ("여행 목적", purpose),
+        ("여행지 계절", season),
+        ("동행인", f"{companions} ({companion_count}명)"),
+    ], request_text="위 정보에 기반하여 여행 영상의 제목을 5가지 추천해줘.")
 
-# GPT를 이용해 제목 추천
-def gpt_select_title(destination, purpose, companions, companion_count, season, description):
-    prompt = f"여행지: {destination}, 여행지 특성: {description}, 여행 목적: {purpose}, 여행지 계절: {season}, 동행인: {companions} ({companion_count}명)\n"
-    prompt += "위 정보에 기반하여 여행 영상의 제목을 5가지 추천해줘."
-
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content":
-                "### 지시사항 ###\n"
-                "당신은 여행 관련 제목을 추천하는 전문가입니다. 각 제목은 매력적이고 주제를 잘 반영해야 합니다. 작업을 잘 수행하면 보상이 주어질 것입니다.\n\n"
-                "### 작성 형식 ###\n"
-                "항목순서. 여기에 제목을 기입해주세요.\n\n"
-                "예시:\n"
-                "1. [제목 예시]\n"
-                "2. [제목 예시]\n"
-                "3. [제목 예시]\n"
-                "4. [제목 예시]\n"
-                "5. [제목 예시]\n\n"
-                "### 주의사항 ###\n"
-                "정중한 표현은 피하고, 간결하고 명확하게 작성하세요. 제목은 자연스럽게 사람과 같은 스타일로 작성되어야 하며, 본래의 형식을 유지하세요."
-             },
-            {"role": "user", "content": prompt}
-        ]
-    )
 
-    content = response.choices[0].message.content
+# 제목 추천 응답 파싱
+def parse_titles(content):
     # titles = re.split(r'\d+\.\s', content)[1:]  # 숫자.로 시작하는 패턴 기준으로 분리, 첫 빈 항목 제거
     titles = [title.strip() for title in re.split(r'\d+\.\s', content)[1:]]  # 숫자.로 시작하는 패턴 기준으로 분리, 첫 빈 항목 제거 및 공백 제거
 
@@ -48,41 +58,31 @@ def gpt_select_title(destination, purpose, companions, companion_count, season,
     return titles
 
 
-# GPT를 이용해 인트로/아웃트로 추천
-def gpt_select_intro_outro(title):
-    prompt = f"여행 영상 제목: {title}\n"
-    prompt += "이 제목을 기반으로 인트로와 아웃트로를 5가지 추천해줘."
-
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content":
-                "당신은 여행 영상 스토리보드를 위한 인트로와 아웃트로를 추천하는 전문가입니다. 각 인트로와 아웃트로는 영상의 분위기를 잘 반영해야 합니다. 올바르게 작성된 경우 보상을 받을 것입니다.\n\n"
-                "예시:\n"
-                "1. 새로운 시작: 첫 장면은 자연의 아름다움을 강조하며 화면이 서서히 밝아집니다.\n\n"
-                "### 주의사항 ###\n"
-                "정중한 표현은 피하고, 간결하고 명확하게 작성하세요.\n"
-                "### 작성 형식 ###\n"
-                "항목순서. [인트로/아웃트로 제목]: [설명]\n"
-                "인트로:\n"
-                "1. \n"
-                "2. \n"
-                "3. \n"
-                "4. \n"
-                "5. \n\n"
-                "아웃트로:\n"
-                "1. \n"
-                "2. \n"
-                "3. \n"
-                "4. \n"
-                "5. \n\n"
-                "작업을 잘 수행하면 보상을 받을 수 있습니다."
-             },
-            {"role": "user", "content": prompt}
-        ]
+# GPT를 이용해 제목 추천
+async def gpt_select_title(destination, purpose, companions, companion_count, season, description):
+    with stage_timer("prompt_build"):
+        messages = build_title_messages(destination, purpose, companions, companion_count, season, description)
+
+    response = await scheduler.call(
+        GPT_MODEL,
+        lambda: get_openai_client().chat.completions.create(model=GPT_MODEL, messages=messages,
+                                                            max_tokens=OPENAI_MAX_TOKENS["titles"]),
+        deadline=OPENAI_CHAT_DEADLINE,
+        estimated_tokens=estimate_tokens(messages, max_tokens=OPENAI_MAX_TOKENS["titles"]),
     )
 
-    content = response.choices[0].message.content
+    with stage_timer("parse"):
+        return parse_titles(response.choices[0].message.content)
+
+
+# 인트로/아웃트로 추천 프롬프트 구성
+def build_intro_outro_messages(title):
+    return build_messages([INTRO_OUTRO_INSTRUCTIONS], [("여행 영상 제목", title)],
+                          request_text="이 제목을 기반으로 인트로와 아웃트로를 5가지 추천해줘.")
+
+
+# 인트로/아웃트로 추천 응답 파싱
+def parse_intro_outro(content):
     sections = content.split("\n\n아웃트로:")
     intro_section = sections[0].replace("인트로:", "").strip()
     outro_section = sections[1].strip() if len(sections) > 1 else ""
@@ -99,6 +99,92 @@ def gpt_select_intro_outro(title):
     return intros, outros
 
 
+# GPT를 이용해 인트로/아웃트로 추천
+async def gpt_select_intro_outro(title):
+    with stage_timer("prompt_build"):
+        messages = build_intro_outro_messages(title)
+
+    response = await scheduler.call(
+        GPT_MODEL,
+        lambda: get_openai_client().chat.completions.create(model=GPT_MODEL, messages=messages,
+                                                            max_tokens=OPENAI_MAX_TOKENS["intro_outro"]),
+        deadline=OPENAI_CHAT_DEADLINE,
+        estimated_tokens=estimate_tokens(messages, max_tokens=OPENAI_MAX_TOKENS["intro_outro"]),
+    )
+
+    with stage_timer("parse"):
+        return parse_intro_outro(response.choices[0].message.content)
+
+
+# 캐시를 거친 제목 추천. fresh=True 이면 캐시를 읽지 않고 새로 생성한 결과로 덮어씁니다.
+# 캐시에 없으면 같은 입력으로 진행 중인 호출에 합류합니다.
+async def get_titles(destination, purpose, companions, companion_count, season, description, fresh=False):
+    key = make_cache_key("titles", {
+        "model": GPT_MODEL,
+        "max_tokens": OPENAI_MAX_TOKENS["titles"],
+        "destination": destination,
+        "purpose": purpose,
+        "companions": companions,
+        "companion_count": companion_count,
+        "season": season,
+        "description": description,
+    })
+    titles = None if fresh else await response_cache.aget(key)
+    if titles is not None:
+        return titles
+
+    async def generate():
+        generated = await gpt_select_title(destination, purpose, companions, companion_count, season, description)
+        await response_cache.aset(key, generated)
+        return generated
+
+    return await inflight.do(key, generate)
+
+
+# 캐시를 거친 인트로/아웃트로 추천. fresh=True 이면 캐시를 읽지 않고 새로 생성한 결과로 덮어씁니다.
+# 캐시에 없으면 같은 입력으로 진행 중인 호출에 합류합니다.
+# 미리 시작해 둔 호출(prefetch_intro_outro)이 있으면 그 결과를 사용합니다.
+async def get_intro_outro(title, fresh=False):
+    key = intro_outro_key(title)
+    if fresh:
+        return await inflight.do(key, lambda: generate_intro_outro(key, title))
+    prefetched = await prefetch_store.take(key)
+    if prefetched is not None:
+        return prefetched
+    cached = await response_cache.aget(key)
+    if cached is not None:
+        return cached[0], cached[1]
+
+    return await inflight.do(key, lambda: generate_intro_outro(key, title))
+
+
+def intro_outro_key(title):
+    return make_cache_key("iotros", {
+        "model": GPT_MODEL,
+        "max_tokens": OPENAI_MAX_TOKENS["intro_outro"],
+        "title": title,
+    })
+
+
+async def generate_intro_outro(key, title):
+    generated = await gpt_select_intro_outro(title)
+    await response_cache.aset(key, list(generated))
+    return generated
+
+
+# 추천된 제목 중 앞쪽 PREFETCH_TOP_K 개의 인트로/아웃트로 생성을 백그라운드에서 미리 시작합니다.
+# 이미 캐시에 있는 제목은 건너뛰고, 세션/클라이언트 예산을 넘으면 시작하지 않습니다.
+# 추측 호출도 추천 수락 제어 자리를 하나씩 쓰며, 자리가 바로 나지 않으면(과부하) 시작하지 않습니다.
+async def prefetch_intro_outro(session_id, requester_id, client_id, titles):
+    for title in titles[:PREFETCH_TOP_K]:
+        key = intro_outro_key(title)
+        if await response_cache.acontains(key):
+            continue
+        prefetch_store.schedule(session_id, key,
+                                lambda key=key, title=title: inflight.do(key, lambda: generate_intro_outro(key, title)),
+                                client_id=requester_id, acquire=lambda: admission["recommend"].try_acquire(client_id))
+
+
 class TitleRequest(BaseModel):
     destination: str  # 여행지명
     description: str  # 여행지 설명
@@ -117,29 +203,141 @@ class IntroOutroResponse(BaseModel):
     outros: List[str]  # 추천된 아웃트로 목록
 
 
+def check_title_request(request: TitleRequest):
+    # 수락 제어 대기열에 들어가기 전에 빈 값 / 너무 긴 입력을 400 으로 거릅니다.
+    check_request(required={"destination": request.destination},
+                  optional={"description": request.description, "purpose": request.purpose,
+                            "companions": request.companions, "season": request.season},
+                  counts={"companion_count": request.companion_count})
+
+
+# prefetch=true 이면 응답 후 사용자가 고를 가능성이 높은 제목의 인트로/아웃트로를 미리 생성합니다.
 @router.post("/titles")
-def recommend_title(request: TitleRequest) -> List[str]:
+async def recommend_title(request: TitleRequest, http_request: Request, fresh: bool = False,
+                          prefetch: bool = False) -> List[str]:
+    check_title_request(request)
     try:
-        # 인자값 잘 받았는지 console에 출력하고 싶음.
-        print(request.dict())
-        titles = gpt_select_title(
-            destination=request.destination,
-            purpose=request.purpose,
-            companions=request.companions,
-            companion_count=request.companion_count,
-            season=request.season,
-            description=request.description
-        )
+        # 요청 본문은 DEBUG 레벨에서 길이를 제한해 기록
+        logger.debug("title request: %s", truncate(request.dict()))
+        async with admission["recommend"].admit(client_id_of(http_request)):
+            titles = await get_titles(
+                destination=request.destination,
+                purpose=request.purpose,
+                companions=request.companions,
+                companion_count=request.companion_count,
+                season=request.season,
+                description=request.description,
+                fresh=fresh
+            )
+        if prefetch:
+            await prefetch_intro_outro(session_id_of(http_request), requester_id_of(http_request),
+                                       client_id_of(http_request), titles)
         return titles
+    except Overloaded:
+        raise
     except Exception as e:
-        print("Error occurred: ", e)
+        logger.exception("title recommendation failed")
         raise HTTPException(status_code=500, detail=f"Error Occured : {str(e)})")
 
 
 @router.post("/iotros")
-def recommend_intro_outro(title: str = Body(...)) -> IntroOutroResponse:
+async def recommend_intro_outro(http_request: Request, title: str = Body(...),
+                                fresh: bool = False) -> IntroOutroResponse:
+    check_request(required={"title": title})
     try:
-        intros, outros = gpt_select_intro_outro(title=title)
+        async with admission["recommend"].admit(client_id_of(http_request)):
+            intros, outros = await get_intro_outro(title=title, fresh=fresh)
         return IntroOutroResponse(intros=intros, outros=outros)
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+class BatchRecommendRequest(BaseModel):
+    titles: List[TitleRequest] = []  # 제목 추천을 받을 여행 정보 목록
+    iotros: List[str] = []  # 인트로/아웃트로 추천을 받을 제목 목록
+
+
+class TitleBatchResult(BaseModel):
+    titles: List[str] = []  # 추천된 제목 목록
+    error: Optional[str] = None  # 실패한 경우 오류 메시지
+
+
+class IntroOutroBatchResult(BaseModel):
+    title: str  # 요청한 제목
+    intros: List[str] = []  # 추천된 인트로 목록
+    outros: List[str] = []  # 추천된 아웃트로 목록
+    error: Optional[str] = None  # 실패한 경우 오류 메시지
+
+
+class BatchRecommendResponse(BaseModel):
+    titles: List[TitleBatchResult]  # 요청한 순서대로의 제목 추천 결과
+    iotros: List[IntroOutroBatchResult]  # 요청한 순서대로의 인트로/아웃트로 추천 결과
+
+
+# 여러 제목 / 인트로·아웃트로 추천을 한 번의 요청으로 처리합니다.
+# 항목마다 캐시와 진행 중인 호출 합치기를 그대로 거치고, GPT 호출은 최대 RECOMMEND_BATCH_CONCURRENCY 개씩 동시에 보냅니다.
+# 한 항목이 실패해도 나머지 결과는 반환하고, 실패한 항목에는 error 를 채웁니다.
+# 수락 제어는 항목마다 자리 하나를 쓰므로 일괄 요청도 단건 요청과 같은 클라이언트 할당량을 따릅니다.
+# 항목 하나라도 거절되면 나머지 항목을 취소하고 요청 전체를 429/503 으로 거절합니다.
+@router.post("/batch")
+async def recommend_batch(request: BatchRecommendRequest, http_request: Request,
+                          fresh: bool = False) -> BatchRecommendResponse:
+    if not request.titles and not request.iotros:
+        raise HTTPException(status_code=400, detail="No items to recommend")
+    if len(request.titles) + len(request.iotros) > RECOMMEND_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Too many items (max {RECOMMEND_BATCH_MAX_ITEMS})")
+    for item in request.titles:
+        check_title_request(item)
+    check_request(required={f"iotros[{i}]": title for i, title in enumerate(request.iotros)})
+
+    controller = admission["recommend"]
+    client_id = client_id_of(http_request)
+    # 요청 하나가 동시에 잡는 자리가 클라이언트 할당량을 넘으면 스스로 429 를 받으므로 할당량 이하로 맞춥니다.
+    per_client = ADMISSION_LIMITS["recommend"]["per_client"]
+    semaphore = asyncio.Semaphore(min(RECOMMEND_BATCH_CONCURRENCY, per_client) if per_client
+                                  else RECOMMEND_BATCH_CONCURRENCY)
+
+    async def title_item(item):
+        async with semaphore, controller.admit(client_id):
+            try:
+                titles = await get_titles(
+                    destination=item.destination,
+                    purpose=item.purpose,
+                    companions=item.companions,
+                    companion_count=item.companion_count,
+                    season=item.season,
+                    description=item.description,
+                    fresh=fresh
+                )
+                return TitleBatchResult(titles=titles)
+            except Exception as e:
+                logger.warning("batch title recommendation failed: %s", e)
+                return TitleBatchResult(error=str(e))
+
+    async def iotro_item(title):
+        async with semaphore, controller.admit(client_id):
+            try:
+                intros, outros = await get_intro_outro(title=title, fresh=fresh)
+                return IntroOutroBatchResult(title=title, intros=intros, outros=outros)
+            except Exception as e:
+                logger.warning("batch intro/outro recommendation failed: %s", e)
+                return IntroOutroBatchResult(title=title, error=str(e))
+
+    tasks = [asyncio.ensure_future(coro) for coro in (*(title_item(item) for item in request.titles),
+                                                      *(iotro_item(title) for title in request.iotros))]
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        # 거절(Overloaded)이나 연결 끊김으로 끝나면 아직 진행 중인 항목의 GPT 호출과 대기를 취소합니다.
+        for task in tasks:
+            task.cancel()
+        raise
+    return BatchRecommendResponse(titles=results[:len(request.titles)], iotros=results[len(request.titles):])
+
+
+# 캐시 크기 조정을 위한 hit/miss 통계
+@router.get("/cache/stats")
+async def cache_stats():
+    return {**(await response_cache.astats()), "prefetch": prefetch_store.stats()}
@@ -1,119 +1,172 @@
-from typing import List
+import json
+import logging
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, HTTPException
-from openai import OpenAI
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 
-from config.settings import OPENAI_API_KEY
-
-client = OpenAI(api_key=OPENAI_API_KEY)
+from config.runtime import OPENAI_CHAT_DEADLINE, OPENAI_MAX_TOKENS
+from utils.admission import AdmittedStreamingResponse, Overloaded, admission, check_request, client_id_of
+from utils.logging_config import sampled, truncate
+from utils.metrics import ERRORS, record_usage, stage_timer
+from utils.openai_client import get_openai_client
+from utils.openai_scheduler import estimate_tokens, scheduler
+from utils.prefetch import prefetch_store, requester_id_of, session_id_of
+from utils.prompts import (STORYBOARD_EDIT_INSTRUCTIONS, STORYBOARD_INSTRUCTIONS, STORYBOARD_JSON_INSTRUCTIONS,
+                           build_messages, compact_urls)
+from utils.response_cache import make_cache_key
+from utils.singleflight import SingleFlight
+from utils.storyboard_parser import (SCENE_SCHEMA, ParseResult, StoryboardStreamParser, parse_storyboard_text,
+                                     parse_structured_storyboard)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+GPT_MODEL = "gpt-4o"
+MAX_TOKENS = OPENAI_MAX_TOKENS["storyboard"]
+
+# 같은 입력으로 동시에 들어온 스토리보드 생성 합치기
+inflight = SingleFlight()
+
+
+def warn_if_truncated(finish_reason, max_tokens=MAX_TOKENS):
+    # max_tokens 에 걸려 응답이 잘리면 마지막 씬이 빠지거나 형식이 어긋날 수 있습니다.
+    if finish_reason == "length":
+        ERRORS.inc(cause="truncated")
+        logger.warning("storyboard response hit max_tokens", extra={"max_tokens": max_tokens})
+
+
+# 스토리보드 생성 프롬프트 구성
+# 고정 지시사항(과 JSON 모드 지시사항)을 앞에, 요청마다 바뀌는 여행 정보를 마지막 user 메시지에 둡니다.
+def build_storyboard_messages(destination, purpose, companions, companion_count, season, title, intro, outro,
+                              description, image_urls, mode="text"):
+    instructions = [STORYBOARD_INSTRUCTIONS]
+    if mode == "json":
+        instructions.append(STORYBOARD_JSON_INSTRUCTIONS)
+    return build_messages(instructions, [
+        ("여행지", destination),
+        ("여행지 특성", description),
+        ("여행 목적", purpose),
+        ("여행지 계절", season),
+        ("동행인", f"{companions} ({companion_count}명)"),
+        ("제목", title),
+        ("인트로", intro),
+        ("아웃트로", outro),
+        ("이미지 URL", compact_urls(image_urls)),
+    ])
+
 
 # GPT를 이용한 스토리보드 생성
-def gpt_generate_storyboard(destination, purpose, companions, companion_count, season, title, intro, outro, description,
-                            image_urls):
-    prompt = f"""
-        ### 지시사항 ###
-        당신은 여행 영상 스토리보드 생성 전문가입니다. 주어진 정보를 바탕으로 적당한 개수의 씬으로 나눠서 스토리보드를 작성해주세요. 스토리보드 작성 시, 각 항목의 지침을 철저히 따르고 정확하게 작성해주세요. 다음의 지시사항을 따르면 팁을 제공할 것입니다.
-        씬을 제외하고는 어떠한 추가적인 내용을 포함하지 말아주세요.
-
-        스토리보드 양식:
-        - scene (여기에 씬 순서를 넣어주세요.) "여기에 씬 제목을 넣어주세요.":
-            1. **영상**: 이 씬에서 어떤 장면이 나오는지 자세히 설명해주세요. (중요: 자연스럽고 사람과 같은 스타일로 서술)
-            2. **화각**: 카메라가 어떤 각도에서 장면을 촬영하는지 설명해주세요. 
-            3. **카메라 무빙**: 카메라가 어떻게 움직이는지, 특별한 촬영 기법이 있다면 설명해주세요. (특정 장비나 기법 언급 없이, 단순히 카메라 움직임에만 집중)
-            4. **구도**: 화면에서 대상이 어떻게 배치되고, 어떤 느낌을 주는지 설명해주세요.
-
-        ### 예시 ###
-        - scene 1 "별과 역사의 시작":
-        1. **영상**: 소백산 천문대의 전경과 주변 자연경관을 보여주는 장면으로 시작. 푸른 하늘 아래 우뚝 서 있는 천문대의 모습과 숲으로 둘러싸인 아름다운 경치를 보여줍니다.
-        2. **화각**: 드론 카메라로 공중에서 천문대와 주변 풍경을 넓게 담습니다.
-        3. **카메라 무빙**: 천문대를 중심으로 둥글게 빙글빙글 돌며 점점 하강해 천문대의 근접 샷으로 이어집니다.
-        4. **구도**: 천문대를 중심으로 하늘과 숲이 좌우 대칭으로 배치되어 있고, 천문대가 하늘을 향해 솟아오른 느낌을 줍니다.
-
-        당신의 작업은 여행지와 인간의 움직임이 조화롭게 어우러지는 영상을 기반으로, 스토리보드 내용의 자연스러운 흐름을 만들어주세요. 
-        여행지의 매력을 돋보이게 하고, 여행자들의 감정을 담아낼 수 있는 구성으로 작성해주세요.
-
-        여행지: {destination}
-        여행지 특성: {description}
-        여행 목적: {purpose}
-        여행지 계절: {season}
-        동행인: {companions} ({companion_count}명)
-        제목: {title}
-        인트로: {intro}
-        아웃트로: {outro}
-        이미지 URL: {image_urls}
-        """
-
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": prompt}
-        ],
-        temperature=0.2
+async def gpt_generate_storyboard(destination, purpose, companions, companion_count, season, title, intro, outro,
+                                  description, image_urls):
+    with stage_timer("prompt_build"):
+        messages = build_storyboard_messages(destination, purpose, companions, companion_count, season, title, intro,
+                                             outro, description, image_urls)
+
+    response = await scheduler.call(
+        GPT_MODEL,
+        lambda: get_openai_client().chat.completions.create(model=GPT_MODEL, messages=messages, temperature=0.2,
+                                                            max_tokens=MAX_TOKENS),
+        deadline=OPENAI_CHAT_DEADLINE,
+        estimated_tokens=estimate_tokens(messages, max_tokens=MAX_TOKENS),
     )
+    warn_if_truncated(response.choices[0].finish_reason)
+
+    # 스토리보드 원문 텍스트 (파싱은 parse_storyboard_text 에서 한 번에 처리)
+    return response.choices[0].message.content
+
+
+# GPT 구조화 출력(JSON)을 이용한 스토리보드 생성. 정규식 파싱 없이 씬 스키마에 맞춘 JSON 을 받습니다.
+async def gpt_generate_storyboard_structured(destination, purpose, companions, companion_count, season, title, intro,
+                                             outro, description, image_urls):
+    with stage_timer("prompt_build"):
+        messages = build_storyboard_messages(destination, purpose, companions, companion_count, season, title, intro,
+                                             outro, description, image_urls, mode="json")
+
+    response = await scheduler.call(
+        GPT_MODEL,
+        lambda: get_openai_client().chat.completions.create(
+            model=GPT_MODEL,
+            messages=messages,
+            temperature=0.2,
+            max_tokens=MAX_TOKENS,
+            response_format={
+                "type": "json_schema",
+                "json_schema": {"name": "storyboard", "strict": True, "schema": SCENE_SCHEMA},
+            },
+        ),
+        deadline=OPENAI_CHAT_DEADLINE,
+        estimated_tokens=estimate_tokens(messages, max_tokens=MAX_TOKENS),
+    )
+    warn_if_truncated(response.choices[0].finish_reason)
+
+    with stage_timer("parse"):
+        try:
+            return parse_structured_storyboard(json.loads(response.choices[0].message.content))
+        except (TypeError, ValueError) as e:
+            return ParseResult(errors=[{"order_num": None, "error": f"invalid JSON response: {e}"}])
+
 
-    storyboard = response.choices[0].message.content
-    # print(storyboard)
-    # 씬별로 나누어 저장하기 위한 리스트
-    storyboard_scenes = []
+# GPT를 이용한 스토리보드 스트리밍 생성
+async def gpt_stream_storyboard(destination, purpose, companions, companion_count, season, title, intro, outro,
+                                description, image_urls):
+    """
+    스토리보드를 스트리밍으로 생성하면서, 씬 블록이 닫힐 때마다 파싱된 씬 딕셔너리를 내보냅니다.
+    형식이 어긋난 씬이 있으면 마지막에 {"parse_errors": [...]} 를 내보냅니다.
 
-    # GPT 응답을 씬별로 분할하여 리스트에 저장
-    scenes = storyboard.split("- scene")  # 씬 구분을 위해 "scene"을 기준으로 분할
-    for i, scene in enumerate(scenes[1:], 1):  # 첫 번째 항목은 빈 항목이므로 제외하고 처리
-        formatted_scene = f"- scene{scene.strip()}"  # 씬 번호는 기존 GPT 응답에서 유지
-        storyboard_scenes.append(formatted_scene)
+    Yields:
+        dict: parse_storyboard 와 같은 형태의 씬 딕셔너리.
+    """
+    with stage_timer("prompt_build"):
+        messages = build_storyboard_messages(destination, purpose, companions, companion_count, season, title, intro,
+                                             outro, description, image_urls)
+
+    # 재시도는 스트림이 열리기 전까지만 적용됩니다.
+    stream = await scheduler.call(
+        GPT_MODEL,
+        lambda: get_openai_client().chat.completions.create(model=GPT_MODEL, messages=messages, temperature=0.2,
+                                                            max_tokens=MAX_TOKENS, stream=True,
+                                                            stream_options={"include_usage": True}),
+        deadline=OPENAI_CHAT_DEADLINE,
+        estimated_tokens=estimate_tokens(messages, max_tokens=MAX_TOKENS),
+    )
 
-    return storyboard_scenes
+    parser = StoryboardStreamParser()
+    async for chunk in stream:
+        # 마지막 조각에만 토큰 사용량이 실립니다.
+        usage = record_usage(GPT_MODEL, chunk.usage)
+        if usage is not None:
+            logger.debug("openai usage", extra={"model": GPT_MODEL, **usage})
+        if not chunk.choices:
+            continue
+        warn_if_truncated(chunk.choices[0].finish_reason)
+        if not chunk.choices[0].delta.content:
+            continue
+        for scene in parser.feed(chunk.choices[0].delta.content):
+            yield scene
+    for scene in parser.close():
+        yield scene
+    if parser.errors:
+        ERRORS.inc(len(parser.errors), cause="parse")
+        yield {"parse_errors": parser.errors}
 
 
 def parse_storyboard(data):
     """
-    스토리보드 텍스트 데이터를 [[scene 번호, 제목, 세부 정보 딕셔너리], ...] 형태로 변환합니다.
+    스토리보드 텍스트 데이터를 씬 딕셔너리 리스트로 변환합니다.
+    형식이 어긋난 씬은 빈 항목으로 채워지며, 씬별 오류가 필요하면 parse_storyboard_text 를 사용합니다.
 
     Args:
-        data (list): 스토리보드 데이터 (['- scene1 "제목": ...', ...] 형태)
+        data (str | list): 스토리보드 텍스트, 또는 ['- scene1 "제목": ...', ...] 형태의 리스트
 
     Returns:
         list: 정리된 스토리보드 데이터 리스트
-              예: [[1, "꽃길을 걷다", {"영상": ..., "화각": ..., "카메라 무빙": ..., "구도": ...}], ...]
+              예: [{"order_num": 1, "scene_title": "꽃길을 걷다", "description": ..., "camera_angle": ...,
+                    "camera_movement": ..., "composition": ...}, ...]
     """
-    storyboard_scenes = []
-
-    # 데이터를 하나의 문자열로 병합한 후, 씬 단위로 분리
-    full_text = "\n".join(data)
-    scenes = full_text.split("- scene")
-
-    for scene in scenes:
-        if scene.strip():  # 빈 내용 제외
-            lines = scene.strip().split("\n")
-            # 첫 줄에서 제목 추출
-            title_line = lines[0]
-            order_num, scene_title = title_line.split(" ", 1)
-            scene_title = scene_title.strip('"').replace('":', "")
-
-            # 나머지 줄에서 세부 정보 추출
-            details = {}
-            for line in lines[1:]:
-                if ": " in line:  # "키: 값" 형태인 경우
-                    key, value = line.split(": ", 1)
-                    # 키에서 번호와 장식 제거
-                    cleaned_key = key.split(". ")[1].strip("*") if ". " in key else key.strip("*")
-                    details[cleaned_key] = value.strip()
-
-            # 씬 정보를 리스트에 추가
-            storyboard_scenes.append({
-                "order_num": int(order_num),
-                "scene_title": scene_title,
-                "description": details.get("영상", ""),
-                "camera_angle": details.get("화각", ""),
-                "camera_movement": details.get("카메라 무빙", ""),
-                "composition": details.get("구도", "")
-            })
-
-    return storyboard_scenes
+    text = data if isinstance(data, str) else "\n".join(data)
+    return parse_storyboard_text(text).scenes
 
 
 class StoryboardRequest(BaseModel):
@@ -131,32 +184,291 @@ class StoryboardRequest(BaseModel):
 
 class StoryboardResponse(BaseModel):
     storyboard_scenes: List[dict]  # 생성된 스토리보드 씬 리스트
+    parse_errors: List[dict] = []  # 형식이 어긋난 씬별 오류 (씬은 가능한 만큼 채워서 포함)
+
+
+# 스토리보드 생성 + 파싱. 같은 요청이 동시에 들어오면 GPT 호출 하나의 결과를 함께 받습니다.
+# mode="text" 는 양식 텍스트를 파싱하고, mode="json" 은 구조화 출력을 검증합니다.
+async def generate_and_parse_storyboard(request: StoryboardRequest, mode: str = "text") -> ParseResult:
+    inputs = dict(
+        destination=request.destination,
+        purpose=request.purpose,
+        companions=request.companions,
+        companion_count=request.companion_count,
+        season=request.season,
+        title=request.title,
+        intro=request.intro,
+        outro=request.outro,
+        description=request.description,
+        image_urls=request.image_urls,
+    )
+
+    async def generate():
+        if mode == "json":
+            result = await gpt_generate_storyboard_structured(**inputs)
+        else:
+            # GPT 스토리보드 생성 함수 호출
+            storyboard = await gpt_generate_storyboard(**inputs)
+            if logger.isEnabledFor(logging.DEBUG):
+                # 생성 결과 전체는 샘플링된 요청만, 나머지는 앞부분만 기록
+                logger.debug("generated storyboard: %s", storyboard if sampled() else truncate(storyboard))
+            with stage_timer("parse"):
+                result = parse_storyboard_text(storyboard)
+        if result.errors:
+            ERRORS.inc(len(result.errors), cause="parse")
+        logger.info("storyboard parsed", extra={"mode": mode, "scenes": len(result.scenes),
+                                                "parse_errors": len(result.errors)})
+        return result
+
+    return await inflight.do(storyboard_key(request, mode), generate)
+
+
+def storyboard_key(request: StoryboardRequest, mode: str = "text"):
+    return make_cache_key("storyboards", {"model": GPT_MODEL, "mode": mode, **request.dict()})
+
+
+class SceneEdit(BaseModel):
+    order_num: int  # 고칠 씬 순서
+    instruction: str  # 수정 요청 (예: "해 질 녘 장면으로 바꿔주세요")
+
+
+class StoryboardEditRequest(BaseModel):
+    storyboard: StoryboardRequest  # 기존 스토리보드를 생성한 입력 (intro / outro 는 기존 값)
+    storyboard_scenes: List[dict]  # 기존 스토리보드 씬 리스트 (parse_storyboard 결과)
+    intro: Optional[str] = None  # 새 인트로 (바꾸지 않으면 생략)
+    outro: Optional[str] = None  # 새 아웃트로 (바꾸지 않으면 생략)
+    scene_edits: List[SceneEdit] = []  # 씬별 수정 요청
+
+
+class StoryboardEditResponse(BaseModel):
+    storyboard_scenes: List[dict]  # 수정이 반영된 전체 씬 리스트
+    changed_order_nums: List[int]  # 내용이 바뀐 씬 순서 (이 씬들의 이미지만 다시 생성하면 됩니다)
+    parse_errors: List[dict] = []  # 다시 생성하지 못한 씬별 오류 (해당 씬은 기존 내용 유지)
+
+
+def edit_targets(request: StoryboardEditRequest):
+    """
+    수정 요청이 영향을 주는 씬과 씬별 지시사항을 정합니다.
+    인트로가 바뀌면 첫 씬을, 아웃트로가 바뀌면 마지막 씬을 다시 작성합니다.
+
+    Returns:
+        dict: order_num -> 지시사항 리스트.
+    """
+    order_nums = sorted(scene["order_num"] for scene in request.storyboard_scenes)
+    targets = {}
+    if request.intro is not None and request.intro != request.storyboard.intro:
+        targets.setdefault(order_nums[0], []).append(
+            f"인트로가 \"{request.intro}\"(으)로 바뀌었습니다. 영상의 시작이 새 인트로와 어울리도록 다시 작성해주세요.")
+    if request.outro is not None and request.outro != request.storyboard.outro:
+        targets.setdefault(order_nums[-1], []).append(
+            f"아웃트로가 \"{request.outro}\"(으)로 바뀌었습니다. 영상의 마무리가 새 아웃트로와 어울리도록 다시 작성해주세요.")
+    for edit in request.scene_edits:
+        targets.setdefault(edit.order_num, []).append(edit.instruction)
+    return targets
+
+
+# 스토리보드 부분 수정 프롬프트 구성
+# 전체 양식 대신 다른 씬은 제목과 영상 요약만 넣어 흐름을 유지하고, 고칠 씬만 JSON 으로 돌려받습니다.
+def build_storyboard_edit_messages(request: StoryboardEditRequest, targets):
+    context = request.storyboard
+    outline = "\n".join(f"- scene {scene['order_num']} \"{scene.get('scene_title', '')}\": {scene.get('description', '')}"
+                        for scene in sorted(request.storyboard_scenes, key=lambda scene: scene["order_num"]))
+    edits = "\n".join(f"- scene {order_num}: {' '.join(instructions)}" for order_num, instructions in sorted(targets.items()))
+    fields = SCENE_SCHEMA["properties"]["scenes"]["items"]["properties"]
+    current = json.dumps([{key: scene.get(key) for key in fields}
+                          for scene in request.storyboard_scenes if scene["order_num"] in targets], ensure_ascii=False)
+    return build_messages([STORYBOARD_EDIT_INSTRUCTIONS], [
+        ("여행지", context.destination),
+        ("여행지 특성", context.description),
+        ("여행 목적", context.purpose),
+        ("여행지 계절", context.season),
+        ("동행인", f"{context.companions} ({context.companion_count}명)"),
+        ("제목", context.title),
+        ("인트로", request.intro if request.intro is not None else context.intro),
+        ("아웃트로", request.outro if request.outro is not None else context.outro),
+        ("전체 스토리보드 흐름", "\n" + outline),
+        ("수정할 씬의 현재 내용", current),
+        ("수정 요청", "\n" + edits),
+    ])
+
+
+# GPT 구조화 출력으로 수정할 씬만 다시 생성
+async def gpt_edit_storyboard_scenes(request: StoryboardEditRequest, targets) -> ParseResult:
+    with stage_timer("prompt_build"):
+        messages = build_storyboard_edit_messages(request, targets)
+
+    # 고칠 씬 수에 비례해 응답 길이를 제한합니다.
+    max_tokens = OPENAI_MAX_TOKENS["storyboard_edit"] * len(targets)
+
+    response = await scheduler.call(
+        GPT_MODEL,
+        lambda: get_openai_client().chat.completions.create(
+            model=GPT_MODEL,
+            messages=messages,
+            temperature=0.2,
+            max_tokens=max_tokens,
+            response_format={
+                "type": "json_schema",
+                "json_schema": {"name": "storyboard", "strict": True, "schema": SCENE_SCHEMA},
+            },
+        ),
+        deadline=OPENAI_CHAT_DEADLINE,
+        estimated_tokens=estimate_tokens(messages, max_tokens=max_tokens),
+    )
+    warn_if_truncated(response.choices[0].finish_reason, max_tokens)
+
+    with stage_timer("parse"):
+        try:
+            return parse_structured_storyboard(json.loads(response.choices[0].message.content))
+        except (TypeError, ValueError) as e:
+            return ParseResult(errors=[{"order_num": None, "error": f"invalid JSON response: {e}"}])
+
+
+async def edit_storyboard(request: StoryboardEditRequest) -> StoryboardEditResponse:
+    """
+    기존 스토리보드에서 수정 요청이 영향을 주는 씬만 GPT 로 다시 작성하고 나머지 씬은 그대로 둡니다.
+
+    Args:
+        request (StoryboardEditRequest): 기존 스토리보드와 수정 요청.
+
+    Returns:
+        StoryboardEditResponse: 전체 씬과 내용이 바뀐 씬 순서. 다시 작성하지 못한 씬은 기존 내용을 유지하고
+                                parse_errors 에 기록합니다.
+    """
+    targets = edit_targets(request)
+    if not targets:
+        return StoryboardEditResponse(storyboard_scenes=request.storyboard_scenes, changed_order_nums=[])
+
+    result = await gpt_edit_storyboard_scenes(request, targets)
+    errors = list(result.errors)
+    # 요청하지 않은 씬이 섞여 오면 버리고, 같은 씬이 여러 번 오면 처음 것만 사용합니다.
+    edited = {}
+    for scene in result.scenes:
+        if scene["order_num"] in targets:
+            edited.setdefault(scene["order_num"], scene)
+    for order_num in sorted(set(targets) - set(edited)):
+        errors.append({"order_num": order_num, "error": "scene was not regenerated"})
+
+    scenes, changed = [], []
+    for scene in request.storyboard_scenes:
+        new_scene = edited.get(scene["order_num"])
+        # 씬 항목 외에 클라이언트가 붙여 둔 값은 그대로 두고, 씬 항목이 하나라도 달라졌을 때만 바뀐 씬으로 봅니다.
+        if new_scene is not None and any(scene.get(key) != value for key, value in new_scene.items()):
+            scenes.append({**scene, **new_scene})
+            changed.append(scene["order_num"])
+        else:
+            scenes.append(scene)
+    if errors:
+        ERRORS.inc(len(errors), cause="parse")
+    logger.info("storyboard edited", extra={"targets": sorted(targets), "changed": changed,
+                                            "parse_errors": len(errors)})
+    return StoryboardEditResponse(storyboard_scenes=scenes, changed_order_nums=sorted(changed), parse_errors=errors)
+
+
+def check_storyboard_request(request: StoryboardRequest):
+    # 수락 제어 대기열에 들어가기 전에 빈 값 / 너무 긴 입력을 400 으로 거릅니다.
+    check_request(required={"destination": request.destination, "title": request.title},
+                  optional={"purpose": request.purpose, "companions": request.companions, "season": request.season,
+                            "intro": request.intro, "outro": request.outro, "description": request.description},
+                  image_urls=request.image_urls, counts={"companion_count": request.companion_count})
 
 
 # FastAPI 엔드포인트: 스토리보드 생성
+# 동시에 처리하는 생성 수를 넘으면 잠시 기다리고, 대기열이 가득 차면 503, 클라이언트 할당량을 넘으면 429 를 반환합니다.
 @router.post("/storyboards", response_model=StoryboardResponse)
-def generate_storyboard(request: StoryboardRequest):
-    print(request.dict())  # 수신된 데이터를 출력
+async def generate_storyboard(request: StoryboardRequest, http_request: Request,
+                              mode: Literal["text", "json"] = "text"):
+    logger.debug("storyboard request: %s", truncate(request.dict()))  # 수신된 데이터를 출력
+    check_storyboard_request(request)
 
     try:
-        # GPT 스토리보드 생성 함수 호출
-        storyboard_scenes = gpt_generate_storyboard(
-            destination=request.destination,
-            purpose=request.purpose,
-            companions=request.companions,
-            companion_count=request.companion_count,
-            season=request.season,
-            title=request.title,
-            intro=request.intro,
-            outro=request.outro,
-            description=request.description,
-            image_urls=request.image_urls,
-        )
-        print("Generated Storyboard Scenes:", storyboard_scenes)
-        chunked_scenes_data = parse_storyboard(storyboard_scenes)
-        print("Parsed Storyboard Data:", chunked_scenes_data)
-
-        return StoryboardResponse(storyboard_scenes=chunked_scenes_data)
+        # 인트로/아웃트로 선택 시 미리 시작해 둔 생성(/storyboards/prefetch)이 있으면 그 결과를 사용
+        result = await prefetch_store.take(storyboard_key(request, mode))
+        if result is None:
+            async with admission["storyboards"].admit(client_id_of(http_request)):
+                result = await generate_and_parse_storyboard(request, mode=mode)
+
+        return StoryboardResponse(storyboard_scenes=result.scenes, parse_errors=result.errors)
+
+    except Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# FastAPI 엔드포인트: 스토리보드 부분 수정
+# 인트로/아웃트로 변경이나 씬별 수정 요청이 영향을 주는 씬만 다시 생성하고, 바뀐 씬 순서(changed_order_nums)를 함께
+# 반환합니다. 클라이언트는 이 씬들만 /fastapi/images 로 다시 생성하면 됩니다.
+@router.post("/storyboards/edit", response_model=StoryboardEditResponse)
+async def edit_storyboard_endpoint(request: StoryboardEditRequest, http_request: Request):
+    check_storyboard_request(request.storyboard)
+    check_request(optional={"intro": request.intro or "", "outro": request.outro or "",
+                            **{f"scene_edits[{i}]": edit.instruction for i, edit in enumerate(request.scene_edits)}})
+    if not request.storyboard_scenes:
+        raise HTTPException(status_code=400, detail="No scenes to edit")
+    if any(not isinstance(scene.get("order_num"), int) for scene in request.storyboard_scenes):
+        raise HTTPException(status_code=400, detail="Every scene needs an integer order_num")
+    order_nums = {scene["order_num"] for scene in request.storyboard_scenes}
+    for edit in request.scene_edits:
+        if edit.order_num not in order_nums:
+            raise HTTPException(status_code=400, detail=f"Scene not found: {edit.order_num}")
 
+    try:
+        async with admission["storyboards"].admit(client_id_of(http_request)):
+            return await edit_storyboard(request)
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+# FastAPI 엔드포인트: 스토리보드 미리 생성 시작
+# 사용자가 인트로/아웃트로를 고른 시점에 호출하면, 이후 같은 입력의 /storyboards 요청이 이 결과를 사용합니다.
+# /storyboards 와 같은 입력 검사를 거치고, 생성 중에는 스토리보드 수락 제어 자리를 하나 씁니다.
+# 세션(X-Session-ID 헤더)/클라이언트당 예산을 넘었거나 자리가 바로 나지 않으면 시작하지 않고 scheduled=false 를 반환합니다.
+@router.post("/storyboards/prefetch", status_code=202)
+async def prefetch_storyboard(request: StoryboardRequest, http_request: Request,
+                              mode: Literal["text", "json"] = "text"):
+    check_storyboard_request(request)
+    scheduled = prefetch_store.schedule(session_id_of(http_request), storyboard_key(request, mode),
+                                        lambda: generate_and_parse_storyboard(request, mode=mode),
+                                        client_id=requester_id_of(http_request),
+                                        acquire=lambda: admission["storyboards"].try_acquire(client_id_of(http_request)))
+    return {"scheduled": scheduled}
+
+
+# FastAPI 엔드포인트: 스토리보드 스트리밍 생성 (NDJSON, 씬 하나당 한 줄)
+# 수락 여부는 응답을 시작하기 전에 정해지고, 자리는 스트리밍이 끝나거나 연결이 끊길 때 돌려줍니다.
+@router.post("/storyboards/stream")
+async def generate_storyboard_stream(request: StoryboardRequest, http_request: Request):
+    check_storyboard_request(request)
+    ticket = await admission["storyboards"].acquire(client_id_of(http_request))
+
+    async def scene_lines():
+        try:
+            # 미리 생성해 둔 결과가 있으면 GPT 를 다시 호출하지 않고 그대로 내보냅니다.
+            prefetched = await prefetch_store.take(storyboard_key(request))
+            if prefetched is not None:
+                for scene in prefetched.scenes:
+                    yield json.dumps(scene, ensure_ascii=False) + "\n"
+                if prefetched.errors:
+                    yield json.dumps({"parse_errors": prefetched.errors}, ensure_ascii=False) + "\n"
+                return
+            async for scene in gpt_stream_storyboard(
+                    destination=request.destination,
+                    purpose=request.purpose,
+                    companions=request.companions,
+                    companion_count=request.companion_count,
+                    season=request.season,
+                    title=request.title,
+                    intro=request.intro,
+                    outro=request.outro,
+                    description=request.description,
+                    image_urls=request.image_urls,
+            ):
+                yield json.dumps(scene, ensure_ascii=False) + "\n"
+        except Exception as e:
+            # 응답이 이미 시작되었으므로 오류도 한 줄로 내보냅니다.
+            yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+
+    return AdmittedStreamingResponse(scene_lines(), ticket, media_type="application/x-ndjson")
@@ -0,0 +1,60 @@
+import pytest
+
+# utils.s3_image 는 config/settings.py(버킷 이름 등 비밀 값)가 있어야 import 되고, S3 대체로 moto 를 사용합니다.
+pytest.importorskip("config.settings")
+moto = pytest.importorskip("moto")
+
+from utils import s3_image  # noqa: E402
+
+BUCKET = "test-bucket"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    # 공유 클라이언트는 한 번만 만들어지므로, moto 가 가로채는 동안 새로 만들고 끝나면 버립니다.
+    monkeypatch.setattr(s3_image, "S3_ENDPOINT_URL", None)
+    monkeypatch.setattr(s3_image, "_s3_client", None)
+    with moto.mock_aws():
+        client = s3_image.get_s3_client()
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+    s3_image._s3_client = None
+
+
+def test_upload_many_uploads_bytes_and_files(s3, tmp_path):
+    local_file = tmp_path / "1.jpg"
+    local_file.write_bytes(b"jpeg")
+    results = s3_image.upload_many([
+        {"s3_file": "images/1/1.jpg", "local_file": str(local_file)},
+        {"s3_file": "images/1/1_thumb.webp", "body": b"webp", "content_type": "image/webp",
+         "metadata": {"order": 1}, "cache_control": "public, max-age=60"},
+        {"s3_file": "images/1/missing.jpg", "local_file": str(tmp_path / "missing.jpg")},
+    ], bucket_name=BUCKET, max_workers=2)
+
+    assert results == {"images/1/1.jpg": True, "images/1/1_thumb.webp": True, "images/1/missing.jpg": False}
+    assert s3.get_object(Bucket=BUCKET, Key="images/1/1.jpg")["Body"].read() == b"jpeg"
+    thumb = s3.get_object(Bucket=BUCKET, Key="images/1/1_thumb.webp")
+    assert thumb["Body"].read() == b"webp"
+    assert thumb["ContentType"] == "image/webp"
+    assert thumb["CacheControl"] == "public, max-age=60"
+    assert thumb["Metadata"] == {"order": "1"}
+    assert s3_image.upload_many([], bucket_name=BUCKET) == {}
+
+
+def test_copy_object_replaces_metadata(s3):
+    s3.put_object(Bucket=BUCKET, Key="images/1/1.jpg", Body=b"jpeg", ContentType="image/jpeg",
+                  Metadata={"storyboard": "1"})
+
+    assert s3_image.copy_object("images/1/1.jpg", "images/2/1.jpg", bucket_name=BUCKET, content_type="image/jpeg",
+                                metadata={"storyboard": 2}, cache_control="public, max-age=60")
+
+    copied = s3.get_object(Bucket=BUCKET, Key="images/2/1.jpg")
+    assert copied["Body"].read() == b"jpeg"
+    assert copied["ContentType"] == "image/jpeg"
+    assert copied["CacheControl"] == "public, max-age=60"
+    assert copied["Metadata"] == {"storyboard": "2"}
+    assert s3_image.get_object_metadata("images/2/1.jpg", bucket_name=BUCKET) == {"storyboard": "2"}
+    assert not s3_image.copy_object("images/9/missing.jpg", "images/2/2.jpg", bucket_name=BUCKET)
@@ -0,0 +1,95 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from utils.storyboard_parser import StoryboardStreamParser, parse_storyboard_text, parse_structured_storyboard
+
+# 텍스트(*.txt) / 구조화 출력(*.json) 응답과 기대 파싱 결과(*.expected.json) 모음
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / "fixtures" / "storyboards"
+TEXT_FIXTURES = sorted(FIXTURES_DIR.glob("*.txt"))
+JSON_FIXTURES = sorted(path for path in FIXTURES_DIR.glob("*.json") if not path.name.endswith(".expected.json"))
+
+
+def load_expected(path):
+    return json.loads(path.with_name(f"{path.stem}.expected.json").read_text(encoding="utf-8"))
+
+
+@pytest.mark.parametrize("path", TEXT_FIXTURES, ids=lambda path: path.stem)
+def test_text_fixtures(path):
+    result = parse_storyboard_text(path.read_text(encoding="utf-8"))
+    expected = load_expected(path)
+    assert result.scenes == expected["scenes"]
+    assert result.errors == expected["errors"]
+
+
+@pytest.mark.parametrize("path", JSON_FIXTURES, ids=lambda path: path.stem)
+def test_structured_fixtures(path):
+    result = parse_structured_storyboard(json.loads(path.read_text(encoding="utf-8")))
+    expected = load_expected(path)
+    assert result.scenes == expected["scenes"]
+    assert result.errors == expected["errors"]
+
+
+@pytest.mark.parametrize("path", TEXT_FIXTURES, ids=lambda path: path.stem)
+def test_stream_parser_matches_full_parse(path):
+    # 스트리밍 응답처럼 몇 글자씩 나눠 넣어도 한 번에 파싱한 결과와 같아야 합니다.
+    text = path.read_text(encoding="utf-8")
+    parser = StoryboardStreamParser()
+    scenes = []
+    for i in range(0, len(text), 7):
+        scenes.extend(parser.feed(text[i:i + 7]))
+    scenes.extend(parser.close())
+    assert scenes == load_expected(path)["scenes"]
+
+
+def test_parse_storyboard_returns_fixture_scenes():
+    # 라우터의 parse_storyboard 는 config/settings.py(비밀 값)가 있어야 import 됩니다.
+    pytest.importorskip("config.settings")
+    from routers.storyboards import parse_storyboard
+
+    for path in TEXT_FIXTURES:
+        assert parse_storyboard(path.read_text(encoding="utf-8")) == load_expected(path)["scenes"]
+
+
+def test_text_drift_reports_partial_failures():
+    # 항목이 빠지거나 제목 형식이 어긋난 씬도 예외 없이 반환하고, 문제는 씬별 오류로 남깁니다.
+    text = (
+        "아래는 요청하신 스토리보드입니다.\n\n"
+        "- scene 1 \"바다\":\n"
+        "1. **영상**: 파도가 밀려옵니다.\n"
+        "2. **화각**: 와이드 샷.\n\n"
+        "**씬 2: 골목**\n"
+        "1. **영상**: 좁은 골목을 걷습니다.\n"
+        "2. **화각**: 아이 레벨.\n"
+        "3. **카메라 무빙**: 따라갑니다.\n"
+        "4. **구도**: 인물이 중앙에 있습니다.\n"
+    )
+    result = parse_storyboard_text(text)
+    assert [scene["order_num"] for scene in result.scenes] == [1, 2]
+    assert result.scenes[0]["description"] == "파도가 밀려옵니다."
+    assert result.scenes[0]["composition"] == ""
+    assert [error["order_num"] for error in result.errors] == [1]
+
+
+def test_text_without_scenes_is_an_error_not_an_exception():
+    result = parse_storyboard_text("죄송하지만 요청을 처리할 수 없습니다.")
+    assert result.scenes == []
+    assert result.errors == [{"order_num": None, "error": "no scenes found"}]
+
+
+def test_structured_drift_reports_partial_failures():
+    result = parse_structured_storyboard({"scenes": [
+        {"order_num": 1, "scene_title": "바다", "description": "파도", "camera_angle": "와이드",
+         "camera_movement": "고정", "composition": "수평선"},
+        ["not", "a", "scene"],
+        {"order_num": "둘", "scene_title": "골목"},
+        {"scene_title": "시장", "description": "상인들"},
+    ]})
+    assert [scene["order_num"] for scene in result.scenes] == [1, 4]
+    assert [error["error"] for error in result.errors] == [
+        "scene #2 is not an object",
+        "scene #3 has invalid order_num",
+        "missing fields: 화각, 카메라무빙, 구도",
+    ]
+    assert parse_structured_storyboard({"text": "..."}).errors == [{"order_num": None, "error": "no scenes found"}]
@@ -0,0 +1,270 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from config.runtime import (ADMISSION_LIMITS, ADMISSION_QUEUE_TIMEOUT, ADMISSION_RETRY_AFTER, REQUEST_MAX_FIELD_CHARS,
+                            REQUEST_MAX_IMAGE_URLS)
+from utils.metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_REJECTIONS = Counter("admission_rejections_total", "Requests rejected by admission control",
+                               ("route", "reason"))
+
+
+class Overloaded(Exception):
+    """
+    수락 제어에서 거절된 요청. main.py 의 예외 처리기가 status_code 와 Retry-After 헤더로 응답합니다.
+
+    Args:
+        status_code (int): 429(클라이언트 할당량 초과) 또는 503(서버 과부하).
+        reason (str): client_quota / queue_full / queue_timeout / backlog.
+        retry_after (int): 다시 시도할 때까지 기다릴 시간(초).
+    """
+
+    def __init__(self, status_code, reason, retry_after):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    # 수락된 요청 하나. release() 는 여러 번 불러도 자리를 한 번만 돌려줍니다.
+    def __init__(self, controller, client_id):
+        self._controller = controller
+        self._client_id = client_id
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(self._client_id, time.monotonic() - self._started)
+
+
+class AdmissionController:
+    """
+    경로 그룹 하나의 동시 처리 수를 제한하는 수락 제어기입니다. 이벤트 루프 안에서만 사용합니다.
+
+    처리 중인 요청이 max_in_flight 개면 새 요청은 최대 max_queue 개까지 도착 순서대로 기다리고,
+    대기열이 가득 찼거나 queue_timeout 안에 자리가 나지 않으면 GPT 호출 없이 바로 503 으로 거절합니다.
+    클라이언트(X-API-Key / X-Tenant-ID)마다 처리 중 + 대기 중인 요청을 per_client 개로 제한해, 한 클라이언트가
+    자리를 모두 차지하지 못하게 하고 넘으면 429 로 거절합니다. 식별 헤더가 없는 요청(client_id=None)은 모두 같은 주소
+    (Spring 백엔드)에서 오므로 클라이언트 할당량 없이 전체 제한만 적용합니다.
+    거절 응답의 Retry-After 는 최근 처리 시간 평균과 대기열 길이로 계산합니다.
+    제한은 프로세스(워커) 단위입니다.
+
+    Args:
+        name (str): 지표와 로그에 쓰는 경로 그룹 이름.
+        max_in_flight (int): 동시에 처리하는 요청 수.
+        max_queue (int): 자리가 나기를 기다릴 수 있는 요청 수. 0 이면 기다리지 않고 거절합니다.
+        per_client (int): 클라이언트 하나의 처리 중 + 대기 중 요청 수 상한. 0 이면 제한하지 않습니다.
+        queue_timeout (float): 대기열에서 기다리는 최대 시간(초).
+        retry_after (float): Retry-After 의 최소값(초).
+    """
+
+    def __init__(self, name, max_in_flight, max_queue, per_client, queue_timeout, retry_after):
+        self.name = name
+        self._max_in_flight = max(1, max_in_flight)
+        self._max_queue = max(0, max_queue)
+        self._per_client = per_client
+        self._queue_timeout = queue_timeout
+        self._retry_after = retry_after
+        self._in_flight = 0
+        self._waiters = deque()  # 자리를 기다리는 Future (도착 순서)
+        self._clients = {}  # client_id -> 처리 중 + 대기 중 요청 수
+        self._service_time = None  # 최근 처리 시간의 지수 이동 평균(초)
+        self.admitted = 0  # 수락한 요청 수
+        self.rejected = 0  # 거절한 요청 수
+
+    async def acquire(self, client_id):
+        """
+        처리할 자리를 얻습니다. 자리가 없으면 대기열에서 기다리고, 거절되면 Overloaded 를 발생시킵니다.
+
+        Args:
+            client_id (str): 할당량을 계산할 클라이언트 ID. None 이면 클라이언트 할당량을 적용하지 않습니다.
+
+        Returns:
+            Ticket: 처리가 끝나면 release() 해야 합니다.
+        """
+        if self._over_quota(client_id):
+            self.reject("client_quota", 429)
+        if self._in_flight < self._max_in_flight and not self._waiters:
+            self._in_flight += 1
+            self._count(client_id, 1)
+            return self._admit(client_id)
+        if len(self._waiters) >= self._max_queue:
+            self.reject("queue_full", 503)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._count(client_id, 1)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self._queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            granted = waiter.done() and not waiter.cancelled()
+            if granted and isinstance(e, asyncio.TimeoutError):
+                # 시간 초과와 동시에 자리를 넘겨받은 경우
+                return self._admit(client_id)
+            if granted:
+                # 자리를 넘겨받았지만 요청이 취소된 경우 다음 대기자에게 넘깁니다.
+                self._hand_off()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            self._count(client_id, -1)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.reject("queue_timeout", 503)
+        return self._admit(client_id)
+
+    def try_acquire(self, client_id):
+        """
+        기다리지 않고 바로 자리를 얻습니다. 추측 호출(prefetch)처럼 미뤄도 되는 작업에 사용합니다.
+        자리가 없거나 대기 중인 요청이 있으면 None 을 반환하며, 거절 지표에는 남기지 않습니다.
+
+        Returns:
+            Ticket: 자리를 얻었으면 Ticket, 아니면 None.
+        """
+        if self._over_quota(client_id):
+            return None
+        if self._in_flight >= self._max_in_flight or self._waiters:
+            return None
+        self._in_flight += 1
+        self._count(client_id, 1)
+        return self._admit(client_id)
+
+    @asynccontextmanager
+    async def admit(self, client_id):
+        # async with controller.admit(client_id): ... 블록이 끝나면 자리를 돌려줍니다.
+        ticket = await self.acquire(client_id)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def retry_after(self):
+        """
+        지금 거절된 요청이 다시 시도하기까지 기다릴 시간(초). 대기열을 비우는 데 걸릴 시간으로 추정합니다.
+        """
+        service_time = self._service_time or 0
+        backlog = (len(self._waiters) + 1) / self._max_in_flight
+        return max(1, math.ceil(max(self._retry_after, service_time * backlog)))
+
+    def stats(self):
+        return {"in_flight": self._in_flight, "queued": len(self._waiters), "admitted": self.admitted,
+                "rejected": self.rejected}
+
+    def _admit(self, client_id):
+        self.admitted += 1
+        return Ticket(self, client_id)
+
+    def reject(self, reason, status_code=503, retry_after=None):
+        """
+        요청을 거절합니다. 경로별 추가 과부하 조건(예: 이미지 작업 대기열 길이)에서도 같은 지표로 기록하려고 사용합니다.
+
+        Args:
+            reason (str): 거절 사유.
+            status_code (int): 429 또는 503.
+            retry_after (int): Retry-After(초). 없으면 retry_after() 로 계산합니다.
+        """
+        self.rejected += 1
+        ADMISSION_REJECTIONS.inc(route=self.name, reason=reason)
+        logger.info("request rejected", extra={"route": self.name, "reason": reason, "in_flight": self._in_flight,
+                                               "queued": len(self._waiters)})
+        raise Overloaded(status_code, reason, retry_after or self.retry_after())
+
+    def _release(self, client_id, elapsed):
+        self._count(client_id, -1)
+        # 처리 시간 평균은 Retry-After 계산에만 씁니다.
+        self._service_time = elapsed if self._service_time is None else 0.8 * self._service_time + 0.2 * elapsed
+        self._hand_off()
+
+    def _hand_off(self):
+        # 비는 자리를 다음 대기자에게 그대로 넘깁니다. 대기자가 없으면 처리 중인 수를 줄입니다.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def _over_quota(self, client_id):
+        return bool(self._per_client) and client_id is not None and self._clients.get(client_id, 0) >= self._per_client
+
+    def _count(self, client_id, delta):
+        # 식별되지 않은 요청(client_id=None)은 할당량을 적용하지 않으므로 세지 않습니다.
+        if client_id is None:
+            return
+        count = self._clients.get(client_id, 0) + delta
+        if count:
+            self._clients[client_id] = count
+        else:
+            self._clients.pop(client_id, None)
+
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """
+    스트리밍이 끝나거나 클라이언트 연결이 끊기면 수락 자리를 돌려주는 StreamingResponse.
+    본문 생성기가 한 번도 실행되지 않고 취소되어도 자리가 남지 않습니다.
+    """
+
+    def __init__(self, content, ticket, **kwargs):
+        super().__init__(content, **kwargs)
+        self._ticket = ticket
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._ticket.release()
+
+
+def client_id_of(request):
+    """
+    할당량을 계산할 클라이언트 ID. X-API-Key, X-Tenant-ID 헤더 순서로 씁니다.
+    이 서비스는 Spring 백엔드 뒤에 있어 연결 주소가 모든 사용자에게 같으므로 주소로 대신하지 않고, 헤더가 없으면 None
+    (클라이언트 할당량 미적용)을 반환합니다. 사용자별 할당량이 필요하면 백엔드가 이 헤더 중 하나를 전달해야 합니다.
+    """
+    return request.headers.get("X-API-Key") or request.headers.get("X-Tenant-ID") or None
+
+
+def check_request(required=None, optional=None, image_urls=(), counts=None):
+    """
+    대기열에 들어가거나 GPT 작업을 시작하기 전에 입력을 가볍게 검사합니다. 문제가 있으면 400 을 발생시킵니다.
+
+    Args:
+        required (dict): 비어 있으면 안 되는 문자열 {이름: 값}.
+        optional (dict): 비어 있어도 되는 문자열 {이름: 값}.
+        image_urls (list): 참조 이미지 URL 목록. REQUEST_MAX_IMAGE_URLS 개까지 허용합니다.
+        counts (dict): 음수이면 안 되는 정수 {이름: 값}.
+    """
+    for name, value in (required or {}).items():
+        if not value.strip():
+            raise HTTPException(status_code=400, detail=f"{name} must not be empty")
+    for name, value in {**(required or {}), **(optional or {})}.items():
+        if len(value) > REQUEST_MAX_FIELD_CHARS:
+            raise HTTPException(status_code=400, detail=f"{name} is too long (max {REQUEST_MAX_FIELD_CHARS} chars)")
+    if len(image_urls) > REQUEST_MAX_IMAGE_URLS:
+        raise HTTPException(status_code=400, detail=f"Too many image_urls (max {REQUEST_MAX_IMAGE_URLS})")
+    for name, value in (counts or {}).items():
+        if value < 0:
+            raise HTTPException(status_code=400, detail=f"{name} must not be negative")
+
+
+# 경로 그룹별 수락 제어기 (storyboards / recommend / images)
+admission = {
+    name: AdmissionController(name, queue_timeout=ADMISSION_QUEUE_TIMEOUT, retry_after=ADMISSION_RETRY_AFTER, **limits)
+    for name, limits in ADMISSION_LIMITS.items()
+}
+
+Gauge("admission_requests", "Requests held by admission control by route and state", ("route", "state"),
+      callback=lambda: {(name, state): controller.stats()[state]
+                        for name, controller in admission.items() for state in ("in_flight", "queued")})
@@ -0,0 +1,317 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.job_store import DONE, FAILED, QUEUED, RUNNING
+from utils.logging_config import job_id_var, request_id_var
+
+logger = logging.getLogger(__name__)
+
+
+class SceneTask:
+    """
+    스토리보드 씬 하나의 이미지 생성 상태를 나타냅니다. 작업 저장소의 씬 레코드로 만듭니다.
+    """
+
+    def __init__(self, row, request=None):
+        self.scene_id = row["scene_id"]
+        self.job_id = row["job_id"]
+        self.request = request  # 워커에 넘길 요청 객체 (상태 조회용으로 만들 때는 None)
+        self.storyboard_id = row["storyboard_id"]
+        self.order_num = row["order_num"]
+        self.request_id = row.get("request_id")  # 작업을 등록한 HTTP 요청 ID (워커 스레드 로그에 이어 붙임)
+        self.status = row["status"]
+        self.s3_key = row.get("s3_key")
+        self.error = row.get("error")
+        self.attempts = row.get("attempts", 0)  # 워커가 이 씬을 가져간 횟수 (2 이상이면 중단 후 재시도)
+        self.deadline_at = row.get("deadline_at")  # 스토리보드 기한 (epoch 초, 없으면 None)
+        self.queued_at = row.get("queued_at")
+        self.started_at = row.get("started_at")
+        self.finished_at = row.get("finished_at")
+
+    @property
+    def latency(self):
+        # 실제 생성에 걸린 시간(초). 끝나지 않았으면 None
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return round(self.finished_at - self.started_at, 3)
+
+    def to_dict(self):
+        return {
+            "order_num": self.order_num,
+            "status": self.status,
+            "latency": self.latency,
+            "s3_key": self.s3_key,
+            "error": self.error,
+        }
+
+
+class ImageJob:
+    """
+    POST /fastapi/images 한 번으로 생성되는 작업. 여러 씬(SceneTask)을 묶습니다.
+    """
+
+    def __init__(self, job_id, created_at, scenes):
+        self.job_id = job_id
+        self.created_at = created_at
+        self.scenes = scenes
+        self.storyboard_ids = sorted({scene.storyboard_id for scene in scenes})
+
+    @property
+    def status(self):
+        statuses = [scene.status for scene in self.scenes]
+        if all(status == QUEUED for status in statuses):
+            return QUEUED
+        if any(status in (QUEUED, RUNNING) for status in statuses):
+            return RUNNING
+        if any(status == FAILED for status in statuses):
+            return FAILED
+        return DONE
+
+    @property
+    def finished(self):
+        return all(scene.status in (DONE, FAILED) for scene in self.scenes)
+
+    def get_scene(self, order_num):
+        for scene in self.scenes:
+            if scene.order_num == order_num:
+                return scene
+        return None
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "storyboard_ids": self.storyboard_ids,
+            "scenes": [scene.to_dict() for scene in self.scenes],
+        }
+
+
+class ImageJobEngine:
+    """
+    작업 저장소(JobStore)에 기록된 씬을 고정 크기 스레드 풀에서 실행하는 엔진입니다.
+
+    submit() 은 씬을 저장소에 기록하기만 하고, start() 로 띄운 배정 스레드가 빈 워커 수만큼 씬을 가져가
+    (claim) 실행합니다. 전체 동시 실행 수는 max_workers 로, 스토리보드 하나가 동시에 점유할 수 있는 워커 수는
+    저장소를 공유하는 모든 프로세스를 합쳐 per_storyboard_limit 으로 제한합니다.
+    상태 변화는 모두 저장소에 남으므로 프로세스가 재시작되어도 끝나지 않은 씬은 lease 가 끝난 뒤 다시 실행되고,
+    끝난 씬은 다시 실행되지 않습니다. API 프로세스에서 start() 를 호출하지 않고 별도 워커 프로세스(worker.py)에서
+    실행할 수도 있습니다.
+    씬은 스토리보드별 order_num 순서로 실행되며, 작업의 각 스토리보드에는 등록 시점부터 deadline 초의 기한이 걸립니다.
+    기한이 지나도 끝나지 않은 씬은 실행 중이더라도 failed 로 처리하고 on_finish 를 호출하므로, 느린 씬 하나 때문에
+    스토리보드 완료가 늦어지지 않습니다. 워커는 SceneTask.deadline_at 을 보고 남은 시간 안에서만 외부 호출을 기다려야 합니다.
+
+    Args:
+        worker (callable): SceneTask 를 받아 업로드된 S3 key 를 반환하는 함수. SceneTask.request 에 요청 객체가 들어 있습니다.
+        store (JobStore): 작업 저장소.
+        request_parser (callable): 저장된 요청 dict 를 요청 객체로 바꾸는 함수.
+        max_workers (int): 전체 워커 스레드 수.
+        per_storyboard_limit (int): 스토리보드당 동시 실행 씬 수.
+        lease_seconds (float): 가져간 씬을 다른 워커가 다시 가져갈 수 없는 시간(초). 씬 하나의 최대 실행 시간보다 길어야 합니다.
+        max_attempts (int): 중단된 씬을 다시 가져가는 최대 횟수.
+        retention_seconds (int): 끝난 작업의 상태를 보관하는 시간(초).
+        poll_interval (float): 저장소에서 새 씬을 확인하는 주기(초). 같은 프로세스의 submit() 은 바로 깨웁니다.
+        deadline (float): 스토리보드 기한(초)의 기본값. 0 이면 기한 없음.
+        on_finish (callable): 씬 결과를 저장소에 기록한 뒤 SceneTask 를 받아 호출할 함수 (완료 알림 등).
+    """
+
+    def __init__(self, worker, store, request_parser, max_workers, per_storyboard_limit, lease_seconds, max_attempts,
+                 retention_seconds=3600, poll_interval=1.0, deadline=0, on_finish=None):
+        self._worker = worker
+        self._on_finish = on_finish
+        self._store = store
+        self._request_parser = request_parser
+        self._max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-job")
+        self._per_storyboard_limit = max(1, per_storyboard_limit)
+        self._lease_seconds = lease_seconds
+        self._max_attempts = max_attempts
+        self._retention_seconds = retention_seconds
+        self._poll_interval = poll_interval
+        self._deadline = deadline
+        self._owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)  # 실행 중인 씬이 끝날 때마다 알림 (종료 시 drain 용)
+        self._active = 0  # 이 프로세스에서 실행 중인 씬 수
+        self._wake = threading.Event()
+        self._thread = None
+        self._closed = False
+
+    def submit(self, requests, idempotency_key=None, deadline=None):
+        """
+        씬 요청 목록을 하나의 작업으로 저장소에 등록하고 즉시 반환합니다.
+
+        Args:
+            requests (list): ImageGenerationRequest 리스트.
+            idempotency_key (str): 같은 key 로 이미 등록된 작업이 있으면 새로 등록하지 않고 그 작업 ID 를 반환합니다.
+            deadline (float): 스토리보드 기한(초). None 이면 엔진 기본값, 0 이면 기한 없음.
+
+        Returns:
+            str: 작업 ID.
+        """
+        request_id = request_id_var.get()
+        deadline = self._deadline if deadline is None else deadline
+        deadline_at = time.time() + deadline if deadline > 0 else None
+        scenes = [{
+            "storyboard_id": request.storyboard_id,
+            "order_num": request.order_num,
+            "request": request.dict(),
+            "request_id": request_id,
+            "deadline_at": deadline_at,
+        } for request in requests]
+        job_id = self._store.create_job(uuid.uuid4().hex, scenes, idempotency_key=idempotency_key)
+        self._wake.set()
+        return job_id
+
+    def mark_notified(self, job_id, storyboard_id):
+        return self._store.mark_notified(job_id, storyboard_id)
+
+    def get_job(self, job_id):
+        job = self._store.get_job(job_id)
+        if job is None:
+            return None
+        return ImageJob(job["job_id"], job["created_at"], [SceneTask(row) for row in job["scenes"]])
+
+    def stats(self):
+        """
+        Returns:
+            dict: 저장소 전체의 대기 중 / 실행 중인 씬 수와 보관 중인 작업 수.
+        """
+        return self._store.counts()
+
+    def start(self):
+        # 씬 배정 스레드를 시작합니다. 시작하면 저장소에 남아 있던 끝나지 않은 씬부터 이어서 처리합니다.
+        with self._lock:
+            if self._thread is not None or self._closed:
+                return
+            self._thread = threading.Thread(target=self._loop, name="image-job-dispatcher", daemon=True)
+            self._thread.start()
+
+    def shutdown(self, wait=True, timeout=None):
+        """
+        새 씬 배정을 멈추고 워커 풀을 종료합니다. 배정되지 않은 씬은 저장소에 남아 다른 워커나 다음 실행이 처리하고,
+        이 워커가 가져갔지만 끝내지 못한 씬은 종료 시 대기열로 되돌립니다.
+
+        Args:
+            wait (bool): 실행 중인 씬이 끝날 때까지 기다릴지 여부.
+            timeout (float): wait=True 일 때 기다리는 최대 시간(초). 그 안에 끝나지 않은 씬은 저장소의 대기열로
+                             되돌리고(release) 기다리지 않고 종료합니다. None 이면 끝까지 기다립니다.
+        """
+        with self._lock:
+            self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+
+        if wait and timeout is not None:
+            with self._idle:
+                drained = self._idle.wait_for(lambda: self._active == 0, timeout=timeout)
+            if not drained:
+                logger.warning("drain timed out, handing running scenes back to the queue")
+                wait = False
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        # 이 워커가 가져간 채 끝나지 않은 씬(취소된 future, 기다리지 않은 실행 중인 씬)은 lease 를 기다리지 않고
+        # 바로 대기열로 되돌려 다른 프로세스가 가져가게 합니다. 나중에 끝나는 실행 결과는 finish() 에서 버려집니다.
+        released = self._store.release(self._owner)
+        if released:
+            logger.info("handed scenes back to the queue", extra={"released": released})
+
+    def _loop(self):
+        last_evicted = 0
+        while not self._closed:
+            self._wake.clear()
+            try:
+                self._expire()
+                self._dispatch()
+                if time.monotonic() - last_evicted > 60:
+                    # 보관 시간이 지난 완료 작업을 정리해 저장소 크기를 일정하게 유지합니다.
+                    self._store.evict(self._retention_seconds)
+                    last_evicted = time.monotonic()
+            except Exception:
+                logger.exception("image job dispatch failed")
+            self._wake.wait(self._poll_interval)
+
+    def _expire(self):
+        # 기한이 지난 씬을 failed 로 처리하고 완료 알림을 보냅니다. 실행 중이던 스레드의 결과는 나중에 버려집니다.
+        for row in self._store.expire():
+            scene = SceneTask(row)
+            logger.warning("scene abandoned past storyboard deadline",
+                           extra={"job_id": scene.job_id, "storyboard_id": scene.storyboard_id,
+                                  "order_num": scene.order_num})
+            self._notify(scene, row)
+
+    def _notify(self, scene, row):
+        if self._on_finish is None:
+            return
+        try:
+            if scene.request is None:
+                scene.request = self._request_parser(row["request"])
+            self._on_finish(scene)
+        except Exception:
+            logger.exception("scene finish hook failed")
+
+    def _dispatch(self):
+        with self._lock:
+            if self._closed:
+                return
+            free = self._max_workers - self._active
+        if free <= 0:
+            return
+        rows = self._store.claim(self._owner, free, self._per_storyboard_limit, self._lease_seconds,
+                                 self._max_attempts)
+        for index, row in enumerate(rows):
+            with self._lock:
+                closed = self._closed
+                if not closed:
+                    self._active += 1
+            if closed:
+                # 가져오는 사이 종료가 시작되면 남은 씬은 실행하지 않고 바로 대기열로 되돌립니다.
+                self._store.release(self._owner, [r["scene_id"] for r in rows[index:]], started=False)
+                return
+            self._executor.submit(self._run, row)
+
+    def _run(self, row):
+        job_token = job_id_var.set(row["job_id"])
+        request_token = request_id_var.set(row.get("request_id"))
+        scene = SceneTask(row)
+        try:
+            if scene.attempts > 1:
+                logger.info("resuming interrupted scene", extra={"storyboard_id": scene.storyboard_id,
+                                                                 "order_num": scene.order_num,
+                                                                 "attempts": scene.attempts})
+            scene.request = self._request_parser(row["request"])
+            scene.s3_key = self._worker(scene)
+            scene.status = DONE
+        except Exception as e:
+            scene.error = str(e)
+            scene.status = FAILED
+            logger.warning("scene failed", extra={"storyboard_id": scene.storyboard_id,
+                                                  "order_num": scene.order_num, "error": scene.error})
+        finally:
+            recorded = False
+            try:
+                recorded = self._store.finish(scene.scene_id, scene.status, s3_key=scene.s3_key, error=scene.error,
+                                              owner=self._owner)
+            except Exception:
+                logger.exception("failed to record scene result")
+                recorded = True  # 기록 여부를 알 수 없으면 알림은 보냅니다.
+            scene.finished_at = time.time()
+            if recorded:
+                self._notify(scene, row)
+            else:
+                # 기한이 지나 이미 failed 로 처리되었거나 lease 가 끝나 다른 워커가 가져간 씬입니다.
+                logger.info("discarded late scene result", extra={"storyboard_id": scene.storyboard_id,
+                                                                  "order_num": scene.order_num,
+                                                                  "status": scene.status})
+            logger.debug("scene finished", extra={"storyboard_id": scene.storyboard_id, "order_num": scene.order_num,
+                                                  "status": scene.status, "latency": scene.latency})
+            with self._lock:
+                self._active -= 1
+                self._idle.notify_all()
+            self._wake.set()
+            job_id_var.reset(job_token)
+            request_id_var.reset(request_token)
@@ -0,0 +1,114 @@
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from config.runtime import (IMAGE_ENCODE_WORKERS, IMAGE_JPEG_QUALITY, IMAGE_RENDITION_FORMAT, IMAGE_RENDITION_QUALITY,
+                            IMAGE_RENDITIONS)
+
+logger = logging.getLogger(__name__)
+
+_CONTENT_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "AVIF": "image/avif"}
+_EXTENSIONS = {"JPEG": "jpg", "WEBP": "webp", "AVIF": "avif"}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def rendition_format():
+    """
+    중간 크기 / 썸네일 인코딩 형식. AVIF 를 지원하지 않는 Pillow 빌드면 WebP 를 사용합니다.
+    """
+    from PIL import features
+
+    if IMAGE_RENDITION_FORMAT.lower() == "avif" and features.check("avif"):
+        return "AVIF"
+    return "WEBP"
+
+
+def guess_content_type(data):
+    # 디코딩 없이 파일 시그니처로 형식을 추정합니다.
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    return "application/octet-stream"
+
+
+def rendition_key(s3_key, name, fmt):
+    """
+    원본 key 로 렌디션 key 를 만듭니다. 예: images/storyboard/1/2.jpg -> images/storyboard/1/2_thumb.webp
+    """
+    return f"{s3_key.rsplit('.', 1)[0]}_{name}.{_EXTENSIONS[fmt]}"
+
+
+def encode_renditions(data, renditions, fmt, quality, jpeg_quality):
+    """
+    이미지를 한 번만 디코딩해 원본 크기 JPEG 와 축소본들을 인코딩합니다. 프로세스 풀에서 실행됩니다.
+
+    Args:
+        data (bytes): 원본 이미지 (PNG / WebP 등).
+        renditions (dict): 렌디션 이름 -> 긴 변 픽셀.
+        fmt (str): 축소본 형식 ("WEBP" 또는 "AVIF").
+        quality (int): 축소본 품질.
+        jpeg_quality (int): 원본 JPEG 품질.
+
+    Returns:
+        list: (렌디션 이름, Content-Type, bytes) 리스트. 첫 항목은 이름이 None 인 원본 JPEG 입니다.
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGB")
+
+    outputs = []
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=jpeg_quality, optimize=True, progressive=True)
+    outputs.append((None, _CONTENT_TYPES["JPEG"], buffer.getvalue()))
+
+    # 큰 렌디션부터 줄여 가며 이전 결과를 다시 줄이면 원본에서 매번 줄이는 것보다 빠릅니다.
+    current = image
+    for name, size in sorted(renditions.items(), key=lambda item: -item[1]):
+        if max(current.size) > size:
+            current = current.copy()
+            current.thumbnail((size, size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        current.save(buffer, fmt, quality=quality)
+        outputs.append((name, _CONTENT_TYPES[fmt], buffer.getvalue()))
+    return outputs
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # 여러 스레드가 도는 프로세스에서 fork 하면 잠금 상태까지 복사되므로 spawn 으로 띄웁니다.
+                _pool = ProcessPoolExecutor(max_workers=IMAGE_ENCODE_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def process_image(data):
+    """
+    워커 스레드에서 호출합니다. 인코딩을 프로세스 풀에 넘기고 결과를 기다리므로 GIL 을 잡지 않습니다.
+
+    Returns:
+        tuple: (축소본 형식, [(렌디션 이름, Content-Type, bytes), ...]).
+    """
+    fmt = rendition_format()
+    future = _get_pool().submit(encode_renditions, data, IMAGE_RENDITIONS, fmt, IMAGE_RENDITION_QUALITY,
+                                IMAGE_JPEG_QUALITY)
+    return fmt, future.result()
+
+
+def shutdown_image_processing():
+    # 앱 / 워커 종료 시 인코딩 프로세스를 정리합니다.
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,475 @@
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+# 씬 / 작업 상태
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+DEADLINE_ERROR = "Storyboard deadline exceeded"
+
+
+def _claim_order(scene):
+    # 먼저 등록된 작업부터, 같은 작업 안에서는 스토리보드별 order_num 순서로 실행합니다.
+    return scene["queued_at"], scene["job_id"], scene["storyboard_id"], scene["order_num"], scene["scene_id"]
+
+
+def _pick(candidates, running, limit, per_storyboard_limit):
+    # 대기 순서대로 보면서 스토리보드별 실행 중인 씬 수가 상한을 넘지 않는 씬을 limit 개까지 고릅니다.
+    picked = []
+    for scene in candidates:
+        if len(picked) >= limit:
+            break
+        storyboard_id = scene["storyboard_id"]
+        if running.get(storyboard_id, 0) >= per_storyboard_limit:
+            continue
+        running[storyboard_id] = running.get(storyboard_id, 0) + 1
+        picked.append(scene)
+    return picked
+
+
+class JobStore(ABC):
+    """
+    이미지 생성 작업 저장소의 공통 인터페이스.
+
+    씬마다 요청 내용, 상태 변화, 업로드된 S3 key 를 기록합니다. 워커는 claim() 으로 실행할 씬을 가져가며,
+    가져간 씬에는 lease_seconds 동안 유지되는 lease 가 걸립니다. 워커 프로세스가 죽어 lease 가 끝난 씬은
+    다른 워커(또는 재시작한 워커)가 다시 가져가 이어서 처리합니다.
+    다른 저장소(Postgres, Redis 등)를 붙일 때는 이 클래스를 상속해 모든 메서드를 구현합니다.
+    빠진 메서드가 있으면 요청 처리 중이 아니라 저장소를 만들 때 TypeError 가 발생합니다.
+    """
+
+    @abstractmethod
+    def create_job(self, job_id, scenes, idempotency_key=None):
+        """
+        Args:
+            job_id (str): 새 작업 ID.
+            scenes (list): 씬 dict 리스트. 각 항목은 storyboard_id, order_num, request(dict), request_id,
+                           deadline_at(스토리보드 기한, epoch 초 또는 None) 을 가집니다.
+            idempotency_key (str): 같은 key 로 이미 등록된 작업이 있으면 새로 만들지 않습니다.
+
+        Returns:
+            str: 등록된(또는 이미 있던) 작업 ID.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_job(self, job_id):
+        """
+        Returns:
+            dict: {"job_id", "created_at", "scenes": [씬 dict, ...]}. 없으면 None.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def claim(self, owner, limit, per_storyboard_limit, lease_seconds, max_attempts):
+        """
+        실행할 씬을 최대 limit 개 가져가 running 으로 바꿉니다. 대기 중인 씬과 lease 가 끝난 running 씬이 대상이며,
+        이미 max_attempts 번 시도한 씬은 failed 로 처리합니다. 먼저 등록된 작업부터, 작업 안에서는 스토리보드별
+        order_num 순서로 가져가 앞 씬이 먼저 끝나도록 합니다.
+
+        Returns:
+            list: 가져간 씬 dict 리스트.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def finish(self, scene_id, status, s3_key=None, error=None, owner=None):
+        """
+        owner 가 실행 중인 씬의 결과를 기록합니다. 그 사이 기한이 지나 failed 로 처리되었거나 lease 가 끝나
+        다른 워커가 가져간 씬이면 기록하지 않습니다.
+
+        Returns:
+            bool: 기록했으면 True.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def expire(self):
+        """
+        스토리보드 기한(deadline_at)이 지났는데 끝나지 않은 씬을 failed 로 처리합니다. 실행 중인 씬도 포함되며,
+        그 씬을 실행하던 워커가 나중에 finish() 를 호출해도 결과는 기록되지 않습니다.
+
+        Returns:
+            list: failed 로 바꾼 씬 dict 리스트.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def release(self, owner, scene_ids=None, started=True):
+        """
+        owner 가 가져간 채 끝나지 않은 씬을 대기 상태로 되돌려 다른 워커가 바로 가져갈 수 있게 합니다.
+        시도 횟수는 그대로 두므로 다시 실행할 때 이미 업로드된 결과가 있는지 확인합니다.
+
+        Args:
+            owner (str): 씬을 가져간 워커.
+            scene_ids (list): 되돌릴 씬. None 이면 owner 가 실행 중인 씬 전부.
+            started (bool): False 면 가져가기만 하고 실행하지 않은 씬이므로 claim 에서 늘린 시도 횟수도 되돌립니다.
+
+        Returns:
+            int: 되돌린 씬 수.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def counts(self):
+        """
+        Returns:
+            dict: 대기 중 / 실행 중인 씬 수와 보관 중인 작업 수.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def mark_notified(self, job_id, storyboard_id):
+        """
+        작업의 스토리보드 완료 알림을 보낸 것으로 기록합니다. 여러 워커가 동시에 완료를 감지해도 한 번만 True 입니다.
+
+        Returns:
+            bool: 이번 호출에서 처음 기록했으면 True.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def evict(self, retention_seconds):
+        # 모든 씬이 끝난 지 retention_seconds 가 지난 작업을 지웁니다.
+        raise NotImplementedError
+
+
+class MemoryJobStore(JobStore):
+    """
+    프로세스 내부 작업 저장소. 재시작하면 작업이 사라지므로 개발/벤치마크용입니다.
+    (워커를 별도 프로세스로 띄우는 IMAGE_WORKER_MODE=external 에서는 사용할 수 없습니다.)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = {}  # job_id -> {"job_id", "created_at", "idempotency_key", "scenes": [...]}
+        self._scenes = {}  # scene_id -> 씬 dict
+        self._idempotency = {}  # idempotency_key -> job_id
+        self._notified = set()  # (job_id, storyboard_id)
+        self._next_scene_id = 1
+
+    def create_job(self, job_id, scenes, idempotency_key=None):
+        now = time.time()
+        with self._lock:
+            if idempotency_key is not None and idempotency_key in self._idempotency:
+                return self._idempotency[idempotency_key]
+            job = {"job_id": job_id, "created_at": now, "scenes": []}
+            for scene in scenes:
+                row = {
+                    "scene_id": self._next_scene_id,
+                    "job_id": job_id,
+                    "storyboard_id": scene["storyboard_id"],
+                    "order_num": scene["order_num"],
+                    "request": scene["request"],
+                    "request_id": scene.get("request_id"),
+                    "deadline_at": scene.get("deadline_at"),
+                    "status": QUEUED,
+                    "s3_key": None,
+                    "error": None,
+                    "attempts": 0,
+                    "owner": None,
+                    "lease_expires_at": None,
+                    "queued_at": now,
+                    "started_at": None,
+                    "finished_at": None,
+                }
+                self._next_scene_id += 1
+                self._scenes[row["scene_id"]] = row
+                job["scenes"].append(row)
+            self._jobs[job_id] = job
+            if idempotency_key is not None:
+                self._idempotency[idempotency_key] = job_id
+            return job_id
+
+    def get_job(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {"job_id": job_id, "created_at": job["created_at"],
+                    "scenes": [dict(scene) for scene in job["scenes"]]}
+
+    def claim(self, owner, limit, per_storyboard_limit, lease_seconds, max_attempts):
+        now = time.time()
+        with self._lock:
+            running = {}
+            candidates = []
+            for scene in self._scenes.values():
+                if scene["status"] == RUNNING and scene["lease_expires_at"] >= now:
+                    running[scene["storyboard_id"]] = running.get(scene["storyboard_id"], 0) + 1
+                elif scene["status"] in (QUEUED, RUNNING):
+                    if scene["attempts"] >= max_attempts:
+                        scene.update(status=FAILED, error="Interrupted too many times", finished_at=now)
+                    else:
+                        candidates.append(scene)
+            candidates.sort(key=_claim_order)
+            picked = _pick(candidates, running, limit, per_storyboard_limit)
+            for scene in picked:
+                scene.update(status=RUNNING, owner=owner, attempts=scene["attempts"] + 1,
+                             lease_expires_at=now + lease_seconds, started_at=now)
+            return [dict(scene) for scene in picked]
+
+    def finish(self, scene_id, status, s3_key=None, error=None, owner=None):
+        with self._lock:
+            scene = self._scenes.get(scene_id)
+            if scene is None or scene["status"] != RUNNING or (owner is not None and scene["owner"] != owner):
+                return False
+            scene.update(status=status, s3_key=s3_key, error=error, finished_at=time.time(), lease_expires_at=None)
+            return True
+
+    def expire(self):
+        now = time.time()
+        with self._lock:
+            expired = [scene for scene in self._scenes.values()
+                       if scene["status"] in (QUEUED, RUNNING) and scene["deadline_at"] is not None
+                       and scene["deadline_at"] < now]
+            for scene in expired:
+                scene.update(status=FAILED, error=DEADLINE_ERROR, finished_at=now, lease_expires_at=None)
+            return [dict(scene) for scene in expired]
+
+    def release(self, owner, scene_ids=None, started=True):
+        with self._lock:
+            released = [scene for scene in self._scenes.values()
+                        if scene["status"] == RUNNING and scene["owner"] == owner
+                        and (scene_ids is None or scene["scene_id"] in scene_ids)]
+            for scene in released:
+                scene.update(status=QUEUED, owner=None, lease_expires_at=None,
+                             attempts=scene["attempts"] - (0 if started else 1))
+            return len(released)
+
+    def counts(self):
+        with self._lock:
+            statuses = [scene["status"] for scene in self._scenes.values()]
+            return {"queued": statuses.count(QUEUED), "running": statuses.count(RUNNING), "jobs": len(self._jobs)}
+
+    def mark_notified(self, job_id, storyboard_id):
+        with self._lock:
+            if (job_id, storyboard_id) in self._notified:
+                return False
+            self._notified.add((job_id, storyboard_id))
+            return True
+
+    def evict(self, retention_seconds):
+        now = time.time()
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if all(scene["status"] in (DONE, FAILED) for scene in job["scenes"]) and \
+                        now - max(scene["finished_at"] or 0 for scene in job["scenes"]) > retention_seconds:
+                    for scene in job["scenes"]:
+                        del self._scenes[scene["scene_id"]]
+                    del self._jobs[job_id]
+            self._idempotency = {key: job_id for key, job_id in self._idempotency.items() if job_id in self._jobs}
+            self._notified = {item for item in self._notified if item[0] in self._jobs}
+
+
+class SqliteJobStore(JobStore):
+    """
+    SQLite 파일 기반 작업 저장소. API 프로세스와 워커 프로세스가 같은 파일을 공유하며,
+    프로세스가 재시작되어도 대기 중 / 실행 중이던 씬이 남아 있어 이어서 처리됩니다.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        # 트랜잭션은 직접 관리합니다 (claim 은 BEGIN IMMEDIATE 로 다른 프로세스와 직렬화).
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS image_jobs ("
+            "job_id TEXT PRIMARY KEY, created_at REAL NOT NULL, idempotency_key TEXT UNIQUE)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS image_scenes ("
+            "scene_id INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL, storyboard_id INTEGER NOT NULL, "
+            "order_num INTEGER NOT NULL, request TEXT NOT NULL, request_id TEXT, status TEXT NOT NULL, s3_key TEXT, "
+            "error TEXT, attempts INTEGER NOT NULL DEFAULT 0, owner TEXT, lease_expires_at REAL, "
+            "queued_at REAL NOT NULL, started_at REAL, finished_at REAL, deadline_at REAL)"
+        )
+        # 기한 기능 이전에 만든 파일에는 deadline_at 열을 추가합니다.
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(image_scenes)")}
+        if "deadline_at" not in columns:
+            self._conn.execute("ALTER TABLE image_scenes ADD COLUMN deadline_at REAL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS image_scenes_job ON image_scenes (job_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS image_scenes_status ON image_scenes (status, queued_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS image_notifications ("
+            "job_id TEXT NOT NULL, storyboard_id INTEGER NOT NULL, PRIMARY KEY (job_id, storyboard_id))"
+        )
+
+    def create_job(self, job_id, scenes, idempotency_key=None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if idempotency_key is not None:
+                    row = self._conn.execute(
+                        "SELECT job_id FROM image_jobs WHERE idempotency_key = ?", (idempotency_key,)
+                    ).fetchone()
+                    if row is not None:
+                        self._conn.execute("COMMIT")
+                        return row["job_id"]
+                self._conn.execute("INSERT INTO image_jobs (job_id, created_at, idempotency_key) VALUES (?, ?, ?)",
+                                   (job_id, now, idempotency_key))
+                self._conn.executemany(
+                    "INSERT INTO image_scenes (job_id, storyboard_id, order_num, request, request_id, status, queued_at, "
+                    "deadline_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(job_id, scene["storyboard_id"], scene["order_num"],
+                      json.dumps(scene["request"], ensure_ascii=False), scene.get("request_id"), QUEUED, now,
+                      scene.get("deadline_at"))
+                     for scene in scenes],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def get_job(self, job_id):
+        with self._lock:
+            job = self._conn.execute("SELECT job_id, created_at FROM image_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            scenes = self._conn.execute(
+                "SELECT * FROM image_scenes WHERE job_id = ? ORDER BY scene_id", (job_id,)
+            ).fetchall()
+        return {"job_id": job["job_id"], "created_at": job["created_at"], "scenes": [self._scene(row) for row in scenes]}
+
+    def claim(self, owner, limit, per_storyboard_limit, lease_seconds, max_attempts):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE image_scenes SET status = ?, error = ?, finished_at = ?, lease_expires_at = NULL "
+                    "WHERE attempts >= ? AND (status = ? OR (status = ? AND lease_expires_at < ?))",
+                    (FAILED, "Interrupted too many times", now, max_attempts, QUEUED, RUNNING, now),
+                )
+                # 스토리보드별 상한은 SQL 안에서 적용합니다. 대기 순서대로 스토리보드마다 번호(slot)를 매기고,
+                # 실행 중인 씬 수 + slot 이 상한 이하인 씬만 남겨서, 상한에 걸린 스토리보드의 씬이 앞쪽에 몰려 있어도
+                # 다른 스토리보드의 씬을 가져갈 수 있게 합니다.
+                rows = self._conn.execute(
+                    "WITH busy AS ("
+                    "  SELECT storyboard_id, COUNT(*) AS running FROM image_scenes "
+                    "  WHERE status = ? AND lease_expires_at >= ? GROUP BY storyboard_id"
+                    "), ready AS ("
+                    "  SELECT *, ROW_NUMBER() OVER ("
+                    "    PARTITION BY storyboard_id ORDER BY queued_at, job_id, order_num, scene_id) AS slot "
+                    "  FROM image_scenes WHERE status = ? OR (status = ? AND lease_expires_at < ?)"
+                    ") "
+                    "SELECT ready.* FROM ready LEFT JOIN busy USING (storyboard_id) "
+                    "WHERE ready.slot + COALESCE(busy.running, 0) <= ? "
+                    "ORDER BY queued_at, job_id, storyboard_id, order_num, scene_id LIMIT ?",
+                    (RUNNING, now, QUEUED, RUNNING, now, per_storyboard_limit, limit),
+                ).fetchall()
+                picked = [self._scene(row) for row in rows]
+                for scene in picked:
+                    del scene["slot"]
+                for scene in picked:
+                    scene.update(status=RUNNING, owner=owner, attempts=scene["attempts"] + 1,
+                                 lease_expires_at=now + lease_seconds, started_at=now)
+                    self._conn.execute(
+                        "UPDATE image_scenes SET status = ?, owner = ?, attempts = ?, lease_expires_at = ?, "
+                        "started_at = ? WHERE scene_id = ?",
+                        (RUNNING, owner, scene["attempts"], scene["lease_expires_at"], now, scene["scene_id"]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return picked
+
+    def finish(self, scene_id, status, s3_key=None, error=None, owner=None):
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE image_scenes SET status = ?, s3_key = ?, error = ?, finished_at = ?, lease_expires_at = NULL "
+                "WHERE scene_id = ? AND status = ? AND (? IS NULL OR owner = ?)",
+                (status, s3_key, error, time.time(), scene_id, RUNNING, owner, owner),
+            ).rowcount == 1
+
+    def expire(self):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT * FROM image_scenes WHERE status IN (?, ?) AND deadline_at < ?", (QUEUED, RUNNING, now),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE image_scenes SET status = ?, error = ?, finished_at = ?, lease_expires_at = NULL "
+                    "WHERE scene_id = ?", [(FAILED, DEADLINE_ERROR, now, row["scene_id"]) for row in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        expired = [self._scene(row) for row in rows]
+        for scene in expired:
+            scene.update(status=FAILED, error=DEADLINE_ERROR, finished_at=now, lease_expires_at=None)
+        return expired
+
+    def release(self, owner, scene_ids=None, started=True):
+        query = ("UPDATE image_scenes SET status = ?, owner = NULL, lease_expires_at = NULL, attempts = attempts - ? "
+                 "WHERE status = ? AND owner = ?")
+        params = [QUEUED, 0 if started else 1, RUNNING, owner]
+        if scene_ids is not None:
+            query += f" AND scene_id IN ({', '.join('?' * len(scene_ids))})"
+            params += list(scene_ids)
+        with self._lock:
+            return self._conn.execute(query, params).rowcount
+
+    def counts(self):
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM image_scenes WHERE status IN (?, ?) GROUP BY status", (QUEUED, RUNNING),
+            ).fetchall())
+            jobs = self._conn.execute("SELECT COUNT(*) FROM image_jobs").fetchone()[0]
+        return {"queued": counts.get(QUEUED, 0), "running": counts.get(RUNNING, 0), "jobs": jobs}
+
+    def mark_notified(self, job_id, storyboard_id):
+        with self._lock:
+            return self._conn.execute(
+                "INSERT OR IGNORE INTO image_notifications (job_id, storyboard_id) VALUES (?, ?)", (job_id, storyboard_id),
+            ).rowcount == 1
+
+    def evict(self, retention_seconds):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                expired = "SELECT job_id FROM image_scenes GROUP BY job_id " \
+                          "HAVING SUM(status IN (?, ?)) = 0 AND MAX(finished_at) < ?"
+                args = (QUEUED, RUNNING, time.time() - retention_seconds)
+                self._conn.execute(f"DELETE FROM image_jobs WHERE job_id IN ({expired})", args)
+                self._conn.execute(f"DELETE FROM image_notifications WHERE job_id IN ({expired})", args)
+                self._conn.execute(f"DELETE FROM image_scenes WHERE job_id IN ({expired})", args)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _scene(row):
+        scene = dict(row)
+        scene["request"] = json.loads(scene["request"])
+        return scene
+
+
+def create_job_store(url):
+    """
+    URL 로 작업 저장소를 생성합니다.
+
+    Args:
+        url (str): "memory://" 또는 "sqlite:///경로".
+
+    Returns:
+        JobStore: 생성된 저장소.
+    """
+    if url.startswith("memory://"):
+        return MemoryJobStore()
+    if url.startswith("sqlite:///"):
+        return SqliteJobStore(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported job store url: {url}")
@@ -0,0 +1,142 @@
+import atexit
+import contextvars
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from config.runtime import (LOG_FORMAT, LOG_LEVEL, LOG_LEVELS, LOG_MAX_PAYLOAD_CHARS, LOG_PAYLOAD_SAMPLE_RATE,
+                            LOG_QUEUE_SIZE)
+from utils.metrics import Gauge
+
+# 요청 / 이미지 작업 상관관계 ID. 로그 레코드마다 자동으로 붙습니다.
+request_id_var = contextvars.ContextVar("request_id", default=None)
+job_id_var = contextvars.ContextVar("job_id", default=None)
+
+# LogRecord 기본 속성. 이 외의 속성(extra=...)은 JSON 필드로 출력합니다.
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+_queue_handler = None
+
+
+class ContextFilter(logging.Filter):
+    """
+    로그를 남기는 스레드에서 request_id / job_id 를 레코드에 복사합니다.
+    """
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        record.job_id = job_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    한 줄짜리 JSON 로그 포맷.
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    로그를 큐에 넣기만 하는 핸들러. 큐가 가득 차면 요청 처리를 막지 않도록 로그를 버리고 개수만 셉니다.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # 메시지 포맷팅은 리스너 스레드에서 하도록 레코드를 그대로 넘깁니다.
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging():
+    """
+    루트 로거를 큐 기반 비동기 핸들러로 설정합니다. 실제 stdout 출력은 리스너 스레드가 담당합니다.
+    여러 번 호출해도 한 번만 설정됩니다.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s/%(job_id)s] %(message)s"))
+
+    queue_handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    queue_handler.addFilter(ContextFilter())
+    _queue_handler = queue_handler
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL.upper())
+    for item in filter(None, (part.strip() for part in LOG_LEVELS.split(","))):
+        name, _, level = item.partition("=")
+        logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+    _listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """
+    큐에 남은 로그를 모두 출력하고 리스너 스레드를 종료합니다.
+    루트 로거에서 큐 핸들러를 먼저 떼어, 종료 뒤에 남기는 로그가 읽을 리스너가 없는 큐에 쌓이지 않게 합니다.
+    """
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+# 큐가 가득 차 버려진 로그 수
+Gauge("log_records_dropped", "Log records dropped because the log queue was full",
+      callback=lambda: _queue_handler.dropped if _queue_handler is not None else 0)
+
+
+def truncate(value, limit=LOG_MAX_PAYLOAD_CHARS):
+    """
+    큰 본문을 로그에 남길 때 앞부분만 남깁니다.
+    """
+    text = value if isinstance(value, str) else str(value)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}...(+{len(text) - limit} chars)"
+
+
+def sampled(rate=LOG_PAYLOAD_SAMPLE_RATE):
+    """
+    본문 전체를 남길지 샘플링합니다. 예: if logger.isEnabledFor(logging.DEBUG) and sampled(): ...
+    """
+    return random.random() < rate
@@ -0,0 +1,192 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# 요청 / 단계별 소요 시간 히스토그램 버킷(초). GPT 호출이 수십 초 걸리므로 넉넉하게 잡습니다.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, math.inf)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+    def _samples(self):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    증가만 하는 값. 예: 토큰 사용량, 원인별 오류 수.
+    """
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """
+    현재 값. callback 을 주면 수집할 때마다 callback() 값을 읽습니다. (라벨이 있으면 {라벨 값 튜플: 값} 반환)
+    """
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        self._callback = callback
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def _samples(self):
+        if self._callback is not None:
+            value = self._callback()
+            items = value.items() if isinstance(value, dict) else [((), value)]
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """
+    소요 시간 분포. 예: 라우트별 요청 지연, 단계별 처리 시간.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self._buckets = tuple(buckets)
+        self._values = {}  # key -> [버킷별 개수, 합계, 개수]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self._buckets), 0.0, 0]
+            for i, bound in enumerate(self._buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        lines = []
+        for key, (counts, total, count) in items:
+            for bound, bucket_count in zip(self._buckets, counts):
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+def render_metrics():
+    """
+    등록된 모든 지표를 Prometheus 텍스트 형식으로 반환합니다.
+    """
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# 생성 파이프라인 공통 지표
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status"))
+STAGE_LATENCY = Histogram(
+    "pipeline_stage_duration_seconds",
+    "Time spent per pipeline stage (prompt_build, openai, parse, image_download, s3_upload)", ("stage",))
+OPENAI_TOKENS = Counter("openai_tokens_total", "OpenAI token usage from response.usage", ("model", "kind"))
+OPENAI_CALL_TOKENS = Histogram("openai_call_tokens", "Tokens per OpenAI call from response.usage", ("model", "kind"),
+                               buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384))
+OPENAI_RETRIES = Counter("openai_retries_total", "OpenAI call retries", ("model", "reason"))
+ERRORS = Counter("pipeline_errors_total", "Errors by cause", ("cause",))
+THREADS = Gauge("process_threads", "Live threads in this process", callback=threading.active_count)
+
+
+def stage_timer(stage):
+    """
+    파이프라인 단계 소요 시간을 기록하는 컨텍스트 매니저. 예: with stage_timer("parse"): ...
+    """
+    return STAGE_LATENCY.time(stage=stage)
+
+
+def record_usage(model, usage):
+    # OpenAI 응답의 usage(프롬프트/응답 토큰 수)를 누적하고 호출별 분포를 기록합니다.
+    # cached 는 프롬프트 중 OpenAI 프롬프트 캐시로 처리된 토큰 수로, 고정 지시사항이 재사용되는지 확인하는 용도입니다.
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    counts = {
+        "prompt": usage.prompt_tokens or 0,
+        "completion": usage.completion_tokens or 0,
+        "cached": getattr(details, "cached_tokens", None) or 0,
+    }
+    for kind, count in counts.items():
+        OPENAI_TOKENS.inc(count, model=model, kind=kind)
+        OPENAI_CALL_TOKENS.observe(count, model=model, kind=kind)
+    return counts
@@ -0,0 +1,84 @@
+import asyncio
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import TYPE_CHECKING
+
+from config.runtime import (OPENAI_KEEPALIVE_EXPIRY, OPENAI_MAX_CONNECTIONS, OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                            OPENAI_TIMEOUT)
+from config.settings import OPENAI_API_KEY
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# 앱 전체가 공유하는 AsyncOpenAI 클라이언트와, 그 클라이언트가 묶여 있는 이벤트 루프
+_client = None
+_loop = None
+
+
+def create_openai_client() -> "AsyncOpenAI":
+    """
+    커넥션 풀과 keep-alive 가 설정된 AsyncOpenAI 클라이언트를 생성합니다.
+    openai SDK 는 import 에 시간이 오래 걸리므로 모듈 로드 시점이 아니라 여기(lifespan 시작)에서 import 합니다.
+
+    Returns:
+        AsyncOpenAI: 새 클라이언트.
+    """
+    import httpx
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+    http_client = DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+        ),
+    )
+    # 재시도는 utils.openai_scheduler 가 담당하므로 SDK 자체 재시도는 끕니다.
+    return AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=http_client, timeout=OPENAI_TIMEOUT, max_retries=0)
+
+
+async def start_openai_client():
+    """
+    FastAPI lifespan 시작 시 호출합니다. 공유 클라이언트를 만들고 현재 이벤트 루프에 묶습니다.
+    """
+    global _client, _loop
+    _client = create_openai_client()
+    _loop = asyncio.get_running_loop()
+
+
+async def close_openai_client():
+    """
+    FastAPI lifespan 종료 시 호출합니다. 커넥션 풀을 정리합니다.
+    """
+    global _client, _loop
+    if _client is not None:
+        await _client.close()
+    _client = None
+    _loop = None
+
+
+def get_openai_client() -> "AsyncOpenAI":
+    if _client is None:
+        raise RuntimeError("OpenAI client is not started")
+    return _client
+
+
+def run_from_thread(coro, timeout=OPENAI_TIMEOUT):
+    """
+    워커 스레드에서 공유 클라이언트를 쓰는 코루틴을 앱 이벤트 루프에 넘겨 실행하고 결과를 기다립니다.
+
+    Args:
+        coro (coroutine): get_openai_client() 를 사용하는 코루틴.
+        timeout (float): 결과를 기다릴 최대 시간(초). 초과하면 코루틴을 취소합니다.
+
+    Returns:
+        코루틴의 반환 값.
+    """
+    if _loop is None:
+        coro.close()
+        raise RuntimeError("OpenAI client is not started")
+    future = asyncio.run_coroutine_threadsafe(coro, _loop)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import random
+import time
+
+from config.runtime import OPENAI_BACKOFF_BASE, OPENAI_BACKOFF_MAX, OPENAI_MAX_ATTEMPTS, OPENAI_RATE_LIMITS
+from utils.metrics import ERRORS, OPENAI_RETRIES, record_usage, stage_timer
+from utils.prompts import count_message_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    호출 기한 안에 OpenAI 호출을 끝낼 수 없을 때 발생합니다.
+    """
+
+
+class TokenBucket:
+    """
+    분당 허용량(rate_per_minute)만큼 채워지는 토큰 버킷. 대기 순서를 지키기 위해 한 번에 한 요청만 기다립니다.
+    """
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.tokens = self.capacity
+        self._rate = self.capacity / 60.0
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount, deadline_at):
+        amount = min(float(amount), self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self._rate)
+                self._updated_at = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self._rate
+                if now + wait > deadline_at:
+                    raise DeadlineExceeded("Rate limit wait exceeds the call deadline")
+                await asyncio.sleep(wait)
+
+
+def estimate_tokens(messages, max_tokens=1024):
+    """
+    분당 토큰 버킷에서 미리 차감할 토큰 수를 계산합니다. (프롬프트 토큰 수 + 응답 상한)
+    """
+    return count_message_tokens(messages) + max_tokens
+
+
+def _retry_after(error):
+    # 서버가 알려준 대기 시간(초). retry-after-ms, retry-after(초) 순으로 확인
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = response.headers.get(header)
+        if value is None:
+            continue
+        try:
+            return float(value) * scale
+        except ValueError:
+            continue  # HTTP-date 형식은 무시하고 백오프로 대체
+    return None
+
+
+def _is_retryable(error):
+    import openai
+
+    if isinstance(error, openai.RateLimitError):
+        # 잔액 부족은 기다려도 풀리지 않습니다.
+        return getattr(error, "code", None) != "insufficient_quota"
+    return isinstance(error, (openai.APIConnectionError, openai.InternalServerError))
+
+
+def _error_cause(error):
+    # 오류 카운터 라벨
+    import openai
+
+    if isinstance(error, openai.RateLimitError):
+        return "openai_rate_limit"
+    if isinstance(error, openai.APITimeoutError):
+        return "openai_timeout"
+    if isinstance(error, openai.APIConnectionError):
+        return "openai_connection"
+    if isinstance(error, openai.InternalServerError):
+        return "openai_5xx"
+    return "openai_error"
+
+
+class OpenAIScheduler:
+    """
+    모든 OpenAI 호출 앞단의 스케줄러.
+
+    모델별 분당 요청 수(rpm) / 분당 토큰 수(tpm) 토큰 버킷으로 호출 속도를 맞추고,
+    429 · 5xx · 연결 오류는 Retry-After 헤더를 우선으로, 없으면 지터가 섞인 지수 백오프로 재시도합니다.
+    대기와 재시도를 포함한 전체 시간은 호출마다 주어진 기한(deadline)을 넘지 않습니다.
+
+    Args:
+        limits (dict): 모델명 -> {"rpm": int, "tpm": int}
+        max_attempts (int): 최대 시도 횟수.
+        backoff_base (float): 첫 백오프 상한(초). 시도마다 두 배가 됩니다.
+        backoff_max (float): 백오프 상한의 최대 값(초).
+    """
+
+    def __init__(self, limits, max_attempts, backoff_base, backoff_max):
+        self._buckets = {}
+        for model, limit in limits.items():
+            requests = TokenBucket(limit["rpm"]) if limit.get("rpm") else None
+            tokens = TokenBucket(limit["tpm"]) if limit.get("tpm") else None
+            self._buckets[model] = (requests, tokens)
+        self._max_attempts = max(1, max_attempts)
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self.retries = 0  # 재시도 횟수
+        self.throttled = 0  # 429 응답 수
+
+    async def call(self, model, fn, deadline, estimated_tokens=0):
+        """
+        Args:
+            model (str): 호출할 모델명 (OPENAI_RATE_LIMITS 의 key).
+            fn (callable): 인자 없이 OpenAI 호출 코루틴을 반환하는 함수. 재시도마다 다시 호출됩니다.
+            deadline (float): 대기 · 재시도를 포함한 전체 기한(초).
+            estimated_tokens (int): 분당 토큰 버킷에서 차감할 예상 토큰 수.
+
+        Returns:
+            fn 코루틴의 결과.
+        """
+        # openai SDK 는 공유 클라이언트를 만들 때 이미 import 되어 있으므로 여기서는 sys.modules 조회만 합니다.
+        import openai
+
+        deadline_at = time.monotonic() + deadline
+        requests, tokens = self._buckets.get(model, (None, None))
+
+        for attempt in range(1, self._max_attempts + 1):
+            if requests is not None:
+                await requests.acquire(1, deadline_at)
+            if tokens is not None and estimated_tokens:
+                await tokens.acquire(estimated_tokens, deadline_at)
+
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                ERRORS.inc(cause="openai_deadline")
+                raise DeadlineExceeded(f"{model} call deadline exceeded")
+            try:
+                with stage_timer("openai"):
+                    result = await asyncio.wait_for(fn(), timeout=remaining)
+                usage = record_usage(model, getattr(result, "usage", None))
+                if usage is not None:
+                    logger.debug("openai usage", extra={"model": model, **usage})
+                return result
+            except asyncio.TimeoutError:
+                ERRORS.inc(cause="openai_deadline")
+                raise DeadlineExceeded(f"{model} call deadline exceeded")
+            except openai.OpenAIError as e:
+                reason = _error_cause(e)
+                if not _is_retryable(e) or attempt == self._max_attempts:
+                    ERRORS.inc(cause=reason)
+                    raise
+                if isinstance(e, openai.RateLimitError):
+                    self.throttled += 1
+                delay = _retry_after(e)
+                if delay is None:
+                    # full jitter: 0 ~ min(max, base * 2^(attempt-1))
+                    delay = random.uniform(0, min(self._backoff_max, self._backoff_base * 2 ** (attempt - 1)))
+                if time.monotonic() + delay >= deadline_at:
+                    ERRORS.inc(cause=reason)
+                    raise
+                self.retries += 1
+                OPENAI_RETRIES.inc(model=model, reason=reason)
+                await asyncio.sleep(delay)
+
+
+# 앱 전체가 공유하는 스케줄러
+scheduler = OpenAIScheduler(
+    limits=OPENAI_RATE_LIMITS,
+    max_attempts=OPENAI_MAX_ATTEMPTS,
+    backoff_base=OPENAI_BACKOFF_BASE,
+    backoff_max=OPENAI_BACKOFF_MAX,
+)
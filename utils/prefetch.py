@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import time
+
+from config.runtime import (PREFETCH_CLIENT_BUDGET, PREFETCH_ENABLED, PREFETCH_MAX_ENTRIES, PREFETCH_SESSION_BUDGET,
+                            PREFETCH_SESSION_WINDOW, PREFETCH_TTL)
+from utils.admission import client_id_of
+from utils.metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    def __init__(self, task, expires_at):
+        self.task = task
+        self.expires_at = expires_at
+
+
+def _log_failure(task):
+    # 실패한 추측 호출은 기록만 하고 버립니다. 같은 요청이 오면 그때 다시 생성합니다.
+    if not task.cancelled() and task.exception() is not None:
+        logger.info("prefetch failed: %s", task.exception())
+
+
+class PrefetchStore:
+    """
+    사용자가 다음 단계를 요청하기 전에 GPT 호출을 미리 시작하고, 그 결과를 잠시 보관하는 저장소입니다.
+
+    미리 시작한 호출은 key 별 asyncio Task 로 보관하고, 이후 같은 key 의 요청이 take() 로 꺼내 갑니다.
+    아직 진행 중이면 그 호출이 끝나기를 기다리므로 GPT 호출이 두 번 나가지 않습니다.
+    세션마다 window 동안 시작할 수 있는 추측 호출 수(session_budget)를 제한해 추가 비용을 일정하게 유지하고,
+    ttl 안에 꺼내 가지 않은 결과는 버립니다. 세션 ID 는 클라이언트가 보내는 값이므로, 세션을 바꿔 가며 예산을 피하지 못하도록
+    클라이언트(requester_id_of)마다 전체 상한(client_budget)도 함께 적용합니다.
+
+    Args:
+        ttl (float): 결과 보관 시간(초).
+        session_budget (int): 세션당 window 동안 시작할 수 있는 추측 호출 수.
+        client_budget (int): 클라이언트당 window 동안 시작할 수 있는 추측 호출 수.
+        window (float): 예산이 초기화되는 주기(초).
+        max_entries (int): 동시에 보관하는 항목 수 상한.
+        enabled (bool): False 면 schedule() 이 아무 것도 시작하지 않습니다.
+    """
+
+    def __init__(self, ttl, session_budget, client_budget, window, max_entries, enabled=True):
+        self._ttl = ttl
+        self._session_budget = session_budget
+        self._client_budget = client_budget
+        self._window = window
+        self._max_entries = max_entries
+        self._enabled = enabled
+        self._entries = {}  # key -> _Entry
+        self._sessions = {}  # session_id -> (window 시작 시각, 사용한 호출 수)
+        self._clients = {}  # client_id -> (window 시작 시각, 사용한 호출 수)
+        self.scheduled = 0  # 시작한 추측 호출 수
+        self.hits = 0  # 요청이 미리 만든 결과를 사용한 수
+        self.rejected = 0  # 예산/용량 초과로 시작하지 않은 수
+        self.wasted = 0  # 사용되지 않고 버려진 수
+
+    def schedule(self, session_id, key, fn, client_id=None, acquire=None):
+        """
+        fn 코루틴을 백그라운드에서 시작합니다. 이벤트 루프 안에서 호출해야 합니다.
+
+        Args:
+            session_id (str): 예산을 계산할 세션 ID.
+            key (str): 결과를 찾을 key. 이후 요청이 같은 key 로 take() 합니다.
+            fn (callable): 인자 없이 코루틴을 반환하는 함수.
+            client_id (str): 클라이언트 예산을 계산할 ID (requester_id_of). 없으면 session_id.
+            acquire (callable): 수락 제어 자리를 기다리지 않고 얻는 함수 (예: AdmissionController.try_acquire).
+                Ticket 을 얻으면 추측 호출이 끝날 때 돌려주고, None 이면(과부하) 시작하지 않습니다.
+
+        Returns:
+            bool: 새로 시작했으면 True. 이미 같은 key 가 있거나 예산/자리가 없으면 False.
+        """
+        if not self._enabled:
+            return False
+        self._evict_expired()
+        if key in self._entries:
+            return False
+        client_id = client_id or session_id
+        if len(self._entries) >= self._max_entries or not self._within_budget(session_id, client_id):
+            self.rejected += 1
+            return False
+        ticket = acquire() if acquire is not None else None
+        if acquire is not None and ticket is None:
+            self.rejected += 1
+            return False
+        self._charge(session_id, client_id)
+
+        task = asyncio.ensure_future(fn())
+        task.add_done_callback(_log_failure)
+        if ticket is not None:
+            # 시작 전에 취소되어도 자리가 남지 않도록 Task 가 끝날 때 돌려줍니다.
+            task.add_done_callback(lambda _: ticket.release())
+        self._entries[key] = _Entry(task, time.monotonic() + self._ttl)
+        self.scheduled += 1
+        return True
+
+    async def take(self, key):
+        """
+        미리 만든 결과를 꺼냅니다. 진행 중이면 끝날 때까지 기다립니다.
+
+        Returns:
+            결과. 없거나 만료되었거나 실패했으면 None.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        if entry.expires_at < time.monotonic():
+            self._discard(entry)
+            return None
+        try:
+            result = await asyncio.shield(entry.task)
+        except asyncio.CancelledError:
+            if entry.task.cancelled():
+                return None
+            # 요청 쪽이 취소된 경우: 다음 요청이 쓸 수 있도록 돌려놓습니다.
+            self._entries.setdefault(key, entry)
+            raise
+        except Exception:
+            return None
+        self.hits += 1
+        return result
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "scheduled": self.scheduled,
+            "hits": self.hits,
+            "rejected": self.rejected,
+            "wasted": self.wasted,
+        }
+
+    def close(self):
+        # 앱 종료 시 진행 중인 추측 호출을 취소합니다.
+        for entry in self._entries.values():
+            entry.task.cancel()
+        self._entries.clear()
+
+    def _used(self, usage, key, now):
+        started, used = usage.get(key, (now, 0))
+        if now - started > self._window:
+            started, used = now, 0
+        return started, used
+
+    def _within_budget(self, session_id, client_id):
+        now = time.monotonic()
+        return (self._used(self._sessions, session_id, now)[1] < self._session_budget
+                and self._used(self._clients, client_id, now)[1] < self._client_budget)
+
+    def _charge(self, session_id, client_id):
+        now = time.monotonic()
+        for usage, key in ((self._sessions, session_id), (self._clients, client_id)):
+            started, used = self._used(usage, key, now)
+            usage[key] = (started, used + 1)
+
+    def _discard(self, entry):
+        self.wasted += 1
+        entry.task.cancel()
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if entry.expires_at < now]:
+            self._discard(self._entries.pop(key))
+        for usage in (self._sessions, self._clients):
+            for key in [key for key, (started, _) in usage.items() if now - started > self._window]:
+                del usage[key]
+
+
+# 앱 전체가 공유하는 prefetch 저장소
+prefetch_store = PrefetchStore(ttl=PREFETCH_TTL, session_budget=PREFETCH_SESSION_BUDGET,
+                               client_budget=PREFETCH_CLIENT_BUDGET, window=PREFETCH_SESSION_WINDOW,
+                               max_entries=PREFETCH_MAX_ENTRIES, enabled=PREFETCH_ENABLED)
+
+Gauge("prefetch_calls", "Speculative GPT calls by outcome", ("outcome",),
+      callback=lambda: {(name,): value for name, value in prefetch_store.stats().items() if name != "entries"})
+Gauge("prefetch_entries", "Prefetched results waiting to be used", callback=lambda: prefetch_store.stats()["entries"])
+
+
+def session_id_of(request):
+    """
+    예산을 계산할 세션 ID. X-Session-ID 헤더가 없으면 클라이언트 주소를 사용합니다.
+    클라이언트가 마음대로 바꿀 수 있는 값이므로 PrefetchStore 는 클라이언트 예산(requester_id_of)도 함께 적용합니다.
+    """
+    return request.headers.get("X-Session-ID") or (request.client.host if request.client else "anonymous")
+
+
+def requester_id_of(request):
+    """
+    클라이언트 예산을 계산할 ID. client_id_of(X-API-Key, X-Tenant-ID) 가 없으면 클라이언트 주소를 사용합니다.
+    """
+    return client_id_of(request) or (request.client.host if request.client else "anonymous")
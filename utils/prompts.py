@@ -0,0 +1,224 @@
+import logging
+import threading
+from urllib.parse import urlsplit, urlunsplit
+
+from config.runtime import IMAGE_PROMPT_MAX_CHARS, PROMPT_MAX_IMAGE_URLS, PROMPT_TOKEN_BUDGET
+
+logger = logging.getLogger(__name__)
+
+# 프롬프트 구성 공통 모듈
+# 요청마다 바뀌지 않는 지시사항·예시는 아래 상수로 두고 항상 메시지 맨 앞에 같은 바이트로 보냅니다.
+# 요청마다 바뀌는 입력값은 마지막 user 메시지에만 넣어 OpenAI 프롬프트 캐시가 앞부분을 재사용할 수 있게 합니다.
+
+STORYBOARD_INSTRUCTIONS = (
+    "### 지시사항 ###\n"
+    "당신은 여행 영상 스토리보드 생성 전문가입니다. 주어진 정보를 바탕으로 적당한 개수의 씬으로 나눠서 스토리보드를 작성해주세요. 스토리보드 작성 시, 각 항목의 지침을 철저히 따르고 정확하게 작성해주세요. 다음의 지시사항을 따르면 팁을 제공할 것입니다.\n"
+    "씬을 제외하고는 어떠한 추가적인 내용을 포함하지 말아주세요.\n\n"
+    "스토리보드 양식:\n"
+    "- scene (여기에 씬 순서를 넣어주세요.) \"여기에 씬 제목을 넣어주세요.\":\n"
+    "    1. **영상**: 이 씬에서 어떤 장면이 나오는지 자세히 설명해주세요. (중요: 자연스럽고 사람과 같은 스타일로 서술)\n"
+    "    2. **화각**: 카메라가 어떤 각도에서 장면을 촬영하는지 설명해주세요.\n"
+    "    3. **카메라 무빙**: 카메라가 어떻게 움직이는지, 특별한 촬영 기법이 있다면 설명해주세요. (특정 장비나 기법 언급 없이, 단순히 카메라 움직임에만 집중)\n"
+    "    4. **구도**: 화면에서 대상이 어떻게 배치되고, 어떤 느낌을 주는지 설명해주세요.\n\n"
+    "### 예시 ###\n"
+    "- scene 1 \"별과 역사의 시작\":\n"
+    "1. **영상**: 소백산 천문대의 전경과 주변 자연경관을 보여주는 장면으로 시작. 푸른 하늘 아래 우뚝 서 있는 천문대의 모습과 숲으로 둘러싸인 아름다운 경치를 보여줍니다.\n"
+    "2. **화각**: 드론 카메라로 공중에서 천문대와 주변 풍경을 넓게 담습니다.\n"
+    "3. **카메라 무빙**: 천문대를 중심으로 둥글게 빙글빙글 돌며 점점 하강해 천문대의 근접 샷으로 이어집니다.\n"
+    "4. **구도**: 천문대를 중심으로 하늘과 숲이 좌우 대칭으로 배치되어 있고, 천문대가 하늘을 향해 솟아오른 느낌을 줍니다.\n\n"
+    "당신의 작업은 여행지와 인간의 움직임이 조화롭게 어우러지는 영상을 기반으로, 스토리보드 내용의 자연스러운 흐름을 만들어주세요.\n"
+    "여행지의 매력을 돋보이게 하고, 여행자들의 감정을 담아낼 수 있는 구성으로 작성해주세요.\n"
+    "여행 정보는 마지막 메시지에 주어집니다."
+)
+
+# 구조화 출력(JSON) 모드에서 STORYBOARD_INSTRUCTIONS 뒤에 붙이는 지시사항
+STORYBOARD_JSON_INSTRUCTIONS = (
+    "응답은 스토리보드 양식 대신 주어진 JSON 스키마의 scenes 배열로 작성하세요. "
+    "order_num 은 씬 순서, scene_title 은 씬 제목, description 은 영상, camera_angle 은 화각, "
+    "camera_movement 는 카메라 무빙, composition 은 구도 항목입니다."
+)
+
+STORYBOARD_EDIT_INSTRUCTIONS = (
+    "### 지시사항 ###\n"
+    "당신은 여행 영상 스토리보드 생성 전문가입니다. 이미 작성된 스토리보드에서 수정 요청을 받은 씬만 요청에 맞게 다시 작성해주세요.\n"
+    "다른 씬과의 흐름이 자연스럽도록 하고, 요청한 씬 외에는 작성하지 마세요.\n"
+    "각 씬의 description 은 영상(자연스럽고 사람과 같은 스타일로 서술), camera_angle 은 화각, camera_movement 는 카메라 무빙"
+    "(특정 장비나 기법 언급 없이), composition 은 구도 항목입니다. order_num 은 기존 씬 순서를 그대로 사용하세요.\n"
+    "여행 정보, 전체 스토리보드 흐름, 수정할 씬의 현재 내용과 수정 요청은 마지막 메시지에 주어집니다."
+)
+
+TITLE_INSTRUCTIONS = (
+    "### 지시사항 ###\n"
+    "당신은 여행 관련 제목을 추천하는 전문가입니다. 각 제목은 매력적이고 주제를 잘 반영해야 합니다. 작업을 잘 수행하면 보상이 주어질 것입니다.\n\n"
+    "### 작성 형식 ###\n"
+    "항목순서. 여기에 제목을 기입해주세요.\n\n"
+    "예시:\n"
+    "1. [제목 예시]\n"
+    "2. [제목 예시]\n"
+    "3. [제목 예시]\n"
+    "4. [제목 예시]\n"
+    "5. [제목 예시]\n\n"
+    "### 주의사항 ###\n"
+    "정중한 표현은 피하고, 간결하고 명확하게 작성하세요. 제목은 자연스럽게 사람과 같은 스타일로 작성되어야 하며, 본래의 형식을 유지하세요."
+)
+
+INTRO_OUTRO_INSTRUCTIONS = (
+    "당신은 여행 영상 스토리보드를 위한 인트로와 아웃트로를 추천하는 전문가입니다. 각 인트로와 아웃트로는 영상의 분위기를 잘 반영해야 합니다. 올바르게 작성된 경우 보상을 받을 것입니다.\n\n"
+    "예시:\n"
+    "1. 새로운 시작: 첫 장면은 자연의 아름다움을 강조하며 화면이 서서히 밝아집니다.\n\n"
+    "### 주의사항 ###\n"
+    "정중한 표현은 피하고, 간결하고 명확하게 작성하세요.\n"
+    "### 작성 형식 ###\n"
+    "항목순서. [인트로/아웃트로 제목]: [설명]\n"
+    "인트로:\n"
+    "1. \n"
+    "2. \n"
+    "3. \n"
+    "4. \n"
+    "5. \n\n"
+    "아웃트로:\n"
+    "1. \n"
+    "2. \n"
+    "3. \n"
+    "4. \n"
+    "5. \n\n"
+    "작업을 잘 수행하면 보상을 받을 수 있습니다."
+)
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def load_tokenizer():
+    """
+    토큰 수 계산에 쓰는 tiktoken 인코딩을 불러옵니다. 앱/워커 시작 시 한 번 호출합니다.
+    인코딩 파일(BPE)은 처음 불러올 때 내려받으므로(TIKTOKEN_CACHE_DIR 에 캐시) 첫 요청이 기다리지 않도록 미리 불러 둡니다.
+    불러오지 못하면 경고를 한 번 남기고, 이후 토큰 수는 글자 수로 추정합니다.
+
+    Returns:
+        bool: 인코딩을 불러왔으면 True.
+    """
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+
+                    _encoding = tiktoken.get_encoding("o200k_base")  # gpt-4o 토크나이저
+                except Exception:
+                    logger.warning("tiktoken encoding unavailable, token counts fall back to an estimate",
+                                   exc_info=True)
+                    _encoding = False
+    return bool(_encoding)
+
+
+def count_tokens(text):
+    """
+    문자열의 토큰 수를 셉니다. 인코딩을 불러오지 못했으면 한글 기준 2글자당 1토큰으로 추정합니다.
+    """
+    if _encoding is None:
+        load_tokenizer()
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 2
+
+
+def count_message_tokens(messages):
+    # 메시지마다 역할 표시 등으로 붙는 토큰(약 4개)을 더합니다.
+    return sum(count_tokens(message["content"]) + 4 for message in messages)
+
+
+def compact_urls(urls, limit=PROMPT_MAX_IMAGE_URLS):
+    """
+    참조 이미지 URL 목록을 프롬프트용 한 줄로 줄입니다.
+    쿼리 문자열(서명 등)을 떼고 중복을 없앤 뒤 앞에서부터 limit 개만 남깁니다.
+
+    Returns:
+        str: 예: "https://.../a.jpg, https://.../b.jpg 외 3개". URL 이 없으면 "없음".
+    """
+    compacted = []
+    for url in urls:
+        parts = urlsplit(url.strip())
+        url = urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+        if url and url not in compacted:
+            compacted.append(url)
+    if not compacted:
+        return "없음"
+    text = ", ".join(compacted[:limit])
+    if len(compacted) > limit:
+        text += f" 외 {len(compacted) - limit}개"
+    return text
+
+
+def render_fields(fields):
+    # [(라벨, 값), ...] -> "라벨: 값" 줄
+    return "\n".join(f"{label}: {value}" for label, value in fields)
+
+
+def fit_fields(fields, budget, measure=count_tokens):
+    """
+    입력값 목록이 예산 안에 들어오도록 가장 긴 값부터 잘라냅니다.
+
+    Args:
+        fields (list): [(라벨, 값), ...].
+        budget (int): render_fields 결과가 넘지 않아야 하는 크기.
+        measure (callable): 크기를 재는 함수. 기본은 토큰 수, 글자 수 제한이면 len.
+
+    Returns:
+        list: 잘린 [(라벨, 값), ...].
+    """
+    fields = [(label, str(value)) for label, value in fields]
+    for _ in range(len(fields) * 32):
+        excess = measure(render_fields(fields)) - budget
+        if excess <= 0:
+            break
+        index = max(range(len(fields)), key=lambda i: len(fields[i][1]))
+        label, value = fields[index]
+        if not value:
+            break
+        # 토큰 하나는 한 글자 이상이므로 넘친 만큼 글자를 잘라도 예산보다 덜 잘릴 수 있어 다시 재며 반복합니다.
+        # 잘린 표시(…)도 한 글자를 씁니다.
+        keep = max(0, len(value) - excess - 1)
+        fields[index] = (label, value[:keep] + "…" if keep else "")
+    return fields
+
+
+def build_messages(instructions, fields, request_text=None, budget=PROMPT_TOKEN_BUDGET):
+    """
+    고정 지시사항 뒤에 요청마다 바뀌는 입력값을 붙인 chat 메시지를 만듭니다.
+
+    Args:
+        instructions (list): 고정 system 메시지 내용. 요청과 상관없이 같은 문자열이어야 프롬프트 캐시가 적용됩니다.
+        fields (list): [(라벨, 값), ...]. 마지막 user 메시지에 "라벨: 값" 줄로 들어갑니다.
+        request_text (str): 입력값 뒤에 붙일 요청 문장.
+        budget (int): 전체 입력 토큰 상한. 넘으면 입력값 중 긴 것부터 잘라냅니다.
+
+    Returns:
+        list: chat.completions 의 messages.
+    """
+    messages = [{"role": "system", "content": content} for content in instructions]
+    fixed = count_message_tokens(messages) + count_tokens(request_text or "") + 4
+    tail = render_fields(fit_fields(fields, max(0, budget - fixed)))
+    if request_text:
+        tail += "\n" + request_text
+    messages.append({"role": "user", "content": tail})
+    return messages
+
+
+def build_image_prompt(scene_description, destination, purpose, companion, companion_count, season, image_urls):
+    """
+    DALL·E 3 씬 이미지 프롬프트를 만듭니다. 참조 URL 은 줄여서 마지막에 두고, 전체를 IMAGE_PROMPT_MAX_CHARS 로 제한합니다.
+    """
+    fields = fit_fields([
+        ("장면", scene_description),
+        ("여행지", destination),
+        ("여행 목적", purpose),
+        ("동행인", f"{companion} {companion_count}명"),
+        ("계절", season),
+        ("참조 이미지", compact_urls(image_urls)),
+    ], IMAGE_PROMPT_MAX_CHARS - 100, measure=len)
+    return (
+        "아래 장면을 여행지에서 여행 목적에 맞게 동행인과 함께한 계절의 분위기와 색감을 담은 시네마틱한 이미지로 만들어주세요.\n"
+        + render_fields(fields)
+    )
@@ -0,0 +1,259 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from utils.metrics import Counter
+
+CACHE_LOOKUPS = Counter("response_cache_lookups_total", "Cache lookups by cache and result", ("cache", "result"))
+
+
+def _normalize(value):
+    # 공백/유니코드 정규화로 사소한 입력 차이가 다른 key 가 되지 않도록 합니다.
+    if isinstance(value, str):
+        return " ".join(unicodedata.normalize("NFC", value).split())
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def make_cache_key(namespace, params):
+    """
+    프롬프트 입력값과 모델 파라미터로 캐시 key 를 만듭니다.
+
+    Args:
+        namespace (str): 호출 종류 (예: "titles", "iotros").
+        params (dict): 프롬프트 입력값과 모델 파라미터.
+
+    Returns:
+        str: "namespace:sha256" 형태의 key.
+    """
+    payload = json.dumps(_normalize(params), sort_keys=True, ensure_ascii=False)
+    return f"{namespace}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+class CacheBackend(ABC):
+    """
+    응답 캐시 백엔드의 공통 인터페이스. 값은 JSON 으로 직렬화할 수 있어야 합니다.
+    다른 공유 저장소(Redis 등)를 붙일 때는 이 클래스를 상속해 _get/_set/_delete/_contains/_size 를 구현합니다.
+    이벤트 루프에서는 aget/aset/acontains/astats 를 사용합니다. blocking 백엔드(파일/네트워크)는 스레드에서 실행해
+    다른 워커의 쓰기 잠금을 기다리는 동안에도 이벤트 루프를 막지 않습니다.
+    """
+
+    blocking = False  # 조회/저장이 I/O 를 기다리는 백엔드는 True
+
+    def __init__(self, maxsize, ttl, name="response"):
+        self.name = name  # 지표 라벨
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        value = self._get(key)
+        result = "miss" if value is None else "hit"
+        # 여러 스레드(이미지 워커, asyncio.to_thread)에서 불리므로 잠금 안에서 셉니다.
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        CACHE_LOOKUPS.inc(cache=self.name, result=result)
+        return value
+
+    def contains(self, key):
+        # 유효한 항목이 있는지만 확인합니다. hit/miss 통계와 LRU 순서는 바꾸지 않습니다 (미리 생성 여부 판단용).
+        return self._contains(key)
+
+    def set(self, key, value):
+        self._set(key, value)
+
+    def delete(self, key):
+        self._delete(key)
+
+    async def aget(self, key):
+        return await self._run(self.get, key)
+
+    async def aset(self, key, value):
+        await self._run(self.set, key, value)
+
+    async def acontains(self, key):
+        return await self._run(self.contains, key)
+
+    async def astats(self):
+        return await self._run(self.stats)
+
+    async def _run(self, fn, *args):
+        if self.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "backend": type(self).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "size": self._size(),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+        }
+
+    @abstractmethod
+    def _get(self, key):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _set(self, key, value):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _delete(self, key):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _contains(self, key):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _size(self):
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """
+    프로세스 내부 TTL + LRU 캐시.
+    """
+
+    def __init__(self, maxsize, ttl, name="response"):
+        super().__init__(maxsize, ttl, name)
+        self._data = OrderedDict()  # key -> (expires_at, value)
+
+    def _get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def _set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.time() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def _delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def _contains(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            return item is not None and item[0] >= time.time()
+
+    def _size(self):
+        with self._lock:
+            return len(self._data)
+
+
+class SqliteCache(CacheBackend):
+    """
+    SQLite 파일 기반 TTL + LRU 캐시. 같은 호스트의 여러 uvicorn 워커가 파일을 공유해 hit 을 나눠 씁니다.
+    hit/miss 카운터는 프로세스별로 집계됩니다. 잠금 대기(최대 5초)가 있으므로 blocking 백엔드입니다.
+    """
+
+    blocking = True
+
+    def __init__(self, path, maxsize, ttl, name="response"):
+        super().__init__(maxsize, ttl, name)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS response_cache_accessed ON response_cache (accessed_at)")
+        self._conn.commit()
+
+    def _get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM response_cache WHERE key = ? AND expires_at >= ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE response_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def _set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + self.ttl, now),
+            )
+            # 만료 항목을 먼저 지우고, 그래도 넘치면 가장 오래 사용되지 않은 항목부터 제거
+            expired = self._conn.execute("DELETE FROM response_cache WHERE expires_at < ?", (now,)).rowcount
+            overflow = self._conn.execute(
+                "DELETE FROM response_cache WHERE key IN ("
+                "SELECT key FROM response_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            ).rowcount
+            self._conn.commit()
+            self.evictions += expired + overflow
+
+    def _delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _contains(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM response_cache WHERE key = ? AND expires_at >= ?", (key, time.time())
+            ).fetchone()
+        return row is not None
+
+    def _size(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+
+def create_cache(url, maxsize, ttl, name="response"):
+    """
+    URL 로 캐시 백엔드를 생성합니다.
+
+    Args:
+        url (str): "memory://" 또는 "sqlite:///경로".
+        maxsize (int): 최대 항목 수.
+        ttl (float): 항목 유효 시간(초).
+        name (str): response_cache_lookups_total 지표의 cache 라벨.
+
+    Returns:
+        CacheBackend: 생성된 캐시.
+    """
+    if url.startswith("memory://"):
+        return MemoryCache(maxsize, ttl, name)
+    if url.startswith("sqlite:///"):
+        return SqliteCache(url[len("sqlite:///"):], maxsize, ttl, name)
+    raise ValueError(f"Unsupported cache url: {url}")
@@ -1,47 +1,244 @@
-import requests
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-import boto3
-from botocore.exceptions import NoCredentialsError
-from botocore.config import Config
+from config.runtime import S3_ENDPOINT_URL, S3_MAX_POOL_CONNECTIONS, S3_UPLOAD_MAX_WORKERS
+from config.settings import AWS_BUCKET_NAME
+from utils.metrics import ERRORS, stage_timer
 
+logger = logging.getLogger(__name__)
+
+# boto3/botocore 와 requests 는 import 에 시간이 오래 걸리므로 처음 사용할 때 import 합니다.
+# (이미지 라우터를 쓰지 않는 프로세스는 로드하지 않고, API 프로세스 시작도 그만큼 빨라집니다.)
+_s3_client = None
+_transfer_config = None
+_s3_client_lock = threading.Lock()
 
-from config.settings import AWS_BUCKET_NAME
 
-config = Config(connect_timeout=90, read_timeout=90, retries={'max_attempts': 7})
+def get_s3_client():
+    """
+    프로세스 전체가 공유하는 S3 클라이언트를 반환합니다.
+    boto3 client 는 스레드 간에 공유해도 안전하므로, 처음 호출될 때 한 번만 생성합니다.
+    """
+    global _s3_client, _transfer_config
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                import boto3
+                from boto3.s3.transfer import TransferConfig
+                from botocore.config import Config
+
+                config = Config(connect_timeout=90, read_timeout=90, retries={'max_attempts': 7},
+                                max_pool_connections=S3_MAX_POOL_CONNECTIONS)
+                # 스트리밍 업로드 설정: 8MB 를 넘으면 multipart 로 올리고, 전송 하나가 쓰는 메모리는 chunksize * max_concurrency 로 제한
+                _transfer_config = TransferConfig(
+                    multipart_threshold=8 * 1024 * 1024,
+                    multipart_chunksize=8 * 1024 * 1024,
+                    max_concurrency=2,
+                )
+                # 기본 세션은 스레드 안전하지 않으므로 전용 세션에서 생성
+                _s3_client = boto3.session.Session().client('s3', config=config, endpoint_url=S3_ENDPOINT_URL)
+    return _s3_client
+
 
 def upload_to_s3(local_file: str, s3_file: str, bucket_name: str = AWS_BUCKET_NAME):
-    # S3 client 생성
-    s3_client = boto3.client('s3', config=config)
+    s3_client = get_s3_client()
+    from botocore.exceptions import NoCredentialsError
 
     try:
         # 파일 업로드
-        s3_client.upload_file(local_file, bucket_name, s3_file)
-        print(f'Upload Successful: {s3_file}')
+        with stage_timer("s3_upload"):
+            s3_client.upload_file(local_file, bucket_name, s3_file)
+        logger.debug("upload successful", extra={"s3_key": s3_file})
         return True
     except FileNotFoundError:
-        print(f'The file {local_file} was not found')
+        logger.error("upload source file not found", extra={"local_file": local_file})
+        return False
+    except NoCredentialsError:
+        ERRORS.inc(cause="s3_credentials")
+        logger.error("S3 credentials not available", extra={"s3_key": s3_file})
+        return False
+    except Exception as e:
+        ERRORS.inc(cause="s3_upload")
+        logger.warning("upload failed: %s", e, extra={"s3_key": s3_file})
+        return False
+
+
+def stream_url_to_s3(url: str, s3_file: str, bucket_name: str = AWS_BUCKET_NAME, content_type: str = None,
+                     metadata: dict = None):
+    """
+    URL 의 응답 본문을 임시 파일 없이 청크 단위로 S3 에 바로 업로드합니다.
+
+    Args:
+        url (str): 다운로드할 이미지 URL.
+        s3_file (str): 업로드할 S3 key.
+        bucket_name (str): S3 버킷 이름.
+        content_type (str): 저장할 Content-Type. 없으면 응답 헤더의 값을 사용합니다.
+        metadata (dict): S3 객체 메타데이터 (문자열 값).
+
+    Returns:
+        bool: 업로드 성공 여부.
+    """
+    import requests
+
+    s3_client = get_s3_client()
+    from botocore.exceptions import NoCredentialsError
+
+    try:
+        # 스트리밍 전송에서는 응답 헤더까지를 다운로드, 본문 전송을 포함한 업로드를 s3_upload 로 기록합니다.
+        with stage_timer("image_download"):
+            response = requests.get(url, stream=True, timeout=(10, 60))
+        with response:
+            response.raise_for_status()
+            response.raw.decode_content = True  # gzip 등 전송 인코딩은 풀어서 저장
+            extra_args = {
+                'ContentType': content_type or response.headers.get('Content-Type', 'application/octet-stream'),
+            }
+            if metadata:
+                extra_args['Metadata'] = {key: str(value) for key, value in metadata.items()}
+            with stage_timer("s3_upload"):
+                s3_client.upload_fileobj(response.raw, bucket_name, s3_file, ExtraArgs=extra_args,
+                                         Config=_transfer_config)
+        logger.debug("upload successful", extra={"s3_key": s3_file})
+        return True
+    except NoCredentialsError:
+        ERRORS.inc(cause="s3_credentials")
+        logger.error("S3 credentials not available", extra={"s3_key": s3_file})
+        return False
+    except Exception as e:
+        ERRORS.inc(cause="s3_upload")
+        logger.warning("upload failed: %s", e, extra={"s3_key": s3_file})
+        return False
+
+
+def upload_bytes_to_s3(body: bytes, s3_file: str, bucket_name: str = AWS_BUCKET_NAME, content_type: str = None,
+                       metadata: dict = None, cache_control: str = None):
+    """
+    메모리에 있는 데이터를 S3 에 업로드합니다.
+
+    Returns:
+        bool: 업로드 성공 여부.
+    """
+    s3_client = get_s3_client()
+    from botocore.exceptions import NoCredentialsError
+
+    extra_args = {'ContentType': content_type or 'application/octet-stream'}
+    if cache_control:
+        extra_args['CacheControl'] = cache_control
+    if metadata:
+        extra_args['Metadata'] = {key: str(value) for key, value in metadata.items()}
+    try:
+        with stage_timer("s3_upload"):
+            s3_client.put_object(Bucket=bucket_name, Key=s3_file, Body=body, **extra_args)
+        logger.debug("upload successful", extra={"s3_key": s3_file})
+        return True
+    except NoCredentialsError:
+        ERRORS.inc(cause="s3_credentials")
+        logger.error("S3 credentials not available", extra={"s3_key": s3_file})
+        return False
+    except Exception as e:
+        ERRORS.inc(cause="s3_upload")
+        logger.warning("upload failed: %s", e, extra={"s3_key": s3_file})
         return False
+
+
+def upload_many(items: list, bucket_name: str = AWS_BUCKET_NAME, max_workers: int = S3_UPLOAD_MAX_WORKERS):
+    """
+    여러 객체를 공유 S3 클라이언트로 동시에 업로드합니다.
+
+    Args:
+        items (list): 업로드할 항목 리스트. 각 항목은 's3_file' 과 함께
+                      'local_file'(파일 경로), 'body'(bytes), 'url'(스트리밍 업로드) 중 하나를 가지며,
+                      선택적으로 'content_type', 'metadata', 'cache_control'('body' 만) 을 가질 수 있습니다.
+        bucket_name (str): S3 버킷 이름.
+        max_workers (int): 동시 업로드 수.
+
+    Returns:
+        dict: S3 key 별 업로드 성공 여부. 예: {'images/storyboard/1/1.jpg': True, ...}
+    """
+    def upload(item):
+        if 'local_file' in item:
+            return upload_to_s3(item['local_file'], item['s3_file'], bucket_name)
+        if 'body' in item:
+            return upload_bytes_to_s3(item['body'], item['s3_file'], bucket_name, item.get('content_type'),
+                                      item.get('metadata'), item.get('cache_control'))
+        if 'url' in item:
+            return stream_url_to_s3(item['url'], item['s3_file'], bucket_name, item.get('content_type'),
+                                    item.get('metadata'))
+        raise ValueError(f"Nothing to upload for {item['s3_file']}")
+
+    if not items:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items))),
+                            thread_name_prefix="s3-upload") as executor:
+        results = executor.map(upload, items)
+        return {item['s3_file']: result for item, result in zip(items, results)}
+
+
+def copy_object(source_file: str, s3_file: str, bucket_name: str = AWS_BUCKET_NAME, content_type: str = None,
+                metadata: dict = None, cache_control: str = None):
+    """
+    같은 버킷 안에서 객체를 서버 측 복사합니다. 데이터가 이 프로세스를 거치지 않습니다.
+    메타데이터, Content-Type, Cache-Control 은 원본 값을 쓰지 않고 인자로 받은 값으로 바꿉니다.
+
+    Returns:
+        bool: 복사 성공 여부.
+    """
+    s3_client = get_s3_client()
+    from botocore.exceptions import NoCredentialsError
+
+    extra_args = {'ContentType': content_type or 'application/octet-stream', 'MetadataDirective': 'REPLACE'}
+    if cache_control:
+        extra_args['CacheControl'] = cache_control
+    extra_args['Metadata'] = {key: str(value) for key, value in (metadata or {}).items()}
+    try:
+        with stage_timer("s3_copy"):
+            s3_client.copy_object(Bucket=bucket_name, Key=s3_file,
+                                  CopySource={'Bucket': bucket_name, 'Key': source_file}, **extra_args)
+        logger.debug("copy successful", extra={"s3_key": s3_file, "source": source_file})
+        return True
     except NoCredentialsError:
-        print('Credentials not available')
+        ERRORS.inc(cause="s3_credentials")
+        logger.error("S3 credentials not available", extra={"s3_key": s3_file})
         return False
     except Exception as e:
-        print(f'An error occurred: {str(e)}')
+        ERRORS.inc(cause="s3_copy")
+        logger.warning("copy failed: %s", e, extra={"s3_key": s3_file, "source": source_file})
         return False
 
 
-def download_image_from_url(url, local_file_path):
-    # 이미지 다운로드
-    print(f'Downloading image from {url} to {local_file_path}')
-    response = requests.get(url)
-    with open(local_file_path, 'wb') as f:
-        f.write(response.content)
-    print(f'Downloaded image from {url} to {local_file_path}')
+def get_object_metadata(s3_file: str, bucket_name: str = AWS_BUCKET_NAME):
+    """
+    S3 객체의 사용자 메타데이터를 조회합니다.
+
+    Returns:
+        dict: 메타데이터. 객체가 없거나 조회에 실패하면 None.
+    """
+    try:
+        return get_s3_client().head_object(Bucket=bucket_name, Key=s3_file).get('Metadata', {})
+    except Exception as e:
+        logger.debug("head_object failed: %s", e, extra={"s3_key": s3_file})
+        return None
+
+
+def download_image_bytes(url: str, max_bytes: int):
+    """
+    이미지를 메모리로 다운로드합니다.
+
+    Args:
+        url (str): 이미지 URL.
+        max_bytes (int): 허용하는 최대 크기. 넘으면 ValueError.
 
+    Returns:
+        bytes: 이미지 데이터.
+    """
+    import requests
 
-# # 사용 예시
-# if __name__ == '__main__':
-#     image_url = r'https://files.oaiusercontent.com/file-9rBoAQS8JQBPE9wwJnoTvc?se=2024-12-09T19%3A38%3A49Z&sp=r&sv=2024-08-04&sr=b&rscc=max-age%3D604800%2C%20immutable%2C%20private&rscd=attachment%3B%20filename%3Dbf6ac881-eea0-4d8d-8c0c-a19d7847c4eb.webp&sig=jjX/Wp62W%2BOaY5q2lQ/nh012NvrvCLm6RNhRZ4Vf%2Bdw%3D'
-#     local_image_path = 'image.jpg'
-#
-#     download_image_from_url(image_url, local_image_path)
-#     upload_to_s3(local_image_path, 'images/image.jpg')
+    with requests.get(url, stream=True, timeout=(10, 60)) as response:
+        response.raise_for_status()
+        body = bytearray()
+        for chunk in response.iter_content(chunk_size=256 * 1024):
+            body += chunk
+            if len(body) > max_bytes:
+                raise ValueError(f"Image larger than {max_bytes} bytes: {url}")
+    return bytes(body)
@@ -0,0 +1,58 @@
+import asyncio
+
+
+class _Call:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    같은 key 로 동시에 들어온 호출을 upstream 호출 하나로 합칩니다.
+
+    먼저 들어온 요청이 호출을 시작하고, 같은 key 의 요청은 그 결과(또는 예외)를 함께 받습니다.
+    한 요청이 취소되어도 다른 요청이 기다리는 중이면 upstream 호출은 계속되고,
+    기다리는 요청이 하나도 남지 않으면 upstream 호출도 취소합니다.
+    캐시와 달리 호출이 끝나면 결과를 보관하지 않습니다.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.started = 0  # 실제로 시작된 upstream 호출 수
+        self.coalesced = 0  # 진행 중인 호출에 합류한 요청 수
+
+    async def do(self, key, fn):
+        """
+        Args:
+            key (str): 호출을 구분하는 key (make_cache_key 결과 등).
+            fn (callable): 인자 없이 코루틴을 반환하는 함수.
+
+        Returns:
+            fn 코루틴의 결과. 같은 key 의 요청들은 같은 객체를 공유하므로 수정하지 않아야 합니다.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # 모든 요청이 떠났으므로 upstream 호출을 취소하고, 새 요청이 취소된 호출에 합류하지 않게 합니다.
+                self._forget(key, call)
+                call.task.cancel()
+
+    def in_flight(self):
+        return len(self._calls)
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
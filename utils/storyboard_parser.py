@@ -0,0 +1,192 @@
+import re
+
+# 씬 제목 줄: "- scene 1 "제목":", "- scene1 "제목":", "**Scene 2: 제목**", "### 씬 3 "제목:" 등
+HEADER_RE = re.compile(r'^\s*(?:[-#>]+\s*)?(?:scene|씬)\s*(\d+)\s*[:.)\-]?\s*(.*)$', re.IGNORECASE)
+# 세부 항목 줄: "1. 영상: ...", "- 카메라무빙: ..." (별표는 미리 제거)
+FIELD_RE = re.compile(r'^\s*(?:\d+\s*[.)]\s*|[-•]\s*)?(영상|화각|카메라\s*무빙|구도)\s*[:：]\s*(.*)$')
+
+# 세부 항목 이름 -> 씬 딕셔너리 key
+FIELD_KEYS = {
+    "영상": "description",
+    "화각": "camera_angle",
+    "카메라무빙": "camera_movement",
+    "구도": "composition",
+}
+
+# 구조화 출력(JSON) 모드에서 사용하는 씬 스키마
+SCENE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "scenes": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "order_num": {"type": "integer"},
+                    "scene_title": {"type": "string"},
+                    "description": {"type": "string"},
+                    "camera_angle": {"type": "string"},
+                    "camera_movement": {"type": "string"},
+                    "composition": {"type": "string"},
+                },
+                "required": ["order_num", "scene_title", "description", "camera_angle", "camera_movement",
+                             "composition"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["scenes"],
+    "additionalProperties": False,
+}
+
+
+class ParseResult:
+    """
+    파싱 결과. 형식이 어긋난 씬이 있어도 예외를 던지지 않고 errors 에 씬별로 기록합니다.
+
+    Attributes:
+        scenes (list): 씬 딕셔너리 리스트 (order_num, scene_title, description, camera_angle,
+                       camera_movement, composition).
+        errors (list): 씬별 오류 리스트. 예: [{"order_num": 3, "error": "missing fields: 구도"}]
+    """
+
+    def __init__(self, scenes=None, errors=None):
+        self.scenes = scenes or []
+        self.errors = errors or []
+
+
+def _clean_title(text):
+    title = text.replace("*", "").strip()
+    title = title.rstrip(":：").strip()
+    return title.strip('"“”\'').strip()
+
+
+def _new_scene(order_num, title):
+    return {
+        "order_num": order_num,
+        "scene_title": _clean_title(title),
+        "description": "",
+        "camera_angle": "",
+        "camera_movement": "",
+        "composition": "",
+    }
+
+
+def _finish_scene(scene, errors):
+    missing = [name for name, key in FIELD_KEYS.items() if not scene[key]]
+    if missing:
+        errors.append({"order_num": scene["order_num"], "error": f"missing fields: {', '.join(missing)}"})
+    return scene
+
+
+class StoryboardStreamParser:
+    """
+    스토리보드 텍스트를 줄 단위로 한 번만 훑으며 씬을 만드는 파서입니다.
+
+    텍스트를 조각으로 나눠 feed() 에 넣으면, 다음 씬 제목 줄이 나타나 닫힌 씬만 돌려줍니다.
+    마지막 씬은 close() 에서 돌려줍니다. 전체 텍스트를 한 번에 넣어도 됩니다.
+    """
+
+    def __init__(self):
+        self._partial = ""  # 아직 줄바꿈이 오지 않은 마지막 줄
+        self._scene = None
+        self._field = None  # 여러 줄에 걸친 값을 이어 붙일 현재 항목 key
+        self.errors = []
+
+    def feed(self, text):
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        finished = []
+        for line in lines:
+            scene = self._feed_line(line)
+            if scene is not None:
+                finished.append(scene)
+        return finished
+
+    def close(self):
+        finished = []
+        if self._partial:
+            scene = self._feed_line(self._partial)
+            self._partial = ""
+            if scene is not None:
+                finished.append(scene)
+        if self._scene is not None:
+            finished.append(_finish_scene(self._scene, self.errors))
+            self._scene = None
+        return finished
+
+    def _feed_line(self, line):
+        # 새 씬이 시작되면 이전 씬을 닫아 반환합니다.
+        stripped = line.replace("*", "").strip()
+        if not stripped:
+            self._field = None  # 빈 줄 뒤의 문장은 항목 값으로 이어 붙이지 않습니다.
+            return None
+
+        header = HEADER_RE.match(stripped)
+        if header:
+            finished = _finish_scene(self._scene, self.errors) if self._scene is not None else None
+            self._scene = _new_scene(int(header.group(1)), header.group(2))
+            self._field = None
+            return finished
+
+        if self._scene is None:
+            return None  # 첫 씬 이전의 안내 문구 등은 무시
+
+        field = FIELD_RE.match(stripped)
+        if field:
+            self._field = FIELD_KEYS[field.group(1).replace(" ", "")]
+            self._scene[self._field] = field.group(2).strip()
+        elif self._field is not None:
+            # 앞 항목 값이 줄바꿈으로 이어지는 경우
+            self._scene[self._field] = f"{self._scene[self._field]} {stripped}".strip()
+        return None
+
+
+def parse_storyboard_text(text):
+    """
+    GPT 가 작성한 스토리보드 텍스트 전체를 파싱합니다.
+
+    Args:
+        text (str): 스토리보드 텍스트.
+
+    Returns:
+        ParseResult: 파싱된 씬과 씬별 오류.
+    """
+    parser = StoryboardStreamParser()
+    scenes = parser.feed(text)
+    scenes.extend(parser.close())
+    if not scenes:
+        parser.errors.append({"order_num": None, "error": "no scenes found"})
+    return ParseResult(scenes, parser.errors)
+
+
+def parse_structured_storyboard(data):
+    """
+    구조화 출력(JSON) 모드 응답을 검증합니다. 잘못된 씬만 제외하고 나머지는 그대로 사용합니다.
+
+    Args:
+        data (dict): {"scenes": [...]} 형태의 응답.
+
+    Returns:
+        ParseResult: 검증된 씬과 씬별 오류.
+    """
+    result = ParseResult()
+    items = data.get("scenes") if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        result.errors.append({"order_num": None, "error": "no scenes found"})
+        return result
+
+    for index, item in enumerate(items, 1):
+        if not isinstance(item, dict):
+            result.errors.append({"order_num": None, "error": f"scene #{index} is not an object"})
+            continue
+        try:
+            order_num = int(item.get("order_num", index))
+        except (TypeError, ValueError):
+            result.errors.append({"order_num": None, "error": f"scene #{index} has invalid order_num"})
+            continue
+        scene = _new_scene(order_num, str(item.get("scene_title", "")))
+        for key in FIELD_KEYS.values():
+            scene[key] = str(item.get(key) or "").strip()
+        result.scenes.append(_finish_scene(scene, result.errors))
+    return result
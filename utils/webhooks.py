@@ -0,0 +1,199 @@
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import random
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from config.runtime import (WEBHOOK_ALLOWED_HOSTS, WEBHOOK_BACKOFF_BASE, WEBHOOK_BACKOFF_MAX, WEBHOOK_MAX_ATTEMPTS,
+                            WEBHOOK_MAX_WORKERS, WEBHOOK_SECRET, WEBHOOK_TIMEOUT)
+from utils.metrics import ERRORS, Counter
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_DELIVERIES = Counter("webhook_deliveries_total", "Webhook deliveries by event and result", ("event", "result"))
+
+
+def sign_payload(secret, timestamp, body):
+    """
+    수신 측이 검증할 서명을 만듭니다. 서명 대상은 "{timestamp}.{body}" 입니다.
+
+    Args:
+        secret (str): 공유 비밀 키.
+        timestamp (str): X-Webhook-Timestamp 헤더 값 (유닉스 초).
+        body (bytes): 요청 본문.
+
+    Returns:
+        str: "sha256=<hex>" 형태의 서명.
+    """
+    message = timestamp.encode("utf-8") + b"." + body
+    return "sha256=" + hmac.new(secret.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret, timestamp, body, signature, tolerance=300):
+    """
+    서명과 타임스탬프를 검증합니다. tolerance(초)보다 오래된 요청은 재전송 공격으로 보고 거부합니다.
+
+    Returns:
+        bool: 검증 성공 여부.
+    """
+    try:
+        if abs(time.time() - int(timestamp)) > tolerance:
+            return False
+    except (TypeError, ValueError):
+        return False
+    return hmac.compare_digest(sign_payload(secret, timestamp, body), signature or "")
+
+
+def _is_retryable(status_code):
+    return status_code in (408, 429) or status_code >= 500
+
+
+class WebhookSender:
+    """
+    콜백 URL 로 이벤트를 전송합니다.
+
+    커넥션 풀을 공유하는 httpx 클라이언트 하나로 백그라운드 스레드에서 전송하므로 호출한 워커 스레드를 막지 않습니다.
+    연결 오류, 5xx, 408, 429 응답은 full jitter 지수 백오프로 재시도하며(Retry-After 헤더가 있으면 따름),
+    그 외 4xx 는 재시도하지 않습니다. 재시도마다 같은 X-Webhook-Id 를 보내므로 수신 측은 이 값으로 중복을 거를 수 있습니다.
+
+    Args:
+        secret (str): 서명 키. 비어 있으면 서명 헤더를 붙이지 않습니다.
+        allowed_hosts (list): 전송을 허용할 호스트 목록. 비어 있으면 공인 IP 로 해석되는 호스트만 허용합니다
+            (루프백, 사설망, 링크 로컬 등 내부 주소로의 전송(SSRF) 차단).
+    """
+
+    def __init__(self, secret=WEBHOOK_SECRET, allowed_hosts=WEBHOOK_ALLOWED_HOSTS, timeout=WEBHOOK_TIMEOUT,
+                 max_attempts=WEBHOOK_MAX_ATTEMPTS, backoff_base=WEBHOOK_BACKOFF_BASE,
+                 backoff_max=WEBHOOK_BACKOFF_MAX, max_workers=WEBHOOK_MAX_WORKERS):
+        self._secret = secret
+        self._allowed_hosts = set(allowed_hosts)
+        self._timeout = timeout
+        self._max_attempts = max(1, max_attempts)
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._max_workers = max_workers
+        self._lock = threading.Lock()
+        self._client = None
+        self._executor = None
+        self._closed = threading.Event()
+
+    def validate_url(self, url):
+        """
+        콜백 URL 이 http(s) 이고 허용된 호스트인지 확인합니다.
+        허용 목록이 없으면 호스트를 DNS 로 해석해 모든 주소가 공인 IP 인지 확인하므로 블로킹 호출입니다.
+
+        Raises:
+            ValueError: 허용되지 않는 URL.
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Invalid callback url: {url}")
+        if self._allowed_hosts:
+            if parts.hostname not in self._allowed_hosts:
+                raise ValueError(f"Callback host not allowed: {parts.hostname}")
+            return
+        try:
+            addresses = {info[4][0] for info in socket.getaddrinfo(parts.hostname, parts.port or 443,
+                                                                    type=socket.SOCK_STREAM)}
+        except (socket.gaierror, UnicodeError):
+            raise ValueError(f"Callback host does not resolve: {parts.hostname}")
+        for address in addresses:
+            if not ipaddress.ip_address(address.split("%", 1)[0]).is_global:
+                raise ValueError(f"Callback host not allowed: {parts.hostname}")
+
+    def send(self, url, event, payload):
+        """
+        이벤트 전송을 예약하고 바로 반환합니다.
+
+        Args:
+            url (str): 콜백 URL.
+            event (str): 이벤트 이름 (X-Webhook-Event 헤더). 예: "scene.completed", "storyboard.completed".
+            payload (dict): JSON 본문.
+
+        Returns:
+            concurrent.futures.Future: 전송 성공 여부(bool)를 담는 Future.
+        """
+        body = json.dumps({"event": event, **payload}, ensure_ascii=False).encode("utf-8")
+        executor, client = self._get_executor()
+        # 전송에 쓸 클라이언트는 예약할 때 정해 둡니다. close() 가 대기 중인 전송을 마친 뒤에 닫습니다.
+        return executor.submit(self._deliver, client, url, event, body, uuid.uuid4().hex)
+
+    def close(self, wait=True):
+        # 남은 재시도 대기를 깨우고, wait=True 면 대기 중/진행 중인 전송이 끝날 때까지 기다린 뒤 클라이언트를 닫습니다.
+        self._closed.set()
+        with self._lock:
+            executor, client = self._executor, self._client
+            self._executor = self._client = None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+        # wait=False 면 남은 전송이 아직 클라이언트를 쓰고 있을 수 있으므로 닫지 않습니다.
+        if client is not None and wait:
+            client.close()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # httpx 는 처음 알림을 보낼 때 불러옵니다 (이미지 라우터 import 만으로는 불러오지 않음).
+                import httpx
+
+                self._closed.clear()
+                self._client = httpx.Client(timeout=self._timeout,
+                                            limits=httpx.Limits(max_connections=self._max_workers,
+                                                                max_keepalive_connections=self._max_workers))
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="webhook")
+            return self._executor, self._client
+
+    def _deliver(self, client, url, event, body, delivery_id):
+        import httpx
+
+        headers = {
+            "Content-Type": "application/json",
+            "X-Webhook-Event": event,
+            "X-Webhook-Id": delivery_id,
+        }
+        for attempt in range(1, self._max_attempts + 1):
+            timestamp = str(int(time.time()))
+            headers["X-Webhook-Timestamp"] = timestamp
+            if self._secret:
+                headers["X-Webhook-Signature"] = sign_payload(self._secret, timestamp, body)
+            retry_after = None
+            try:
+                response = client.post(url, content=body, headers=headers)
+                if response.is_success:
+                    WEBHOOK_DELIVERIES.inc(event=event, result="delivered")
+                    logger.debug("webhook delivered", extra={"event": event, "url": url, "attempts": attempt})
+                    return True
+                if not _is_retryable(response.status_code):
+                    logger.warning("webhook rejected with %s", response.status_code, extra={"event": event, "url": url})
+                    break
+                error = f"HTTP {response.status_code}"
+                try:
+                    retry_after = float(response.headers.get("Retry-After", ""))
+                except ValueError:
+                    pass
+            except httpx.HTTPError as e:
+                error = str(e) or type(e).__name__
+
+            if attempt == self._max_attempts:
+                logger.warning("webhook failed after %d attempts: %s", attempt, error, extra={"event": event, "url": url})
+                break
+            delay = random.uniform(0, min(self._backoff_max, self._backoff_base * 2 ** (attempt - 1)))
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, self._backoff_max))
+            if self._closed.wait(delay):
+                break
+
+        WEBHOOK_DELIVERIES.inc(event=event, result="failed")
+        ERRORS.inc(cause="webhook")
+        return False
+
+
+# 앱 전체가 공유하는 webhook 전송기
+webhooks = WebhookSender()
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+import signal
+
+from config.runtime import IMAGE_DRAIN_TIMEOUT, IMAGE_JOB_STORE_URL
+
+# 이미지 생성 전용 워커 프로세스.
+# API 를 IMAGE_WORKER_MODE=external 로 띄우면 API 는 작업을 저장소에 등록만 하고, 이 프로세스가 씬을 가져가 생성합니다.
+# API 와 같은 IMAGE_JOB_STORE_URL(SQLite 파일)을 사용해야 하며, 필요한 만큼 여러 개 띄울 수 있습니다.
+#   IMAGE_WORKER_MODE=external uvicorn main:app
+#   python worker.py
+#
+# 이미지 인코딩 프로세스 풀(spawn)은 이 파일을 __mp_main__ 으로 다시 import 하므로, 로그 설정과 라우터/작업 저장소를
+# 불러오는 import 는 모듈 최상위가 아니라 main() 안에 둡니다. 자식 프로세스는 utils.image_processing 만 불러옵니다.
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    from routers import gpt_images
+    from utils.image_processing import shutdown_image_processing
+    from utils.logging_config import shutdown_logging
+    from utils.openai_client import close_openai_client, start_openai_client
+    from utils.prompts import load_tokenizer
+    from utils.webhooks import webhooks
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    # 워커 스레드의 OpenAI 호출은 이 이벤트 루프의 공유 클라이언트로 넘어옵니다.
+    await start_openai_client()
+    await asyncio.to_thread(load_tokenizer)
+    engine = await asyncio.to_thread(gpt_images.get_engine)
+    engine.start()
+    logger.info("image worker started", extra={"store": IMAGE_JOB_STORE_URL})
+    try:
+        await stop.wait()
+    finally:
+        # 실행 중인 씬은 IMAGE_DRAIN_TIMEOUT 까지 기다리고, 그 뒤에도 남은 씬과 배정되지 않은 씬은 저장소 대기열에 남겨 둡니다.
+        logger.info("image worker stopping")
+        await asyncio.to_thread(engine.shutdown, True, IMAGE_DRAIN_TIMEOUT)
+        await asyncio.to_thread(shutdown_image_processing)
+        await asyncio.to_thread(webhooks.close, True)
+        await close_openai_client()
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    if IMAGE_JOB_STORE_URL.startswith("memory://"):
+        raise SystemExit("worker.py needs a shared job store (IMAGE_JOB_STORE_URL=sqlite:///...)")
+    from utils.logging_config import setup_logging
+
+    setup_logging()
+    asyncio.run(main())